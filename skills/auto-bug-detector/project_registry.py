@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Project Registry Loader
+Reads ~/.claude/project-registry.yaml (see project-onboarding-wizard),
+detects which project a table name or request refers to (Step 0.5) and
+expands a project's BigQuery config into scan targets.
+
+Usage:
+    python3 project_registry.py list
+    python3 project_registry.py detect "qtco-messaging-channels.prod.app_messaging_ott_management_api_mgmt_stdout"
+    python3 project_registry.py targets [--project ottm] [--env prod] [--tables app_logs]
+    python3 project_registry.py snapshot [--rebuild]
+
+The parsed registry and a lookup index (table names, project IDs,
+acronyms and table_patterns -> project IDs) are kept in a marshal snapshot,
+~/.cache/claude/project_registry_snapshot.marshal. A load only re-parses the
+YAML when the file changed: the snapshot is reused while the registry's
+mtime and size match, and after a touch as long as its SHA-256 still does.
+
+The snapshot decides which tables a sweep queries and marshal must not be
+fed untrusted data, so it lives in a private per-user directory and is only
+read when it is owned by the current user and writable by nobody else.
+"""
+
+import argparse
+import hashlib
+import marshal
+import os
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+REGISTRY_FILE = Path(os.path.expanduser("~/.claude/project-registry.yaml"))
+SNAPSHOT_FILE = Path(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")) / "claude" / \
+    "project_registry_snapshot.marshal"
+
+# Bump when the snapshot layout changes
+SNAPSHOT_VERSION = 1
+
+ENVIRONMENTS = ("dev", "stage", "prod")
+
+# Scanner column defaults (same as scan_errors.py)
+DEFAULT_COLUMNS = {
+    "timestamp": "timestamp",
+    "error": "error",
+    "level": "level",
+    "partition": "PARTITIONDATE",
+}
+
+
+class RegistryError(Exception):
+    """Registry missing, unreadable or malformed."""
+
+
+def parse_registry(path):
+    """Parse the registry YAML and return its dict."""
+    # Imported here: loads served from the snapshot don't pay for PyYAML
+    try:
+        import yaml
+    except ImportError:
+        raise RegistryError("PyYAML is required to read the project registry (pip install pyyaml)") from None
+    with open(path) as f:
+        registry = yaml.safe_load(f) or {}
+    if not isinstance(registry.get("projects"), dict):
+        raise RegistryError(f"{path} has no 'projects' mapping")
+    return registry
+
+
+def build_index(registry):
+    """Lookup tables from lowercased names to project IDs."""
+    index = {"tables": {}, "ids": {}, "acronyms": {}, "patterns": {}}
+    for project_id, project in registry["projects"].items():
+        project = project or {}
+        index["ids"][project_id.lower()] = project_id
+        if project.get("acronym"):
+            index["acronyms"].setdefault(str(project["acronym"]).lower(), []).append(project_id)
+        bigquery = project.get("bigquery") or {}
+        for table_name in (bigquery.get("tables") or {}).values():
+            index["tables"][str(table_name).lower()] = project_id
+        for pattern in bigquery.get("table_patterns") or []:
+            index["patterns"].setdefault(str(pattern).lower(), []).append(project_id)
+    return index
+
+
+def _trusted(stat):
+    """Owned by the current user and not writable by group or others."""
+    return stat.st_uid == os.getuid() and not stat.st_mode & 0o022
+
+
+def _write_snapshot(snapshot, data):
+    tmp = snapshot.with_name(f"{snapshot.name}.{os.getpid()}.tmp")
+    try:
+        snapshot.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if not _trusted(snapshot.parent.stat()):
+            return
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            marshal.dump(data, f)
+        os.replace(tmp, snapshot)
+    except (OSError, ValueError):
+        # Unwritable cache dir or a value marshal can't store (e.g. a YAML date): run without a snapshot
+        tmp.unlink(missing_ok=True)
+
+
+def _read_snapshot(snapshot):
+    try:
+        with open(snapshot, "rb") as f:
+            # Someone else's (or a shared-writable) file could inject tables and projects
+            if not (_trusted(os.fstat(f.fileno())) and _trusted(snapshot.parent.stat())):
+                return None
+            data = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return data if isinstance(data, dict) and data.get("version") == SNAPSHOT_VERSION else None
+
+
+# path -> (mtime_ns, size, registry, index) for repeated loads in one process
+_loaded = {}
+
+
+def load_snapshot(path=REGISTRY_FILE, snapshot=SNAPSHOT_FILE, rebuild=False):
+    """Return (registry, index), re-parsing the YAML only if the file changed."""
+    path = Path(path).expanduser()
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        raise RegistryError(f"Project registry not found at {path} (use project-onboarding-wizard to create it)") from None
+
+    key = str(path.resolve())
+    cached = _loaded.get(key)
+    if cached and not rebuild and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2], cached[3]
+
+    data = None if rebuild else _read_snapshot(snapshot)
+    if data and data["path"] != key:
+        data = None
+    if data and (data["mtime_ns"], data["size"]) != (stat.st_mtime_ns, stat.st_size):
+        # Touched or edited: the content hash decides
+        if data["sha256"] == hashlib.sha256(path.read_bytes()).hexdigest():
+            data.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            _write_snapshot(snapshot, data)
+        else:
+            data = None
+    if data is None:
+        content = path.read_bytes()
+        registry = parse_registry(path)
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "path": key,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "registry": registry,
+            "index": build_index(registry),
+        }
+        _write_snapshot(snapshot, data)
+
+    _loaded[key] = (data["mtime_ns"], data["size"], data["registry"], data["index"])
+    return data["registry"], data["index"]
+
+
+def load_registry(path=REGISTRY_FILE):
+    """The registry dict (from the snapshot when the file is unchanged)."""
+    return load_snapshot(path)[0]
+
+
+@lru_cache(maxsize=8)
+def _pattern_matcher(patterns):
+    """One regex over all table_patterns, longest first (so the most specific wins at a position)."""
+    ordered = sorted(patterns, key=len, reverse=True)
+    return re.compile("|".join(re.escape(pattern) for pattern in ordered))
+
+
+def detect_project(text, index):
+    """Projects referred to by a table name or request text, best match first.
+
+    Returns [(project_id, reason)] ranked by: exact table name, project ID,
+    acronym, then the longest matching table_pattern.
+    """
+    lowered = text.lower().strip().strip("`")
+    found = {}
+
+    def add(project_ids, reason, rank):
+        for project_id in project_ids:
+            if project_id not in found or rank < found[project_id][1]:
+                found[project_id] = (reason, rank)
+
+    table = index["tables"].get(lowered.rsplit(".", 1)[-1])
+    if table:
+        add([table], f"table {lowered.rsplit('.', 1)[-1]}", (0, 0))
+    tokens = set(re.findall(r"[a-z0-9][a-z0-9_-]*", lowered))
+    tokens |= {part for token in tokens for part in re.split(r"[-_]", token) if part}
+    for token in tokens:
+        if token in index["tables"]:
+            add([index["tables"][token]], f"table {token}", (0, 0))
+        if token in index["ids"]:
+            add([index["ids"][token]], f"project id {token}", (1, 0))
+        if token in index["acronyms"]:
+            add(index["acronyms"][token], f"acronym {token}", (2, 0))
+    if index["patterns"]:
+        for match in _pattern_matcher(tuple(index["patterns"])).finditer(lowered):
+            pattern = match.group()
+            add(index["patterns"][pattern], f"table pattern {pattern}", (3, -len(pattern)))
+    return [(project_id, reason) for project_id, (reason, _) in sorted(found.items(), key=lambda item: item[1][1])]
+
+
+def scan_targets(registry, projects=None, envs=None, tables=("app_logs",)):
+    """One target per (project, env, table) with the columns to scan it by.
+
+    `projects`, `envs` and `tables` filter by project ID, environment and
+    table key (e.g. app_logs); None selects all.
+    """
+    targets = []
+    for project_id, project in registry["projects"].items():
+        if projects and project_id not in projects:
+            continue
+        bigquery = (project or {}).get("bigquery") or {}
+        if not bigquery.get("project"):
+            continue
+        columns = {**DEFAULT_COLUMNS, **(bigquery.get("columns") or {})}
+        for env, dataset in (bigquery.get("datasets") or {}).items():
+            if envs and env not in envs:
+                continue
+            for table_key, table_name in (bigquery.get("tables") or {}).items():
+                if tables and table_key not in tables:
+                    continue
+                targets.append({
+                    "project_id": project_id,
+                    "env": env,
+                    "table_key": table_key,
+                    "table": f"{bigquery['project']}.{dataset}.{table_name}",
+                    "columns": columns,
+                })
+    return targets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Project registry helper")
+    parser.add_argument("--registry", default=str(REGISTRY_FILE), help="Registry YAML path")
+    subparsers = parser.add_subparsers(dest="command", help="Commands")
+    subparsers.add_parser("list", help="List registered projects")
+    detect_parser = subparsers.add_parser("detect", help="Detect the project for a table name or request text")
+    detect_parser.add_argument("text", help="Table name (project.dataset.table) or request text")
+    snapshot_parser = subparsers.add_parser("snapshot", help="Show (or rebuild) the parsed registry snapshot")
+    snapshot_parser.add_argument("--rebuild", action="store_true", help="Re-parse the YAML even if unchanged")
+    targets_parser = subparsers.add_parser("targets", help="List scan targets")
+    targets_parser.add_argument("--project", action="append", help="Project ID (repeatable, default: all)")
+    targets_parser.add_argument("--env", action="append", choices=ENVIRONMENTS, help="Environment (repeatable, default: all)")
+    targets_parser.add_argument("--tables", default="app_logs", help="Comma-separated table keys, or 'all'")
+    args = parser.parse_args()
+
+    try:
+        registry, index = load_snapshot(args.registry, rebuild=getattr(args, "rebuild", False))
+    except RegistryError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == "detect":
+        matches = detect_project(args.text, index)
+        if not matches:
+            print("No registered project matches. Available projects: " + ", ".join(registry["projects"]))
+            sys.exit(2)
+        for project_id, reason in matches:
+            print(f"{project_id:<12} ({reason})")
+    elif args.command == "snapshot":
+        print(f"Registry:  {Path(args.registry).expanduser()}")
+        print(f"Snapshot:  {SNAPSHOT_FILE}")
+        print(f"Projects:  {len(registry['projects'])}")
+        print(f"Index:     {len(index['tables'])} table names, {len(index['acronyms'])} acronyms, "
+              f"{len(index['patterns'])} table patterns")
+    elif args.command == "list":
+        for project_id, project in registry["projects"].items():
+            print(f"{project_id:<12} {project.get('acronym', ''):<10} {project.get('name', '')}")
+    elif args.command == "targets":
+        tables = None if args.tables == "all" else args.tables.split(",")
+        for target in scan_targets(registry, args.project, args.env, tables):
+            print(f"{target['project_id']:<12} {target['env']:<6} {target['table']}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
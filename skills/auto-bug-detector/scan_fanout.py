@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Registry-Wide Error Scan (Fan-Out)
+Scans every (project, env, table) from the project registry concurrently
+and merges the results into one deduplicated report (Stage 1 of the
+pipeline for a whole sweep).
+
+Usage:
+    python3 scan_fanout.py [--project ottm] [--env prod] [--tables app_logs] [--hours 4] [--incremental]
+                           [--workers 4] [--max-gb 50] [--where "level = 'error'"] [--aggregate] [--report PATH]
+
+Each target is scanned like `scan_errors.py TABLE` with the registry's
+columns: same per-table signature store, same incremental watermarks, so a
+fan-out sweep and a single-table scan continue from each other.
+
+Concurrency and cost:
+    --workers 4      Queries running at once across all targets
+    --max-gb 50      Budget for the whole sweep. Each query is dry-run first
+                     and only started if its bytes fit in what is left;
+                     targets over budget are reported as skipped
+                     (0 disables the cap and the dry runs)
+
+With --aggregate every target runs the scan_errors.py --aggregate query
+(signatures grouped in BigQuery, one row per group), which keeps large
+sweeps to one small result per target. Aggregate sweeps cover the --hours
+window and leave the watermarks alone, so they can't be --incremental.
+
+The merged report (/tmp/bq_fanout_report.json) lists each signature once
+with per-target counts, NEW if it was new in any target.
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from project_registry import ENVIRONMENTS, REGISTRY_FILE, RegistryError, load_registry, scan_targets
+
+# Scanner modules from the bigquery-error-scanner skill
+sys.path.insert(0, str(Path(__file__).parent.resolve().parent / "bigquery-error-scanner"))
+from bq_stream import BigQueryError, estimate_bytes, run_query  # noqa: E402
+from error_normalizer import cache_info  # noqa: E402
+from scan_errors import (  # noqa: E402
+    DEFAULT_OVERLAP_MINUTES,
+    IncrementalWindow,
+    build_aggregate_query,
+    build_query,
+    scan_rows,
+    signature_records,
+)
+from signature_store import DEFAULT_TTL_DAYS, STORE_DIR, iso, open_store  # noqa: E402
+
+REPORT_FILE = STORE_DIR / "bq_fanout_report.json"
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_GB = 50
+
+# On-demand query pricing, for the cost estimate only
+USD_PER_TIB = 6.25
+
+_print_lock = threading.Lock()
+# Signatures already printed as NEW by any target of this sweep
+_announced = set()
+
+
+def log(message):
+    with _print_lock:
+        print(message, flush=True)
+
+
+def announce_new(signature_hash, name, obs):
+    """Print a NEW signature the first time any target finds it."""
+    with _print_lock:
+        if signature_hash not in _announced:
+            _announced.add(signature_hash)
+            print(f"NEW  {signature_hash}  {name}  [{obs['level'] or '-'}] {obs['normalized_message']}", flush=True)
+
+
+def target_name(target):
+    return f"{target['project_id']}/{target['env']}/{target['table_key']}"
+
+
+class ByteBudget:
+    """Bytes left for the sweep, reserved by queries before they start."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.reserved = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, nbytes):
+        with self._lock:
+            if self.max_bytes and self.reserved + nbytes > self.max_bytes:
+                return False
+            self.reserved += nbytes
+            return True
+
+
+def scan_target(target, budget, hours, incremental, overlap_minutes, where, ttl_days, record, aggregate=False):
+    """Scan one registry target; returns a job result dict (never raises).
+
+    Any failure (bq, the signature store, a bad column mapping) is reported
+    as this target's `error` status so the rest of the sweep still completes.
+    """
+    columns = target["columns"]
+    name = target_name(target)
+    result = {"target": name, "table": target["table"], "status": "ok", "bytes": None,
+              "rows": 0, "observations": {}, "elapsed_s": 0.0}
+    start = time.monotonic()
+    try:
+        with open_store(target["table"], ttl_days) as store:
+            scope = f"{columns['timestamp']}|{where or ''}"
+            window = IncrementalWindow(store, scope, hours, overlap_minutes, incremental)
+            query_builder = build_aggregate_query if aggregate else build_query
+            sql = query_builder(target["table"], window.start, window.end, columns["error"], columns.get("level"),
+                                columns["timestamp"], columns.get("partition"), columns.get("request_id"), where)
+            result["window"] = {"start": iso(window.start), "end": iso(window.end)}
+
+            if budget.max_bytes:
+                result["bytes"] = estimate_bytes(sql)
+                if not budget.reserve(result["bytes"]):
+                    result["status"] = "skipped"
+                    log(f"SKIP {name}: {result['bytes'] / 1e9:.2f} GB would exceed the --max-gb budget")
+                    return result
+
+            observations = scan_rows(run_query(sql), store, window=window,
+                                     on_new=lambda h, obs: announce_new(h, name, obs),
+                                     count_field="count" if aggregate else None)
+            if record:
+                store.record(signature_records(observations))
+                # Grouped rows can't be told apart from rows a later overlap re-reads
+                if not aggregate:
+                    window.commit()
+            result["observations"] = observations
+            result["rows"] = sum(obs["count"] for obs in observations.values())
+    except BigQueryError as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+        log(f"FAIL {name}: {e}")
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+        log(f"FAIL {name}: {result['error']}")
+    result["elapsed_s"] = round(time.monotonic() - start, 2)
+    return result
+
+
+def merge_results(results):
+    """Merge per-target observations into one entry per signature."""
+    merged = {}
+    for result in results:
+        for signature_hash, obs in result["observations"].items():
+            entry = merged.setdefault(signature_hash, {
+                "signature": signature_hash,
+                "normalized_message": obs["normalized_message"],
+                "level": obs["level"],
+                "sample_error": obs["sample_error"],
+                "count": 0,
+                "targets": {},
+                "new_in": [],
+            })
+            entry["count"] += obs["count"]
+            entry["targets"][result["target"]] = obs["count"]
+            if obs["new"]:
+                entry["new_in"].append(result["target"])
+            # --aggregate observations carry the time range of their groups
+            if obs.get("first_seen") and obs["first_seen"] < entry.get("first_seen", "~"):
+                entry["first_seen"] = obs["first_seen"]
+            if obs.get("last_seen") and obs["last_seen"] > entry.get("last_seen", ""):
+                entry["last_seen"] = obs["last_seen"]
+    return sorted(merged.values(), key=lambda entry: (not entry["new_in"], -entry["count"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan every registered project/env/table concurrently")
+    parser.add_argument("--registry", default=str(REGISTRY_FILE), help="Registry YAML path")
+    parser.add_argument("--project", action="append", help="Project ID (repeatable, default: all)")
+    parser.add_argument("--env", action="append", choices=ENVIRONMENTS, help="Environment (repeatable, default: all)")
+    parser.add_argument("--tables", default="app_logs", help="Comma-separated table keys from the registry, or 'all'")
+    parser.add_argument("--hours", type=float, default=4, help="Time window (first scan when incremental)")
+    parser.add_argument("--incremental", action="store_true", help="Only scan rows after each table's watermark")
+    parser.add_argument("--overlap-minutes", type=float, default=DEFAULT_OVERLAP_MINUTES,
+                        help="Re-read this much before the watermark for late-arriving rows")
+    parser.add_argument("--where", help="Extra WHERE condition for every target")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Max concurrent queries")
+    parser.add_argument("--max-gb", type=float, default=DEFAULT_MAX_GB, help="Bytes budget for the sweep (0: no cap)")
+    parser.add_argument("--aggregate", action="store_true",
+                        help="Group by coarse signature in BigQuery; one row per group with count")
+    parser.add_argument("--ttl-days", type=int, default=DEFAULT_TTL_DAYS, help="Signature expiry in days")
+    parser.add_argument("--report", default=str(REPORT_FILE), help="Merged report JSON path")
+    parser.add_argument("--no-record", action="store_true", help="Do not update the signature stores")
+    args = parser.parse_args()
+    if args.aggregate and args.incremental:
+        parser.error("--aggregate can't be combined with --incremental (grouped rows have no row keys "
+                     "to skip rows an earlier scan counted)")
+
+    try:
+        registry = load_registry(args.registry)
+    except RegistryError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    tables = None if args.tables == "all" else args.tables.split(",")
+    targets = scan_targets(registry, args.project, args.env, tables)
+    if not targets:
+        print("No scan targets match the given filters.")
+        return
+
+    budget = ByteBudget(int(args.max_gb * 1e9))
+    print(f"Scanning {len(targets)} target(s) (workers={args.workers}, "
+          f"budget={'none' if not budget.max_bytes else f'{args.max_gb:g} GB'})...", flush=True)
+
+    start = time.monotonic()
+    results = []
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = [
+            pool.submit(scan_target, target, budget, args.hours, args.incremental, args.overlap_minutes,
+                        args.where, args.ttl_days, not args.no_record, args.aggregate)
+            for target in targets
+        ]
+        for future in as_completed(futures):
+            results.append(future.result())
+    elapsed = time.monotonic() - start
+    results.sort(key=lambda result: result["target"])
+
+    merged = merge_results(results)
+    new = [entry for entry in merged if entry["new_in"]]
+    # Failed targets reserved (and may have billed) their estimate too
+    scanned_bytes = sum(r["bytes"] or 0 for r in results if r["status"] != "skipped")
+    report = {
+        "scanned_at": iso(time.time()),
+        "elapsed_s": round(elapsed, 2),
+        "estimated_bytes": scanned_bytes if budget.max_bytes else None,
+        "targets": [{k: v for k, v in r.items() if k != "observations"} | {"signatures": len(r["observations"])}
+                    for r in results],
+        "total_errors": sum(r["rows"] for r in results),
+        "signatures": len(merged),
+        "new": new,
+        "seen_before": [entry for entry in merged if not entry["new_in"]],
+    }
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    print("\n" + "-" * 78)
+    print(f"{'Target':<32} {'Status':<8} {'GB':>7} {'Errors':>8} {'Sigs':>6} {'Time':>8}")
+    for r in results:
+        gb = f"{r['bytes'] / 1e9:.2f}" if r["bytes"] is not None else "-"
+        print(f"{r['target']:<32} {r['status']:<8} {gb:>7} {r['rows']:>8} {len(r['observations']):>6} "
+              f"{r['elapsed_s']:>7.1f}s")
+    print("-" * 78)
+    slowest = max((r["elapsed_s"] for r in results), default=0)
+    print(f"Total errors found: {report['total_errors']} across {len(results)} target(s)")
+    print(f"UNIQUE errors (new patterns): {len(new)} (deduplicated across targets)")
+    print(f"Seen before: {len(merged) - len(new)} pattern(s)")
+    if budget.max_bytes:
+        print(f"Estimated bytes scanned: {scanned_bytes / 1e9:.2f} GB "
+              f"(~${scanned_bytes / 2**40 * USD_PER_TIB:.2f})")
+    print(f"Elapsed: {elapsed:.2f}s (slowest target {slowest:.2f}s; "
+          f"normalizer cache: {cache_info().hits} hits, {cache_info().misses} misses)")
+    print(f"Report: {args.report}")
+    if any(r["status"] == "error" for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
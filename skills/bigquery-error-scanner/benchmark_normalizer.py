@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Error Normalizer Benchmark
+Compares the sequential re.sub normalization previously inlined in SKILL.md
+Step 6 with the single-pass error_normalizer module on synthetic log lines.
+
+Usage:
+    python3 benchmark_normalizer.py [--lines 1000000] [--distinct 0.05] [--seed 7]
+                                    [--skip-legacy] [--output results.json]
+
+Lines are drawn from realistic error templates filled with random SIDs, RQ
+IDs, UUIDs, IPs, dates, phone numbers, URLs and counters. --distinct is the
+fraction of lines that are unique messages; the rest repeat earlier lines,
+as retried and recurring errors do in real log tables.
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+
+import error_normalizer
+
+TEMPLATES = [
+    "Sender {sid} not found for account {account}",
+    "Request {rq} failed: upstream timeout after {n}ms",
+    "POST {url} returned {status} for {phone}",
+    "Connection refused to {ip}:{port} at {date}T{time}Z",
+    "WhatsApp profile update failed for {phone}: code {n}",
+    "Token {jwt} rejected for user {email}",
+    "Unexpected payload for id {uuid} in /v2/Channels/Senders/{sid}",
+    "Cache miss for hash {hex} on {date} {time}",
+    "Authorization Bearer {bearer} expired (retry {n})",
+    "Rate limit exceeded: {n} requests in {port}s from {ip}",
+]
+
+
+def random_hex(rng, length):
+    return "".join(rng.choice("0123456789abcdef") for _ in range(length))
+
+
+def synthetic_line(rng):
+    values = {
+        "sid": "XE" + random_hex(rng, 32),
+        "account": "AC" + random_hex(rng, 32),
+        "rq": "RQ" + random_hex(rng, 32),
+        "n": rng.randint(1, 99999),
+        "status": rng.choice([400, 404, 429, 500, 503]),
+        "url": f"https://graph.facebook.com/v19.0/{rng.randint(10**9, 10**10)}/messages",
+        "phone": f"+1{rng.randint(10**9, 10**10 - 1)}",
+        "ip": ".".join(str(rng.randint(1, 254)) for _ in range(4)),
+        "port": rng.randint(1, 65535),
+        "date": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "time": f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}",
+        "jwt": f"eyJ{random_hex(rng, 12)}.eyJ{random_hex(rng, 20)}.{random_hex(rng, 16)}",
+        "email": f"user{rng.randint(1, 9999)}@example.com",
+        "uuid": "-".join(random_hex(rng, n) for n in (8, 4, 4, 4, 12)),
+        "hex": random_hex(rng, 40),
+        "bearer": random_hex(rng, 24),
+    }
+    return rng.choice(TEMPLATES).format(**values)
+
+
+def generate_lines(count, distinct, seed):
+    """Build `count` lines of which roughly `distinct` are unique."""
+    rng = random.Random(seed)
+    unique = [synthetic_line(rng) for _ in range(max(1, int(count * distinct)))]
+    lines = unique + [rng.choice(unique) for _ in range(count - len(unique))]
+    rng.shuffle(lines)
+    return lines
+
+
+LEGACY_RULES = [
+    (r"RQ[a-f0-9]{32}", "REQUEST_ID"),
+    (r"[A-Z]{2}[a-f0-9]{32}", "RESOURCE_ID"),
+    (r"[A-Z]{2}[a-f0-9]+", "SID"),
+    (r"\b\d+\b", "NUMBER"),
+    (r"\d{4}-\d{2}-\d{2}", "DATE"),
+    (r"\d{2}/\d{2}/\d{4}", "DATE"),
+    (r"\d{2}:\d{2}:\d{2}", "TIME"),
+    (r"\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b", "IP_ADDRESS"),
+    (r"[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}", "UUID"),
+    (r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b", "EMAIL"),
+    (r"https?://[^\s]+", "URL"),
+    (r"\+\d{10,15}", "PHONE"),
+    (r"\b[A-Z]{2}[a-f0-9]{32}\b", "TWILIO_SID"),
+    (r"eyJ[A-Za-z0-9_-]+\.eyJ[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+", "JWT_TOKEN"),
+    (r"Bearer\s+[A-Za-z0-9_-]+", "BEARER_TOKEN"),
+    (r"\b[a-f0-9]{32,}\b", "HEX_STRING"),
+    (r"/[\w/.-]+", "PATH"),
+]
+
+
+def legacy_normalize(message):
+    """The per-rule re.sub sequence from the original SKILL.md Step 6."""
+    for pattern, replacement in LEGACY_RULES:
+        message = re.sub(pattern, replacement, message)
+    return message
+
+
+def run(name, normalize, lines):
+    start = time.perf_counter()
+    signatures = {error_normalizer.signature(normalize(line)) for line in lines}
+    elapsed = time.perf_counter() - start
+    result = {
+        "name": name,
+        "lines": len(lines),
+        "elapsed_s": round(elapsed, 3),
+        "lines_per_s": round(len(lines) / elapsed),
+        "signatures": len(signatures),
+    }
+    print(f"{name:<22} {elapsed:>8.2f}s {result['lines_per_s']:>12,} lines/s {len(signatures):>10,} signatures")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark error normalization on synthetic log lines")
+    parser.add_argument("--lines", "-n", type=int, default=1_000_000, help="Synthetic log lines")
+    parser.add_argument("--distinct", type=float, default=0.05, help="Fraction of unique lines")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    parser.add_argument("--skip-legacy", action="store_true", help="Skip the slow sequential re.sub baseline")
+    parser.add_argument("--output", "-o", help="Write results as JSON")
+    args = parser.parse_args()
+
+    print(f"Generating {args.lines:,} lines ({args.distinct:.0%} distinct)...")
+    lines = generate_lines(args.lines, args.distinct, args.seed)
+
+    print(f"\n{'Normalizer':<22} {'Elapsed':>9} {'Throughput':>18} {'Signatures':>11}")
+    results = []
+    if not args.skip_legacy:
+        results.append(run("legacy (17 passes)", legacy_normalize, lines))
+    results.append(run("single-pass", error_normalizer.normalize.__wrapped__, lines))
+    error_normalizer.normalize.cache_clear()
+    results.append(run("single-pass + cache", error_normalizer.normalize, lines))
+    info = error_normalizer.cache_info()
+    print(f"\nCache: {info.hits:,} hits, {info.misses:,} misses (max {info.maxsize:,} entries)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"lines": args.lines, "distinct": args.distinct, "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
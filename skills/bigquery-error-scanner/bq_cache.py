@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+BigQuery Result Cache
+Local content-addressed cache for the request_id lookups run by
+request-analyzer, ottm-bigquery-debugging and senders-e2e-testing.
+
+Results are keyed by a fingerprint of the normalized SQL (comments and
+whitespace collapsed). Queries that select rows by request ID
+(`request_id = "RQ..."` or `request_id IN ("RQ...", ...)`) are cached per
+RQ ID: the IN list is removed from the fingerprint, rows are stored under
+(fingerprint, RQ ID), and only RQ IDs without a fresh cached answer are
+sent to BigQuery, in one rewritten IN query. The reassembled rows are
+sorted by the query's ORDER BY, so they come back in the order a live
+query returns; a query whose ORDER BY is not a list of selected columns is
+cached whole instead.
+
+Freshness depends on the partitions a query reads, judged from the
+predicates on the partition column (--partition-column, default
+PARTITIONDATE, _PARTITIONDATE and _PARTITIONTIME):
+    closed (its upper bound is before today, UTC)    cached for --ttl-closed (30 days)
+    open (CURRENT_DATE(), today, or no upper bound)  cached for --ttl-open (120s);
+                                                     RQ IDs with no rows are not cached,
+                                                     their logs may still be arriving
+
+Usage:
+    python3 bq_cache.py query --sql "SELECT ..." [--no-cache] [--ttl-open 120] [--ttl-closed 2592000]
+                              [--partition-column PARTITIONDATE]
+    python3 bq_cache.py query --sql-file query.sql
+    python3 bq_cache.py stats
+    python3 bq_cache.py clear [--expired]
+
+`query` prints the result rows as one JSON array on stdout (the shape of
+`bq query --format=json`) and a cache summary on stderr.
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from bq_stream import BigQueryError, run_query
+
+CACHE_DB = Path("/tmp/bq_result_cache.db")
+
+# Seconds to wait for another process holding the write lock
+BUSY_TIMEOUT = 30
+
+DEFAULT_TTL_OPEN = 120
+DEFAULT_TTL_CLOSED = 30 * 86400
+
+# Columns whose predicates decide which date partitions a query reads
+DEFAULT_PARTITION_COLUMNS = ("PARTITIONDATE", "_PARTITIONDATE", "_PARTITIONTIME")
+
+# RQ IDs per rewritten IN query
+MAX_IDS_PER_QUERY = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key        TEXT PRIMARY KEY,
+    rows       TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_results_expires_at ON results(expires_at);
+"""
+
+RQ_ID = r"RQ[a-f0-9]{32}"
+# request_id IN ("RQ...", 'RQ...') or request_id = "RQ..."
+RQ_FILTER = re.compile(
+    rf"""(?P<column>\b[\w.]*request_id)\s*(?:
+        IN\s*\((?P<ids>\s*["']{RQ_ID}["']\s*(?:,\s*["']{RQ_ID}["']\s*)*)\)
+        |=\s*["'](?P<id>{RQ_ID})["'])""",
+    re.IGNORECASE | re.VERBOSE,
+)
+LIMIT = re.compile(r"\bLIMIT\s+\d+", re.IGNORECASE)
+CURRENT_TIME = re.compile(r"\b(CURRENT_DATE|CURRENT_TIMESTAMP|CURRENT_DATETIME|NOW)\s*\(", re.IGNORECASE)
+# A date value: '2026-01-03', DATE('2026-01-03'), TIMESTAMP("2026-01-03 00:00:00")
+_DATE_VALUE = r"""(?:DATE|TIMESTAMP|DATETIME)?\s*\(?\s*['"](?P<{name}>\d{{4}}-\d{{2}}-\d{{2}})[^'"]*['"]\s*\)?"""
+# Upper bounds on a partition column (COLUMN is replaced per column)
+PARTITION_UPPER_BOUND = (
+    r"\bCOLUMN\b\s*\)?\s*(?P<op><=|<(?!>)|(?<![<>!])=|BETWEEN\s+" + _DATE_VALUE.format(name="low")
+    + r"\s+AND)\s*" + _DATE_VALUE.format(name="date")
+)
+PARTITION_IN = r"\bCOLUMN\b\s+IN\s*\((?P<dates>[^)]*)\)"
+ORDER_ITEM = re.compile(r"^(?P<field>[\w.]+)(?:\s+(?P<dir>ASC|DESC))?(?:\s+NULLS\s+(?P<nulls>FIRST|LAST))?$",
+                        re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    """Strip comments and collapse whitespace so formatting does not change the fingerprint."""
+    sql = re.sub(r"--[^\n]*", " ", sql)
+    sql = re.sub(r"/\*.*?\*/", " ", sql, flags=re.DOTALL)
+    return re.sub(r"\s+", " ", sql).strip().rstrip(";").strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha256(normalize_sql(sql).encode()).hexdigest()
+
+
+def partitions_closed(sql, today=None, partition_columns=DEFAULT_PARTITION_COLUMNS):
+    """True when the query only reads date partitions before today (UTC).
+
+    Only predicates on a partition column count: other date literals (e.g. a
+    created_at filter) don't bound the partitions read. A predicate joined
+    to the rest by OR (or UNION) at any nesting level doesn't bound them
+    either. Every remaining upper bound must be before today (`< today`
+    also qualifies).
+    """
+    today = today or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    if CURRENT_TIME.search(sql):
+        return False
+    bounds = []
+    for column in partition_columns:
+        column = re.escape(column)
+        for match in re.finditer(PARTITION_UPPER_BOUND.replace("COLUMN", column), sql, re.IGNORECASE):
+            if _and_only(sql, match.start()):
+                date = match.group("date")
+                bounds.append(date <= today if match.group("op") == "<" else date < today)
+        for match in re.finditer(PARTITION_IN.replace("COLUMN", column), sql, re.IGNORECASE):
+            if _and_only(sql, match.start()):
+                dates = re.findall(r"\d{4}-\d{2}-\d{2}", match.group("dates"))
+                bounds.append(bool(dates) and max(dates) < today)
+    return bool(bounds) and all(bounds)
+
+
+def _and_only(sql, position):
+    """Whether no OR/UNION joins the condition at position to its siblings.
+
+    OR is checked at every nesting level from the condition outwards, up to
+    the SELECT it belongs to (an enclosing query's OR filters that SELECT's
+    rows, it can't widen what it reads). UNION is checked at every level.
+    """
+    opened, spans = [], []
+    for index, char in enumerate(_top_level(sql, keep_parens=True)):
+        if char == "(":
+            opened.append(index)
+        elif char == ")" and opened:
+            start = opened.pop()
+            if start < position < index:
+                spans.append((start, index))
+    spans.extend((start, len(sql)) for start in reversed(opened) if start < position)
+    spans.append((-1, len(sql)))
+    own_select = True
+    for start, end in spans:
+        level = _top_level(sql[start + 1:end])
+        if re.search(r"\bUNION\b" if not own_select else r"\b(?:OR|UNION)\b", level, re.IGNORECASE):
+            return False
+        if re.search(r"\bSELECT\b", level, re.IGNORECASE):
+            own_select = False
+    return True
+
+
+def split_rq_filter(sql):
+    """Return (template, column, rq_ids) for a per-RQ-ID cacheable query, else None.
+
+    The template has the RQ filter replaced by '{rq_filter}'. Queries with
+    LIMIT are not split (a limit applies across IDs).
+    """
+    matches = list(RQ_FILTER.finditer(sql))
+    if len(matches) != 1 or LIMIT.search(sql):
+        return None
+    match = matches[0]
+    if match.group("ids"):
+        rq_ids = re.findall(RQ_ID, match.group("ids"))
+    else:
+        rq_ids = [match.group("id")]
+    template = sql[:match.start()] + "{rq_filter}" + sql[match.end():]
+    return template, match.group("column"), list(dict.fromkeys(rq_ids))
+
+
+def _top_level(sql, keep_parens=False):
+    """sql with parenthesized and quoted text blanked out (same length).
+
+    With keep_parens only quoted text is blanked, so the parentheses outside
+    string literals can be matched.
+    """
+    out, depth, quote = [], 0, None
+    for char in sql:
+        if quote:
+            out.append(" ")
+            if char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+            out.append(" ")
+        elif keep_parens:
+            out.append(char)
+        elif char == "(":
+            depth += 1
+            out.append(" ")
+        elif char == ")":
+            depth = max(0, depth - 1)
+            out.append(" ")
+        else:
+            out.append(char if depth == 0 else " ")
+    return "".join(out)
+
+
+def order_by_keys(sql):
+    """[(field, descending, nulls_first)] from the query's top-level ORDER BY.
+
+    [] without ORDER BY; None when an item is not a plain column (an
+    expression or position the cache can't re-sort rows by).
+    """
+    top = _top_level(sql)
+    matches = list(re.finditer(r"\bORDER\s+BY\b", top, re.IGNORECASE))
+    if not matches:
+        return []
+    start = matches[-1].end()
+    end = re.search(r"\b(?:LIMIT|OFFSET)\b", top[start:], re.IGNORECASE)
+    clause = sql[start:start + end.start()] if end else sql[start:]
+    if "(" in clause:
+        return None
+    keys = []
+    for item in clause.split(","):
+        match = ORDER_ITEM.match(item.strip().rstrip(";").strip())
+        if not match or match.group("field").isdigit():
+            return None
+        descending = (match.group("dir") or "").upper() == "DESC"
+        # BigQuery's default: NULLs first ascending, last descending
+        nulls = (match.group("nulls") or "").upper()
+        keys.append((match.group("field").split(".")[-1], descending,
+                     nulls == "FIRST" if nulls else not descending))
+    return keys
+
+
+def selected_fields(sql):
+    """Output field names of the top-level SELECT, or None if it selects * (or can't be read)."""
+    select = re.search(r"\bSELECT\b(.*?)\bFROM\b", _top_level(sql), re.IGNORECASE | re.DOTALL)
+    if not select:
+        return None
+    fields = set()
+    for item in sql[select.start(1):select.end(1)].split(","):
+        item = item.strip()
+        if item == "*" or item.endswith(".*"):
+            return None
+        alias = re.search(r"\bAS\s+(\w+)$", item, re.IGNORECASE)
+        bare = re.match(r"^(?:DISTINCT\s+)?[\w.]*?(\w+)$", item, re.IGNORECASE)
+        if alias or bare:
+            fields.add((alias or bare).group(1).lower())
+    return fields
+
+
+def sort_rows(rows, keys):
+    """Sort result rows like BigQuery would for ORDER BY keys (numbers numerically)."""
+    def value(row, field, nulls_first, descending):
+        raw = row.get(field)
+        # Sorted ascending then reversed for DESC: place NULLs so they end up where asked
+        null_rank = 0 if nulls_first != descending else 2
+        if raw is None:
+            return (null_rank,)
+        try:
+            return (1, 0, float(raw))
+        except (TypeError, ValueError):
+            return (1, 1, str(raw))
+
+    for field, descending, nulls_first in reversed(keys):
+        rows.sort(key=lambda row: value(row, field, nulls_first, descending), reverse=descending)
+    return rows
+
+
+def selected_id_field(sql, column):
+    """Name of the result field carrying the request ID, if the query selects it."""
+    select = re.search(r"\bSELECT\b(.*?)\bFROM\b", sql, re.IGNORECASE | re.DOTALL)
+    if not select:
+        return None
+    bare = column.split(".")[-1]
+    for item in select.group(1).split(","):
+        item = item.strip()
+        alias = re.match(rf"^(?:DISTINCT\s+)?[\w.]*\b{re.escape(bare)}(?:\s+AS\s+(\w+))?$", item, re.IGNORECASE)
+        if alias:
+            return alias.group(1) or bare
+        if item == "*":
+            return bare
+    return None
+
+
+class ResultCache:
+    """Cached BigQuery result rows stored in SQLite (WAL mode)."""
+
+    def __init__(self, path=CACHE_DB):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_many(self, keys, now=None):
+        """Return {key: rows} for keys with an unexpired entry."""
+        now = time.time() if now is None else now
+        keys = list(keys)
+        found = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for key, rows in self.conn.execute(
+                f"SELECT key, rows FROM results WHERE key IN ({placeholders}) AND expires_at > ?", chunk + [now]
+            ):
+                found[key] = json.loads(rows)
+        return found
+
+    def put_many(self, entries, ttl, now=None):
+        """Store {key: rows} for ttl seconds."""
+        now = time.time() if now is None else now
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO results (key, rows, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                [(key, json.dumps(rows), now, now + ttl) for key, rows in entries.items()]
+            )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def expire(self, now=None):
+        now = time.time() if now is None else now
+        return self.conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,)).rowcount
+
+    def clear(self):
+        return self.conn.execute("DELETE FROM results").rowcount
+
+    def stats(self):
+        now = time.time()
+        total, fresh, size = self.conn.execute(
+            "SELECT COUNT(*), SUM(expires_at > ?), SUM(LENGTH(rows)) FROM results", (now,)
+        ).fetchone()
+        return {"entries": total, "fresh": fresh or 0, "bytes": size or 0}
+
+
+def sortable(sql, keys):
+    """Whether rows of sql can be re-sorted by ORDER BY keys (all of them selected fields)."""
+    if keys is None:
+        return False
+    fields = selected_fields(sql)
+    return fields is None or all(field.lower() in fields for field, _, _ in keys)
+
+
+def cached_query(sql, cache=None, ttl_open=DEFAULT_TTL_OPEN, ttl_closed=DEFAULT_TTL_CLOSED,
+                 use_cache=True, runner=None, partition_columns=DEFAULT_PARTITION_COLUMNS):
+    """Run sql through the cache; returns (rows, summary dict).
+
+    `runner(sql)` returns the result rows (default: bq via bq_stream.run_query).
+    """
+    runner = runner or (lambda q: list(run_query(q)))
+    own_cache = cache is None
+    cache = cache or ResultCache()
+    try:
+        closed = partitions_closed(sql, partition_columns=partition_columns)
+        ttl = ttl_closed if closed else ttl_open
+        split = split_rq_filter(sql)
+        id_field = split and selected_id_field(split[0], split[1])
+        order = order_by_keys(sql)
+        if split and (id_field or len(split[2]) == 1) and sortable(sql, order):
+            return _cached_by_rq_id(sql, split, id_field, order, cache, ttl, closed, use_cache, runner)
+
+        key = fingerprint(sql)
+        hit = cache.get_many([key]).get(key) if use_cache else None
+        if hit is not None:
+            return hit, {"mode": "query", "cached": True, "queried": False, "closed": closed}
+        rows = runner(sql)
+        if closed or rows:
+            cache.put_many({key: rows}, ttl)
+        return rows, {"mode": "query", "cached": False, "queried": True, "closed": closed}
+    finally:
+        if own_cache:
+            cache.close()
+
+
+def _cached_by_rq_id(sql, split, id_field, order, cache, ttl, closed, use_cache, runner):
+    template, column, rq_ids = split
+    base = fingerprint(template)
+    keys = {rq_id: f"{base}:{rq_id}" for rq_id in rq_ids}
+    hits = cache.get_many(keys.values()) if use_cache else {}
+    results = {rq_id: hits[key] for rq_id, key in keys.items() if key in hits}
+    missing = [rq_id for rq_id in rq_ids if rq_id not in results]
+
+    queries = 0
+    for i in range(0, len(missing), MAX_IDS_PER_QUERY):
+        chunk = missing[i:i + MAX_IDS_PER_QUERY]
+        id_list = ", ".join(f'"{rq_id}"' for rq_id in chunk)
+        rows = runner(template.replace("{rq_filter}", f"{column} IN ({id_list})"))
+        queries += 1
+        fresh = {rq_id: [] for rq_id in chunk}
+        for row in rows:
+            rq_id = row.get(id_field) if id_field else chunk[0]
+            fresh.setdefault(rq_id, []).append(row)
+        # An RQ ID without rows may just not have been ingested yet
+        cache.put_many({keys[rq_id]: r for rq_id, r in fresh.items()
+                        if rq_id in keys and (r or closed)}, ttl)
+        results.update(fresh)
+
+    rows = [row for rq_id in rq_ids for row in results.get(rq_id, [])]
+    if order:
+        sort_rows(rows, order)
+    return rows, {
+        "mode": "rq_id",
+        "rq_ids": len(rq_ids),
+        "cached_ids": len(rq_ids) - len(missing),
+        "queried_ids": len(missing),
+        "queries": queries,
+        "closed": closed,
+    }
+
+
+def format_summary(summary):
+    scope = "closed partitions" if summary["closed"] else "open partitions"
+    if summary["mode"] == "rq_id":
+        return (f"[bq-cache] {summary['cached_ids']}/{summary['rq_ids']} RQ IDs from cache, "
+                f"{summary['queried_ids']} queried in {summary['queries']} query(s) ({scope})")
+    return f"[bq-cache] {'hit' if summary['cached'] else 'miss'} ({scope})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cached BigQuery queries for request ID lookups")
+    subparsers = parser.add_subparsers(dest="command", help="Commands")
+
+    query_parser = subparsers.add_parser("query", help="Run a query through the cache")
+    source = query_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--sql", help="Standard SQL query")
+    source.add_argument("--sql-file", help="File containing the query")
+    query_parser.add_argument("--no-cache", action="store_true", help="Always query BigQuery (still stores results)")
+    query_parser.add_argument("--ttl-open", type=int, default=DEFAULT_TTL_OPEN,
+                              help="Seconds to keep results that read today's partition")
+    query_parser.add_argument("--ttl-closed", type=int, default=DEFAULT_TTL_CLOSED,
+                              help="Seconds to keep results that only read closed partitions")
+    query_parser.add_argument("--partition-column", action="append",
+                              help="Partition column whose bounds decide freshness (repeatable, "
+                                   f"default: {', '.join(DEFAULT_PARTITION_COLUMNS)})")
+
+    subparsers.add_parser("stats", help="Cache entry counts")
+    clear_parser = subparsers.add_parser("clear", help="Delete cached results")
+    clear_parser.add_argument("--expired", action="store_true", help="Only delete expired entries")
+
+    args = parser.parse_args()
+
+    if args.command == "query":
+        sql = args.sql or Path(args.sql_file).read_text()
+        try:
+            rows, summary = cached_query(sql, ttl_open=args.ttl_open, ttl_closed=args.ttl_closed,
+                                         use_cache=not args.no_cache,
+                                         partition_columns=args.partition_column or DEFAULT_PARTITION_COLUMNS)
+        except BigQueryError as e:
+            print(f"BigQuery error: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(format_summary(summary), file=sys.stderr)
+        print(json.dumps(rows))
+    elif args.command == "stats":
+        with ResultCache() as cache:
+            stats = cache.stats()
+        print(f"Cache:    {CACHE_DB}")
+        print(f"Entries:  {stats['entries']} ({stats['fresh']} fresh)")
+        print(f"Size:     {stats['bytes'] / 1024:.1f} KiB")
+    elif args.command == "clear":
+        with ResultCache() as cache:
+            removed = cache.expire() if args.expired else cache.clear()
+        print(f"Deleted {removed} cached result(s)")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Streaming BigQuery Result Reader
+Yields rows from `bq query --format=json` output as they arrive.
+
+`bq` prints Python/SDK warnings before the JSON array, which the scanner used
+to strip with `grep '^\\['` into a temp file before json.load()ing the whole
+array. Here the output is decoded incrementally: leading lines are skipped
+until the one that opens the result array, then each row object is decoded
+with JSONDecoder.raw_decode as soon as it is complete. Memory is bounded by
+the read buffer and one row, and the first row is available while bq is
+still printing the rest.
+
+Usage (as a filter, prints one JSON row per line):
+    bq query --format=json ... | python3 bq_stream.py
+"""
+
+import codecs
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+# Characters read from the stream per refill
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+class BigQueryError(Exception):
+    """bq exited with an error or produced no result array."""
+
+
+def _array_start(line, complete):
+    """Whether a line opens the result array: True, False, or None (undecided yet).
+
+    The array opens with '[{', '[]' or a bare '[' line (prettyjson); warning
+    lines such as '[WARNING] ...' do not count.
+    """
+    stripped = line.strip()
+    if stripped.startswith(("[{", "[]")):
+        return True
+    if stripped in ("", "["):
+        return True if stripped and complete else (False if complete else None)
+    return False
+
+
+def _reader(stream, size):
+    """Return a read() that yields whatever text is available, up to size.
+
+    Binary streams (pipes) are read with read1 so a row is decoded as soon
+    as bq has written it, instead of waiting for a full chunk.
+    """
+    read1 = getattr(stream, "read1", None)
+    if read1 is None:
+        return lambda: stream.read(size)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def read():
+        data = read1(size)
+        return decoder.decode(data, final=not data)
+    return read
+
+
+def iter_json_rows(stream, chunk_size=CHUNK_SIZE):
+    """Yield row dicts from bq JSON output, skipping leading warning lines.
+
+    `stream` is a text stream or a binary one (e.g. a pipe or sys.stdin.buffer).
+    """
+    read = _reader(stream, chunk_size)
+
+    # Skip warnings: every line before the one that opens the array
+    buffer, start = "", 0
+    while True:
+        newline = buffer.find("\n", start)
+        line = buffer[start:] if newline < 0 else buffer[start:newline + 1]
+        opens = _array_start(line, complete=newline >= 0)
+        if opens:
+            buffer = buffer[start:].lstrip()[1:]
+            break
+        if opens is False and newline >= 0:
+            start = newline + 1
+            continue
+        # Current line incomplete: read more
+        chunk = read()
+        if not chunk:
+            raise BigQueryError("No JSON result array in bq output")
+        buffer, start = buffer[start:] + chunk, 0
+
+    pos = 0
+    eof = False
+    while True:
+        # Skip separators between rows
+        while pos < len(buffer) and (buffer[pos] in _WHITESPACE or buffer[pos] == ","):
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            if pos >= len(buffer):
+                raise ValueError("empty buffer")
+            row, end = _decoder.raw_decode(buffer, pos)
+        except ValueError:
+            # Row incomplete: refill (dropping consumed text) and retry
+            if eof:
+                raise BigQueryError("Truncated JSON result array in bq output")
+            chunk = read()
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield row
+        pos = end
+
+
+def parse_timestamp(value):
+    """bq JSON TIMESTAMP value -> epoch seconds (None if missing or unparseable).
+
+    Depending on the bq version TIMESTAMP columns come back as epoch seconds
+    ('1.7673E9') or as '2026-01-03 10:00:00[.ffffff][ UTC]'.
+    """
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    text = str(value).replace(" UTC", "").replace("Z", "+00:00").replace(" ", "T", 1)
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def run_query(sql, project=None, max_rows=None):
+    """Run a standard-SQL query with bq and yield result rows while it streams.
+
+    `max_rows` is passed to bq as --max_rows (bq's default is 100; None
+    lifts the cap). Raises BigQueryError if bq exits non-zero.
+    """
+    cmd = ["bq", "query", "--format=json", "--use_legacy_sql=false",
+           f"--max_rows={max_rows if max_rows else 1_000_000_000}"]
+    if project:
+        cmd.append(f"--project_id={project}")
+    cmd.append(sql)
+
+    env = {**os.environ, "CLOUDSDK_PYTHON_SITEPACKAGES": "1"}
+    # stderr goes to a file so a chatty bq cannot block on a full pipe
+    with tempfile.TemporaryFile(mode="w+") as stderr:
+        try:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, env=env)
+        except OSError as e:
+            raise BigQueryError(f"Could not run bq (is the Google Cloud SDK installed?): {e}") from None
+
+        def error_text(default):
+            proc.wait()
+            stderr.seek(0)
+            return stderr.read().strip() or default
+
+        try:
+            yield from iter_json_rows(proc.stdout)
+        except BigQueryError as e:
+            raise BigQueryError(error_text(str(e))) from None
+        except BaseException:
+            # Consumer stopped early: don't leave bq running
+            proc.terminate()
+            raise
+        finally:
+            proc.wait()
+            proc.stdout.close()
+        if proc.returncode:
+            raise BigQueryError(error_text(f"bq exited with {proc.returncode}"))
+
+
+def estimate_bytes(sql, project=None):
+    """Bytes the query would process, from a bq dry run (no cost, no rows).
+
+    Raises BigQueryError if the dry run fails (bad SQL, no access).
+    """
+    cmd = ["bq", "query", "--dry_run", "--format=json", "--use_legacy_sql=false"]
+    if project:
+        cmd.append(f"--project_id={project}")
+    cmd.append(sql)
+    env = {**os.environ, "CLOUDSDK_PYTHON_SITEPACKAGES": "1"}
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    except OSError as e:
+        raise BigQueryError(f"Could not run bq (is the Google Cloud SDK installed?): {e}") from None
+    if proc.returncode:
+        raise BigQueryError(proc.stderr.strip() or f"bq exited with {proc.returncode}")
+
+    # JSON job resource, or "... running this query will process N bytes of data."
+    start = proc.stdout.find("{")
+    if start >= 0:
+        try:
+            stats = json.loads(proc.stdout[start:])["statistics"]
+            return int(stats.get("totalBytesProcessed") or stats["query"]["totalBytesProcessed"])
+        except (ValueError, KeyError, TypeError):
+            pass
+    match = re.search(r"process (\d+) bytes", proc.stdout)
+    if not match:
+        raise BigQueryError(f"Could not read bytes processed from bq dry run: {proc.stdout.strip()[:200]}")
+    return int(match.group(1))
+
+
+def main():
+    for row in iter_json_rows(sys.stdin.buffer):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+BigQuery Error Normalizer
+Strips variable parts (IDs, numbers, dates, tokens, ...) from error messages
+so that occurrences of the same error share one signature.
+
+All rules are compiled into a single alternation regex and applied in one
+left-to-right scan instead of one re.sub pass per rule. Within the
+alternation, more specific rules are listed first, so at any position a
+TWILIO_SID wins over the generic SID rule and DATE/TIME/IP_ADDRESS/PHONE win
+over NUMBER (with sequential passes, the earlier generic rules consumed
+those tokens and the specific rules never matched).
+
+Results are memoized per raw message: log tables repeat the same error text
+many times, and a cache hit skips the regex scan entirely.
+
+Usage:
+    python3 error_normalizer.py "Connection timeout to 10.0.0.1 after 30s"
+    cat errors.txt | python3 error_normalizer.py [--level error] [--signature]
+"""
+
+import argparse
+import hashlib
+import re
+import sys
+from functools import lru_cache
+
+# (replacement, pattern) in precedence order: earlier rules win when two
+# rules could match at the same position.
+RULES = [
+    ("URL", r"https?://[^\s]+"),
+    ("JWT_TOKEN", r"eyJ[A-Za-z0-9_-]+\.eyJ[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+"),
+    ("BEARER_TOKEN", r"Bearer\s+[A-Za-z0-9_.-]+"),
+    ("EMAIL", r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b"),
+    ("UUID", r"[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}"),
+    ("REQUEST_ID", r"RQ[a-f0-9]{32}"),
+    ("TWILIO_SID", r"\b[A-Z]{2}[a-f0-9]{32}\b"),
+    ("SID", r"\b[A-Z]{2}[a-f0-9]+\b"),
+    ("HEX_STRING", r"\b[a-f0-9]{32,}\b"),
+    ("DATE", r"\d{4}-\d{2}-\d{2}|\d{2}/\d{2}/\d{4}"),
+    ("TIME", r"\d{2}:\d{2}:\d{2}"),
+    ("IP_ADDRESS", r"\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b"),
+    ("PHONE", r"\+\d{10,15}"),
+    ("PATH", r"/[\w/.-]+"),
+    ("NUMBER", r"\b\d+\b"),
+]
+
+# Raw messages memoized by normalize()
+CACHE_SIZE = 65536
+
+PATTERN = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in RULES))
+
+
+def _replace(match):
+    return match.lastgroup
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize(message):
+    """Return message with every variable part replaced by its placeholder."""
+    return PATTERN.sub(_replace, message)
+
+
+def signature(normalized_message, level=None):
+    """Stable 16-hex-digit signature of a normalized message and level."""
+    return hashlib.sha256(f"{normalized_message}|{level}".encode()).hexdigest()[:16]
+
+
+def cache_info():
+    """Hit/miss statistics of the normalize() cache."""
+    return normalize.cache_info()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalize error messages for signature matching")
+    parser.add_argument("message", nargs="?", help="Message to normalize (default: one per line on stdin)")
+    parser.add_argument("--level", help="Error level used in the signature")
+    parser.add_argument("--signature", action="store_true", help="Prefix each line with its signature")
+    args = parser.parse_args()
+
+    messages = [args.message] if args.message is not None else (line.rstrip("\n") for line in sys.stdin)
+    for message in messages:
+        normalized = normalize(message)
+        print(f"{signature(normalized, args.level)}  {normalized}" if args.signature else normalized)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+BigQuery Error Scan
+Streams query results through normalization and signature lookup and
+reports error patterns not seen before (Steps 4-7 of SKILL.md in one pass).
+
+Usage:
+    python3 scan_errors.py TABLE [--hours 4] [--incremental] [--error-column error] [--level-column level]
+                                 [--timestamp-column timestamp] [--partition-column PARTITIONDATE]
+                                 [--identity-column request_id] [--where "level = 'error'"] [--aggregate]
+    python3 scan_errors.py TABLE --sql "SELECT ..." [--max-rows N]
+    python3 scan_errors.py TABLE --sql-file query.sql
+    bq query --format=json ... | python3 scan_errors.py TABLE --input -
+    python3 scan_errors.py TABLE --input results.json
+
+Without --sql/--sql-file/--input the query is built from the column options
+(the Step 3 template in SKILL.md).
+
+Options:
+    --incremental                 Only query rows after the table's last watermark
+    --aggregate                   Group by coarse signature server-side (one row per group)
+    --overlap-minutes 10          Re-read this much before the watermark (late rows)
+    --error-field error_message   Row field holding the error text
+    --level-field error_level     Row field holding the severity
+    --ttl-days 7                  Signature expiry
+    --report PATH                 Scan report JSON (default /tmp/bq_scan_report_{table}.json)
+    --no-record                   Report without updating the signature store
+
+Rows are processed as bq prints them: a signature is checked against the
+store the first time it appears in the scan and NEW errors are printed
+immediately. Signature counts are written with one batched upsert at the
+end. Only one row per signature is kept in memory.
+
+Aggregate mode (--aggregate) pushes the grouping into BigQuery: the built
+query replaces UUIDs, SIDs, long hex IDs and digit runs with REGEXP_REPLACE
+and groups on the result, returning one row per coarse signature with
+count, first_seen, last_seen and a sample message. Only those rows are
+downloaded; the client normalizer then runs on each sample and merges
+groups that normalize alike. Counts cover every matching row, so there is
+no need for a row cap. Grouped rows can't be matched to rows an earlier
+scan counted, so aggregate scans cover the --hours window, can't be
+combined with --incremental and never move the watermark.
+
+Incremental scans query (watermark - overlap, now] instead of the full
+--hours window, then move the watermark (kept in the signature store) to
+now. A non-incremental scan only moves it when its window reaches back to
+the watermark, and a scan cut short by --limit/--max-rows never does.
+Rows in the overlap that an earlier scan already counted are recognised
+by their row key and skipped, so repeated scans merge idempotently.
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from bq_stream import BigQueryError, iter_json_rows, parse_timestamp, run_query
+from error_normalizer import cache_info, normalize, signature
+from signature_store import DEFAULT_TTL_DAYS, STORE_DIR, iso, open_store, table_slug
+
+REPORT_FILE = str(STORE_DIR / "bq_scan_report_{slug}.json")
+
+# Server-side (RE2) pre-normalization for --aggregate, applied in order.
+# Deliberately coarser than error_normalizer: the client refines each group.
+COARSE_RULES = [
+    (r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}", "UUID"),
+    (r"\b[A-Z]{2}[0-9a-f]{32}\b", "SID"),
+    (r"\b[0-9a-fA-F]{16,}\b", "HEX"),
+    (r"[0-9]+", "N"),
+]
+
+# Incremental scans never reach back further than the signature TTL
+MAX_LOOKBACK_SECONDS = DEFAULT_TTL_DAYS * 86400
+DEFAULT_OVERLAP_MINUTES = 10
+
+
+def sql_timestamp(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def window_conditions(start, end, error_column, timestamp_column, partition_column, where):
+    conditions = [f"{error_column} IS NOT NULL"]
+    if partition_column:
+        start_date = datetime.fromtimestamp(start, timezone.utc).strftime("%Y-%m-%d")
+        conditions.append(f"{partition_column} >= DATE('{start_date}')")
+    conditions.append(f"{timestamp_column} > TIMESTAMP('{sql_timestamp(start)}')")
+    conditions.append(f"{timestamp_column} <= TIMESTAMP('{sql_timestamp(end)}')")
+    if where:
+        conditions.append(f"({where})")
+    return conditions
+
+
+def build_query(table, start, end, error_column="error", level_column="level",
+                timestamp_column="timestamp", partition_column="PARTITIONDATE",
+                identity_column=None, where=None, limit=None):
+    """Step 3 query for rows with start < timestamp <= end (epoch seconds)."""
+    select = [f"{timestamp_column} AS timestamp", f"{error_column} AS error_message"]
+    if level_column:
+        select.append(f"{level_column} AS error_level")
+    if identity_column:
+        select.append(f"{identity_column} AS identity")
+    conditions = window_conditions(start, end, error_column, timestamp_column, partition_column, where)
+    sql = "SELECT\n  " + ",\n  ".join(select) + f"\nFROM `{table}`\n"
+    sql += "WHERE " + "\n  AND ".join(conditions)
+    if limit:
+        sql += f"\nORDER BY {timestamp_column} DESC\nLIMIT {limit}"
+    return sql
+
+
+def coarse_normalization(column):
+    """SQL expression applying COARSE_RULES to a column, innermost rule first."""
+    expression = column
+    for pattern, replacement in COARSE_RULES:
+        expression = f"REGEXP_REPLACE({expression}, r'{pattern}', '{replacement}')"
+    return expression
+
+
+def build_aggregate_query(table, start, end, error_column="error", level_column="level",
+                          timestamp_column="timestamp", partition_column="PARTITIONDATE",
+                          identity_column=None, where=None, limit=None):
+    """Step 3 query grouped server-side: one row per coarse signature.
+
+    Rows carry count, first_seen, last_seen and a sample error_message (and
+    identity), most frequent first.
+    """
+    select = [
+        f"{coarse_normalization(error_column)} AS coarse_message",
+        f"{level_column} AS error_level" if level_column else "CAST(NULL AS STRING) AS error_level",
+        "COUNT(*) AS count",
+        f"MIN({timestamp_column}) AS first_seen",
+        f"MAX({timestamp_column}) AS last_seen",
+        f"ANY_VALUE({error_column}) AS error_message",
+    ]
+    if identity_column:
+        select.append(f"ANY_VALUE({identity_column}) AS identity")
+    conditions = window_conditions(start, end, error_column, timestamp_column, partition_column, where)
+    sql = "SELECT\n  " + ",\n  ".join(select) + f"\nFROM `{table}`\n"
+    sql += "WHERE " + "\n  AND ".join(conditions)
+    sql += "\nGROUP BY coarse_message, error_level\nORDER BY count DESC"
+    if limit:
+        sql += f"\nLIMIT {limit}"
+    return sql
+
+
+class IncrementalWindow:
+    """Time window of a built-query scan and the overlap bookkeeping for it.
+
+    Non-incremental windows cover the last `hours`. They only advance the
+    watermark when they reach back to it (or there is none yet); a window
+    that starts after the watermark would leave the rows in between unread.
+    A scan capped by `row_cap` (SQL LIMIT or --max-rows) that returned that
+    many rows may have dropped some, so it never advances the watermark.
+    """
+
+    def __init__(self, store, scope, hours, overlap_minutes=DEFAULT_OVERLAP_MINUTES, incremental=True, now=None,
+                 row_cap=None):
+        self.store = store
+        self.scope = scope
+        self.end = time.time() if now is None else now
+        self.overlap = overlap_minutes * 60
+        self.row_cap = row_cap
+        mark = store.get_watermark(scope)
+        self.stored = mark[0] if mark else None
+        self.previous, self.previous_overlap = (mark if incremental else None) or (None, 0)
+        if self.previous is None:
+            self.start = self.end - hours * 3600
+        else:
+            self.start = max(self.previous - self.overlap, self.end - MAX_LOOKBACK_SECONDS)
+        self.row_keys = {}
+        self.rows = 0
+        self.duplicates = 0
+
+    @property
+    def truncated(self):
+        return bool(self.row_cap) and self.rows >= self.row_cap
+
+    def already_counted(self, row):
+        """True for a re-read overlap row an earlier scan counted; remembers keys for the next overlap."""
+        self.rows += 1
+        ts = parse_timestamp(row.get("timestamp"))
+        if ts is None:
+            return False
+        key = hashlib.sha256(
+            f"{row.get('timestamp')}|{row.get('identity')}|{row.get('error_message')}".encode()
+        ).hexdigest()[:24]
+        if self.previous is not None and ts <= self.previous:
+            # Before the previous overlap every row was counted; inside it, only remembered ones
+            if ts < self.previous - self.previous_overlap or self.store.seen_rows(self.scope, [key]):
+                self.duplicates += 1
+                return True
+        if ts >= self.end - self.overlap:
+            self.row_keys[key] = ts
+        return False
+
+    def commit(self):
+        """Advance the scope's watermark to the window end; returns whether it moved."""
+        if self.truncated:
+            return False
+        if self.previous is None and self.stored is not None and self.start > self.stored:
+            return False
+        self.store.advance_watermark(self.scope, self.end, self.row_keys, self.overlap)
+        return True
+
+
+def scan_rows(rows, store, error_field="error_message", level_field="error_level", on_new=None, window=None,
+              count_field=None):
+    """Normalize and look up each row's signature; returns {hash: observation}.
+
+    Each observation holds normalized_message, sample_error, level, count,
+    new (not in the store when first seen) and, for new signatures, the
+    first row. `on_new(hash, observation)` is called as soon as a new
+    signature is found. With an IncrementalWindow, overlap rows counted by
+    the previous scan are skipped.
+
+    With `count_field` each row stands for that many errors (an
+    --aggregate group): its sample is normalized, groups that normalize
+    alike are merged, and first_seen/last_seen are kept per signature.
+    """
+    observations = {}
+    for row in rows:
+        if window and window.already_counted(row):
+            continue
+        message = row.get(error_field) or row.get("error") or json.dumps(row)
+        level = row.get(level_field)
+        normalized = normalize(message)
+        signature_hash = signature(normalized, level)
+
+        obs = observations.get(signature_hash)
+        if obs is None:
+            obs = observations[signature_hash] = {
+                "normalized_message": normalized,
+                "sample_error": message,
+                "level": level,
+                "count": 0,
+                "new": not store.existing([signature_hash]),
+            }
+            if count_field:
+                obs.update(first_seen=None, last_seen=None, groups=0)
+            if obs["new"]:
+                obs["row"] = row
+                if on_new:
+                    on_new(signature_hash, obs)
+        if count_field:
+            obs["count"] += int(row.get(count_field) or 0)
+            obs["groups"] += 1
+            first, last = parse_timestamp(row.get("first_seen")), parse_timestamp(row.get("last_seen"))
+            if first is not None and (obs["first_seen"] is None or iso(first) < obs["first_seen"]):
+                obs["first_seen"] = iso(first)
+            if last is not None and (obs["last_seen"] is None or iso(last) > obs["last_seen"]):
+                obs["last_seen"] = iso(last)
+        else:
+            obs["count"] += 1
+    return observations
+
+
+def signature_records(observations):
+    """The store.record() input for scan_rows observations."""
+    fields = ("normalized_message", "sample_error", "level", "count", "first_seen", "last_seen")
+    return {h: {k: obs[k] for k in fields if obs.get(k) is not None} for h, obs in observations.items()}
+
+
+def print_new(signature_hash, obs):
+    print(f"NEW  {signature_hash}  [{obs['level'] or '-'}] {obs['normalized_message']}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan BigQuery error rows for new error signatures")
+    parser.add_argument("table", help="Scanned table (project.dataset.table); selects the signature store")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--sql", help="Query to run with bq")
+    source.add_argument("--sql-file", help="File containing the query to run with bq")
+    source.add_argument("--input", help="bq --format=json output file, or - for stdin")
+    parser.add_argument("--max-rows", type=int, help="Row cap passed to bq (default: no cap)")
+    parser.add_argument("--hours", type=float, default=4, help="Time window to scan (first scan when incremental)")
+    parser.add_argument("--incremental", action="store_true", help="Only scan rows after the last watermark")
+    parser.add_argument("--overlap-minutes", type=float, default=DEFAULT_OVERLAP_MINUTES,
+                        help="Re-read this much before the watermark for late-arriving rows")
+    parser.add_argument("--error-column", default="error", help="Error message column (built query)")
+    parser.add_argument("--level-column", default="level", help="Severity column (built query)")
+    parser.add_argument("--timestamp-column", default="timestamp", help="Timestamp column (built query)")
+    parser.add_argument("--partition-column", default="PARTITIONDATE", help="Partition column, '' for none")
+    parser.add_argument("--identity-column", help="Correlation column, e.g. request_id (built query)")
+    parser.add_argument("--where", help="Extra WHERE condition (built query)")
+    parser.add_argument("--limit", type=int, help="SQL LIMIT for the built query")
+    parser.add_argument("--aggregate", action="store_true",
+                        help="Group by coarse signature in BigQuery; one row per group with count")
+    parser.add_argument("--error-field", default="error_message", help="Row field holding the error text")
+    parser.add_argument("--level-field", default="error_level", help="Row field holding the severity")
+    parser.add_argument("--ttl-days", type=int, default=DEFAULT_TTL_DAYS, help="Signature expiry in days")
+    parser.add_argument("--report", help="Scan report JSON path")
+    parser.add_argument("--no-record", action="store_true", help="Do not update the signature store")
+    args = parser.parse_args()
+
+    built = not (args.input or args.sql or args.sql_file)
+    if args.incremental and not built:
+        parser.error("--incremental builds its own query; use the column options instead of --sql/--input")
+    if args.aggregate and not built:
+        parser.error("--aggregate builds its own query; use the column options instead of --sql/--input")
+    if args.aggregate and args.incremental:
+        parser.error("--aggregate can't be combined with --incremental (grouped rows have no row keys "
+                     "to skip rows an earlier scan counted)")
+
+    start = time.monotonic()
+    with open_store(args.table, args.ttl_days) as store:
+        window = None
+        if args.input:
+            stream = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+            rows = iter_json_rows(stream)
+        else:
+            if built:
+                scope = f"{args.timestamp_column}|{args.where or ''}"
+                window = IncrementalWindow(store, scope, args.hours, args.overlap_minutes, args.incremental,
+                                           row_cap=min(filter(None, (args.limit, args.max_rows)), default=None))
+                query_builder = build_aggregate_query if args.aggregate else build_query
+                sql = query_builder(args.table, window.start, window.end, args.error_column, args.level_column,
+                                    args.timestamp_column, args.partition_column, args.identity_column,
+                                    args.where, args.limit)
+                if window.previous is not None:
+                    print(f"Incremental scan since {iso(window.start)} "
+                          f"(watermark {iso(window.previous)} - {args.overlap_minutes:g}m overlap)")
+            else:
+                sql = args.sql or Path(args.sql_file).read_text()
+            print(f"=== BIGQUERY QUERY ===\n{sql}\n", flush=True)
+            rows = run_query(sql, max_rows=args.max_rows)
+
+        try:
+            observations = scan_rows(rows, store, args.error_field, args.level_field, on_new=print_new,
+                                     window=window, count_field="count" if args.aggregate else None)
+        except BigQueryError as e:
+            print(f"BigQuery error: {e}", file=sys.stderr)
+            sys.exit(1)
+        if not args.no_record:
+            store.record(signature_records(observations))
+            # An aggregate scan's groups can't be told apart from rows a later overlap re-reads
+            if window and not args.aggregate and not window.commit() and window.truncated:
+                print(f"Watermark not advanced: result hit the {window.row_cap}-row cap", file=sys.stderr)
+    elapsed = time.monotonic() - start
+
+    new = {h: obs for h, obs in observations.items() if obs["new"]}
+    total = sum(obs["count"] for obs in observations.values())
+    report = {
+        "table": args.table,
+        "scanned_at": iso(time.time()),
+        "total_errors": total,
+        "window": {"start": iso(window.start), "end": iso(window.end)} if window else None,
+        "overlap_duplicates": window.duplicates if window else 0,
+        "aggregated_groups": sum(obs["groups"] for obs in observations.values()) if args.aggregate else None,
+        "signatures": len(observations),
+        "new": [{"signature": h, **obs} for h, obs in new.items()],
+        "seen_before": [
+            {"signature": h, "normalized_message": obs["normalized_message"], "count": obs["count"],
+             **({"first_seen": obs["first_seen"], "last_seen": obs["last_seen"]} if args.aggregate else {})}
+            for h, obs in sorted(observations.items(), key=lambda item: -item[1]["count"])
+            if not obs["new"]
+        ],
+    }
+    report_path = args.report or REPORT_FILE.format(slug=table_slug(args.table))
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    info = cache_info()
+    print(f"\nTotal errors found: {total}")
+    if args.aggregate:
+        print(f"Server-side groups: {report['aggregated_groups']} -> {len(observations)} signature(s)")
+    print(f"UNIQUE errors (new patterns): {len(new)}")
+    print(f"Seen before: {len(observations) - len(new)} pattern(s)")
+    if window and window.duplicates:
+        print(f"Skipped {window.duplicates} overlap row(s) counted by the previous scan")
+    print(f"Processed in {elapsed:.2f}s (normalizer cache: {info.hits} hits, {info.misses} misses)")
+    print(f"Report: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Error Signature Store
+SQLite-backed database of error signatures seen by the BigQuery error
+scanner, one database per scanned table.
+
+Replaces /tmp/bigquery_error_signatures_{project}_{dataset}_{table}.json,
+which was loaded whole, expired in Python by string-comparing expires_at and
+rewritten whole after every scan. Here a scan only touches the signatures
+it saw: lookups are primary-key probes on the signature hash, counts and
+last_seen are updated with one batched upsert in a single transaction, and
+expiry is a range delete on the indexed expires_at column. The cost of a
+scan no longer grows with the number of signatures stored.
+
+The store also keeps the table's scan high-water marks for incremental
+scans. Each scan re-reads a short overlap before the previous watermark to
+catch late-arriving rows; the keys of rows in that overlap are remembered so
+re-read rows are not counted twice.
+
+Usage:
+    python3 signature_store.py TABLE stats
+    python3 signature_store.py TABLE show [--search timeout] [--limit 20]
+    python3 signature_store.py TABLE expire
+    python3 signature_store.py TABLE reset
+    python3 signature_store.py TABLE export [PATH]
+    python3 signature_store.py TABLE watermarks [--clear]
+
+TABLE is project.dataset.table. A legacy JSON signature file for the table
+is imported automatically the first time its store is opened.
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Where per-table stores (and legacy JSON files) live
+STORE_DIR = Path("/tmp")
+
+# Seconds to wait for another process holding the write lock
+BUSY_TIMEOUT = 30
+
+# Signatures not seen for this long expire, so returning errors resurface
+DEFAULT_TTL_DAYS = 7
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    hash               TEXT PRIMARY KEY,
+    normalized_message TEXT NOT NULL,
+    sample_error       TEXT,
+    level              TEXT,
+    first_seen         TEXT NOT NULL,
+    last_seen          TEXT NOT NULL,
+    expires_at         REAL NOT NULL,
+    count              INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_signatures_expires_at ON signatures(expires_at);
+
+CREATE TABLE IF NOT EXISTS watermarks (
+    scope      TEXT PRIMARY KEY,
+    watermark  REAL NOT NULL,
+    overlap    REAL NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS scanned_rows (
+    scope   TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    ts      REAL NOT NULL,
+    PRIMARY KEY (scope, row_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_scanned_rows_scope_ts ON scanned_rows(scope, ts);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+UPSERT = """
+INSERT INTO signatures (hash, normalized_message, sample_error, level, first_seen, last_seen, expires_at, count)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(hash) DO UPDATE SET
+    count = count + excluded.count,
+    last_seen = MAX(last_seen, excluded.last_seen),
+    expires_at = MAX(expires_at, excluded.expires_at)
+"""
+
+
+def iso(ts):
+    """Epoch seconds -> '2026-01-03T10:00:00Z'."""
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_iso(value):
+    """'2026-01-03T10:00:00Z' (or with fractional seconds/offset) -> epoch seconds."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def table_slug(table):
+    """project.dataset.table -> project_dataset_table (the legacy file naming)."""
+    return table.replace(":", ".").replace(".", "_")
+
+
+def store_path(table):
+    return STORE_DIR / f"bigquery_error_signatures_{table_slug(table)}.db"
+
+
+def legacy_path(table):
+    return STORE_DIR / f"bigquery_error_signatures_{table_slug(table)}.json"
+
+
+class SignatureStore:
+    """Error signatures of one table stored in SQLite (WAL mode)."""
+
+    def __init__(self, path, ttl_days=DEFAULT_TTL_DAYS):
+        self.path = Path(path)
+        self.ttl = ttl_days * 86400
+        self.conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction that takes the database write lock up front."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def expire(self, now=None):
+        """Delete signatures past expires_at (indexed range delete); returns how many."""
+        now = time.time() if now is None else now
+        return self.conn.execute("DELETE FROM signatures WHERE expires_at <= ?", (now,)).rowcount
+
+    def existing(self, hashes, now=None):
+        """Return the subset of hashes with an unexpired signature."""
+        now = time.time() if now is None else now
+        hashes = list(hashes)
+        found = set()
+        # Chunk to stay under SQLite's bound-parameter limit
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(row[0] for row in self.conn.execute(
+                f"SELECT hash FROM signatures WHERE hash IN ({placeholders}) AND expires_at > ?",
+                chunk + [now]
+            ))
+        return found
+
+    def record(self, observations, now=None):
+        """Upsert a scan's signatures in one transaction; returns the hashes that were new.
+
+        `observations` maps hash -> dict with normalized_message, sample_error,
+        level, count (occurrences in this scan) and optionally first_seen and
+        last_seen (ISO timestamps; default to now). Expired signatures are deleted first,
+        so an error that returns after the TTL is reported as new again.
+        """
+        now = time.time() if now is None else now
+        expires_at = now + self.ttl
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM signatures WHERE expires_at <= ?", (now,))
+            new = set(observations) - self.existing(observations, now)
+            conn.executemany(UPSERT, [
+                (h, o["normalized_message"], o.get("sample_error"), o.get("level"),
+                 o.get("first_seen") or o.get("last_seen") or iso(now), o.get("last_seen") or iso(now),
+                 expires_at, o.get("count", 1))
+                for h, o in observations.items()
+            ])
+        return new
+
+    def get(self, signature_hash):
+        row = self.conn.execute("SELECT * FROM signatures WHERE hash = ?", (signature_hash,)).fetchone()
+        return self._entry(row) if row else None
+
+    def _entry(self, row):
+        entry = dict(row)
+        entry["expires_at"] = iso(entry["expires_at"])
+        return entry
+
+    def list(self, search=None, limit=None):
+        """Signatures by most recently seen, optionally filtered by message substring."""
+        sql, params = "SELECT * FROM signatures", []
+        if search:
+            sql += " WHERE normalized_message LIKE ? OR sample_error LIKE ?"
+            params += [f"%{search}%", f"%{search}%"]
+        sql += " ORDER BY last_seen DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._entry(row) for row in self.conn.execute(sql, params)]
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def reset(self):
+        """Forget every signature (all errors are new on the next scan)."""
+        with self.transaction() as conn:
+            return conn.execute("DELETE FROM signatures").rowcount
+
+    def get_watermark(self, scope="default"):
+        """(watermark, overlap) in seconds for `scope`, or None if never scanned.
+
+        Rows up to watermark - overlap were counted by earlier scans; rows in
+        the overlap were counted if their key is in scanned_rows.
+        """
+        row = self.conn.execute("SELECT watermark, overlap FROM watermarks WHERE scope = ?", (scope,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def watermarks(self):
+        return [dict(row) for row in self.conn.execute("SELECT * FROM watermarks ORDER BY scope")]
+
+    def clear_watermarks(self):
+        """Forget watermarks (next scans use the full time window)."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM scanned_rows")
+            return conn.execute("DELETE FROM watermarks").rowcount
+
+    def seen_rows(self, scope, row_keys):
+        """Return the subset of row_keys already counted by an earlier scan of `scope`."""
+        row_keys = list(row_keys)
+        found = set()
+        for i in range(0, len(row_keys), 500):
+            chunk = row_keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(row[0] for row in self.conn.execute(
+                f"SELECT row_key FROM scanned_rows WHERE scope = ? AND row_key IN ({placeholders})", [scope] + chunk
+            ))
+        return found
+
+    def advance_watermark(self, scope, watermark, row_keys, overlap):
+        """Move `scope` to `watermark` after a scan, remembering rows the next overlap re-reads.
+
+        `row_keys` maps row key -> row timestamp (epoch seconds) for rows
+        counted by this scan; only those inside the next overlap window are
+        kept, and the scope's older keys are dropped with an indexed range
+        delete. Other scopes' keys are left alone.
+        """
+        horizon = watermark - overlap
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM scanned_rows WHERE scope = ? AND ts < ?", (scope, horizon))
+            conn.executemany("INSERT OR IGNORE INTO scanned_rows (scope, row_key, ts) VALUES (?, ?, ?)",
+                             [(scope, key, ts) for key, ts in row_keys.items() if ts >= horizon])
+            conn.execute(
+                "INSERT INTO watermarks (scope, watermark, overlap, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(scope) DO UPDATE SET watermark = excluded.watermark, "
+                "overlap = excluded.overlap, updated_at = excluded.updated_at "
+                "WHERE excluded.watermark >= watermark",
+                (scope, watermark, overlap, iso(time.time()))
+            )
+
+    def get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def import_json(self, json_path):
+        """Import a legacy {hash: {...}} signature file; returns how many signatures were read."""
+        with open(json_path) as f:
+            data = json.load(f)
+        rows = []
+        for h, sig in data.items():
+            expires = sig.get("expires_at")
+            rows.append((
+                h, sig.get("normalized_message", ""), sig.get("sample_error"), sig.get("level"),
+                sig.get("first_seen", ""), sig.get("last_seen", ""),
+                parse_iso(expires) if expires else time.time() + self.ttl, sig.get("count", 1)
+            ))
+        with self.transaction() as conn:
+            conn.executemany(UPSERT, rows)
+        return len(rows)
+
+    def export_json(self, json_path):
+        """Write signatures in the legacy JSON format."""
+        data = {entry.pop("hash"): entry for entry in self.list()}
+        with open(json_path, "w") as f:
+            json.dump(data, f, indent=2)
+        return len(data)
+
+
+def open_store(table, ttl_days=DEFAULT_TTL_DAYS):
+    """Open the store for a table, importing its legacy JSON signature file once."""
+    store = SignatureStore(store_path(table), ttl_days)
+    legacy = legacy_path(table)
+    if legacy.exists() and not store.get_meta("json_imported"):
+        store.import_json(legacy)
+        store.set_meta("json_imported", iso(time.time()))
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage BigQuery error signature stores")
+    parser.add_argument("table", help="Scanned table (project.dataset.table)")
+    subparsers = parser.add_subparsers(dest="command", help="Commands")
+
+    subparsers.add_parser("stats", help="Signature count and store location")
+    show_parser = subparsers.add_parser("show", help="List signatures, most recently seen first")
+    show_parser.add_argument("--search", help="Substring of the normalized or sample message")
+    show_parser.add_argument("--limit", type=int, default=20, help="Max signatures")
+    subparsers.add_parser("expire", help="Delete expired signatures")
+    subparsers.add_parser("reset", help="Delete all signatures (see all errors as new)")
+    export_parser = subparsers.add_parser("export", help="Write signatures as legacy JSON")
+    export_parser.add_argument("path", nargs="?", help="Output path (default: legacy JSON path)")
+    watermarks_parser = subparsers.add_parser("watermarks", help="Show incremental scan watermarks")
+    watermarks_parser.add_argument("--clear", action="store_true", help="Forget watermarks (next scan is a full scan)")
+
+    args = parser.parse_args()
+
+    with open_store(args.table) as store:
+        if args.command == "stats":
+            print(f"Store:       {store.path}")
+            print(f"Signatures:  {store.count()}")
+        elif args.command == "show":
+            print(json.dumps(store.list(args.search, args.limit), indent=2))
+        elif args.command == "expire":
+            print(f"Expired {store.expire()} signature(s)")
+        elif args.command == "reset":
+            print(f"Deleted {store.reset()} signature(s)")
+        elif args.command == "export":
+            path = args.path or legacy_path(args.table)
+            print(f"Exported {store.export_json(path)} signature(s) to {path}")
+        elif args.command == "watermarks":
+            if args.clear:
+                print(f"Cleared {store.clear_watermarks()} watermark(s)")
+            for mark in store.watermarks():
+                print(f"{mark['scope']}: {iso(mark['watermark'])} (updated {mark['updated_at']})")
+        else:
+            parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
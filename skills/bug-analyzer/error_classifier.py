@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Project Error Pattern Classifier
+Classifies errors against a project's `error_patterns` from the project
+registry (the project-specific part of Step 3 / 3.5) without trying each
+regex in turn for every error.
+
+Usage:
+    python3 error_classifier.py --project ottm "Meta API error: phone already registered"
+    python3 error_classifier.py --project ottm --report /tmp/bq_scan_report_{table}.json [--json]
+    python3 error_classifier.py --project ottm --report /tmp/bq_fanout_report.json
+    cat errors.txt | python3 error_classifier.py --project ottm
+
+Each pattern is compiled once and indexed by the longest literal it
+requires (e.g. "phone already registered" for
+"Meta API.*phone already registered"). An error is only run against the
+patterns whose literal occurs in it (plus the few patterns without a
+required literal), instead of against every pattern. Precedence is fixed:
+`expected` before `bugs` (Step 3.5: known non-bug patterns and external
+failures first), then registry order within a category. When both
+categories match, the result is flagged as a conflict (confidence factor
+"Multiple patterns match").
+
+Results are memoized per normalized signature (error_normalizer), so each
+distinct error is classified once however many occurrences it has. The
+normalizer replaces digits and IDs, so the memo key also holds the parts
+of the raw message the patterns can tell apart: the variable literals the
+patterns spell out (e.g. "136024" in "OAuthException.*code.*136024") that
+occur in it, and the match results of the few patterns using character
+classes such as \d.
+
+Errors no project pattern matches are `unmatched`: classify them with the
+universal rules in SKILL.md.
+"""
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+SKILLS_DIR = Path(__file__).parent.resolve().parent
+sys.path.insert(0, str(SKILLS_DIR / "bigquery-error-scanner"))
+sys.path.insert(0, str(SKILLS_DIR / "auto-bug-detector"))
+from error_normalizer import normalize  # noqa: E402
+from project_registry import REGISTRY_FILE, RegistryError, load_registry  # noqa: E402
+
+# Category precedence (first wins) and the classification each maps to
+CATEGORIES = (("expected", "EXPECTED"), ("bugs", "BUG"))
+
+# Registry patterns match the way the analyzer reads them: case-insensitively
+PATTERN_FLAGS = re.IGNORECASE
+
+_METACHARS = set(".^$*+?{}[]|()")
+_QUANTIFIERS = set("*+?{")
+# Escapes and classes that match the variable text the normalizer replaces
+CLASS_SYNTAX = re.compile(r"\\[dDwW]|\[")
+
+
+def required_literal(pattern):
+    """Longest literal substring every match of pattern must contain ('' if none is certain).
+
+    Only top-level literal runs count: groups, classes, escapes like \\d and
+    quantified characters end a run, and a top-level '|' means nothing is
+    required.
+    """
+    runs, run, i = [], "", 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            if escaped.isalnum():
+                runs.append(run)
+                run = ""
+            else:
+                run += escaped
+            i += 2
+        elif char in _QUANTIFIERS:
+            # The quantifier makes the previous character optional or repeated
+            runs.append(run[:-1])
+            run = ""
+            i = pattern.find("}", i) + 1 if char == "{" and "}" in pattern[i:] else i + 1
+        elif char in "([":
+            runs.append(run)
+            run = ""
+            close = ")" if char == "(" else "]"
+            depth = 0
+            while i < len(pattern):
+                if pattern[i] == "\\":
+                    i += 2
+                    continue
+                if pattern[i] == char and close == ")":
+                    depth += 1
+                elif pattern[i] == close:
+                    depth -= 1
+                    if depth <= 0:
+                        break
+                i += 1
+            i += 1
+        elif char == "|":
+            return ""
+        elif char in _METACHARS:
+            runs.append(run)
+            run = ""
+            i += 1
+        else:
+            run += char
+            i += 1
+    runs.append(run)
+    return max(runs, key=len).lower()
+
+
+def variable_literals(pattern):
+    """Literal tokens of pattern that normalize() would replace (numbers, IDs, paths, ...), lowercased."""
+    text = re.sub(r"\\[A-Za-z]", " ", pattern)
+    tokens = re.findall(r"[\w@/:%-]+", re.sub(r"\\(.)", r"\1", text))
+    return {token.lower() for token in tokens if normalize(token) != token}
+
+
+class ProjectClassifier:
+    """One project's error patterns, compiled and indexed by required literal."""
+
+    def __init__(self, project_id, error_patterns):
+        self.project_id = project_id
+        self.rules = []
+        self.invalid = []
+        for category, classification in CATEGORIES:
+            for entry in (error_patterns or {}).get(category) or []:
+                pattern = entry["pattern"]
+                try:
+                    regex = re.compile(pattern, PATTERN_FLAGS)
+                except re.error as e:
+                    self.invalid.append({"pattern": pattern, "error": str(e)})
+                    continue
+                self.rules.append({
+                    "category": category,
+                    "classification": classification,
+                    "pattern": pattern,
+                    "reason": entry.get("reason", ""),
+                    "regex": regex,
+                    "literal": required_literal(pattern),
+                })
+        # literal -> indexes of the rules requiring it; rules without one are always tried
+        self.index = {}
+        self.always = []
+        for position, rule in enumerate(self.rules):
+            if rule["literal"]:
+                self.index.setdefault(rule["literal"], []).append(position)
+            else:
+                self.always.append(position)
+        # Parts of a raw message the normalized form loses but a pattern may depend on
+        self.variable = sorted(set().union(*(variable_literals(rule["pattern"]) for rule in self.rules)))
+        self.class_rules = [rule for rule in self.rules if CLASS_SYNTAX.search(rule["pattern"])]
+        self._cache = {}
+
+    def candidates(self, message):
+        """Indexes of rules that can match message, in precedence order."""
+        lowered = message.lower()
+        found = list(self.always)
+        for literal, positions in self.index.items():
+            if literal in lowered:
+                found.extend(positions)
+        return sorted(found)
+
+    def matches(self, message):
+        """All rules matching message, in precedence order."""
+        return [self.rules[i] for i in self.candidates(message) if self.rules[i]["regex"].search(message)]
+
+    def memo_key(self, message):
+        """The normalized message plus what the patterns can still tell apart in the raw one."""
+        lowered = message.lower()
+        return (normalize(message),
+                tuple(literal for literal in self.variable if literal in lowered),
+                tuple(bool(rule["regex"].search(message)) for rule in self.class_rules))
+
+    def classify(self, message):
+        """Classify one error message; memoized by memo_key().
+
+        Returns {"classification": EXPECTED|BUG|None, "pattern", "reason",
+        "category", "conflict", "matches"}.
+        """
+        key = self.memo_key(message)
+        result = self._cache.get(key)
+        if result is None:
+            matched = self.matches(message)
+            top = matched[0] if matched else None
+            result = self._cache[key] = {
+                "classification": top["classification"] if top else None,
+                "pattern": top["pattern"] if top else None,
+                "reason": top["reason"] if top else None,
+                "category": top["category"] if top else None,
+                "conflict": len({rule["category"] for rule in matched}) > 1,
+                "matches": [rule["pattern"] for rule in matched],
+            }
+        return result
+
+    def cache_size(self):
+        return len(self._cache)
+
+
+def load_classifier(project_id, registry=None, registry_path=REGISTRY_FILE):
+    """Build the classifier for a registered project."""
+    registry = registry or load_registry(registry_path)
+    project = registry["projects"].get(project_id)
+    if project is None:
+        raise RegistryError(f"Project '{project_id}' not found in registry")
+    return ProjectClassifier(project_id, project.get("error_patterns"))
+
+
+def report_errors(path):
+    """(message, entry) for each signature in a scan_errors.py or scan_fanout.py report."""
+    with open(path) as f:
+        report = json.load(f)
+    for entry in report.get("new", []) + report.get("seen_before", []):
+        message = entry.get("sample_error") or entry["normalized_message"]
+        yield message, entry
+
+
+def format_result(message, result):
+    label = result["classification"] or "UNMATCHED"
+    line = f"{label:<10} {message}"
+    if result["classification"]:
+        line += f"\n           pattern: {result['pattern']} ({result['reason']})"
+    if result["conflict"]:
+        line += f"\n           conflict: also matches {', '.join(result['matches'][1:])}"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify errors against a project's registry patterns")
+    parser.add_argument("message", nargs="?", help="Error message (default: one per line on stdin)")
+    parser.add_argument("--project", "-p", required=True, help="Project ID from the registry")
+    parser.add_argument("--registry", default=str(REGISTRY_FILE), help="Registry YAML path")
+    parser.add_argument("--report", help="Classify every signature in a scanner report JSON")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    try:
+        classifier = load_classifier(args.project, registry_path=args.registry)
+    except RegistryError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    for bad in classifier.invalid:
+        print(f"Warning: skipping pattern {bad['pattern']!r}: {bad['error']}", file=sys.stderr)
+
+    if args.report:
+        messages = [message for message, _ in report_errors(args.report)]
+    elif args.message:
+        messages = [args.message]
+    else:
+        messages = [line.rstrip("\n") for line in sys.stdin if line.strip()]
+
+    results = [(message, classifier.classify(message)) for message in messages]
+    if args.json:
+        print(json.dumps([{"message": message, **result} for message, result in results], indent=2))
+        return
+    for message, result in results:
+        print(format_result(message, result))
+    if len(results) > 1:
+        counts = {}
+        for _, result in results:
+            label = result["classification"] or "UNMATCHED"
+            counts[label] = counts.get(label, 0) + 1
+        print(f"\n{len(results)} error(s), {classifier.cache_size()} distinct: "
+              + ", ".join(f"{label} {count}" for label, count in sorted(counts.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""Generate wiki/index.md from page frontmatter.
+
+Builds the Sources, Concepts, Entities and Queries tables and the
+Statistics block of wiki/index.md instead of editing them by hand. Each
+page's index row is cached in <base>/.wiki/state.db and only regenerated
+when the page changed (see wiki_pages.py), and files are only rewritten
+when their content differs.
+
+Usage:
+    python3 build_index.py <path> [--shard-size 100] [--check]
+
+Sections with more than --shard-size pages are split into paged
+sub-indexes, wiki/index/<section>-<n>.md, and index.md links to each page
+with the range of titles it covers, so every index file stays small.
+
+Row summaries come from the `summary` or `description` frontmatter field,
+else the first sentence of the page body. --check only reports whether
+index.md is out of date (exit status 1 if it is).
+"""
+
+import argparse
+import re
+import sys
+import time
+from datetime import date
+
+from wiki_pages import open_state, parse_frontmatter, read_page
+
+CONSUMER = "index"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS index_rows (
+    id        TEXT PRIMARY KEY,
+    section   TEXT NOT NULL,
+    sort_key  TEXT NOT NULL,
+    title     TEXT NOT NULL,
+    row       TEXT NOT NULL  -- rendered table row
+);
+CREATE INDEX IF NOT EXISTS idx_index_rows_section ON index_rows(section, sort_key);
+"""
+
+# (directory, heading, table columns)
+SECTIONS = (
+    ("sources", "Sources", ("Page", "Summary")),
+    ("concepts", "Concepts", ("Page", "Summary")),
+    ("entities", "Entities", ("Page", "Type", "Summary")),
+    ("queries", "Queries", ("Page", "Summary")),
+)
+
+SHARD_DIR = "index"
+DEFAULT_SHARD_SIZE = 100
+# Keeps each row to about one line (~150 chars)
+SUMMARY_CHARS = 110
+
+
+def _cell(text):
+    return " ".join(str(text).split()).replace("|", "\\|")
+
+
+def summarize(meta, body):
+    """One-line summary: frontmatter summary/description, else the body's first sentence."""
+    summary = meta.get("summary") or meta.get("description")
+    if not summary:
+        for paragraph in re.split(r"\n\s*\n", re.sub(r"^#.*$", "", body, flags=re.M)):
+            paragraph = paragraph.strip()
+            if paragraph and not paragraph.startswith(("#", "|", "-", "*", ">", "!", "```", "<")):
+                summary = re.split(r"(?<=[.!?])\s", " ".join(paragraph.split()), maxsplit=1)[0]
+                break
+    summary = _cell(re.sub(r"\[\[(?:[^\]|]*\|)?([^\]]*)\]\]", r"\1", summary or ""))
+    return summary if len(summary) <= SUMMARY_CHARS else summary[:SUMMARY_CHARS - 1].rstrip() + "…"
+
+
+def index_row(pid, text):
+    """(section, sort key, title, rendered row) for a page, or None if it isn't indexed."""
+    parts = pid.split("/")
+    section = parts[1] if len(parts) > 2 else None
+    if section not in {name for name, _, _ in SECTIONS}:
+        return None
+    meta, body = parse_frontmatter(text)
+    title = _cell(meta.get("title") or parts[-1].replace("-", " "))
+    summary = summarize(meta, body)
+    cells = [f"[[{pid}]]"]
+    if section == "entities":
+        cells.append(_cell(meta.get("entity_type", "")))
+    cells.append(f"{title} — {summary}" if summary else title)
+    return section, title.lower(), title, "| " + " | ".join(cells) + " |"
+
+
+def update_rows(state):
+    """Regenerate the cached rows of pages changed since the last run; returns how many."""
+    state.sync()
+    state.conn.executescript(SCHEMA)
+    stale, removed = state.pending(CONSUMER)
+    if not (stale or removed):
+        return 0
+    rows = []
+    for pid in stale:
+        row = index_row(pid, read_page(state.base, pid))
+        if row:
+            rows.append((pid, *row))
+    with state.transaction() as conn:
+        conn.executemany("DELETE FROM index_rows WHERE id = ?", [(pid,) for pid in stale + removed])
+        conn.executemany("INSERT INTO index_rows VALUES (?, ?, ?, ?, ?)", rows)
+        state.mark_indexed(conn, CONSUMER, stale, removed)
+    return len(rows)
+
+
+def _table(columns, rows):
+    header = "| " + " | ".join(columns) + " |\n|" + "|".join("-" * (len(c) + 2) for c in columns) + "|\n"
+    return header + "".join(row + "\n" for row in rows)
+
+
+def render(state, shard_size=DEFAULT_SHARD_SIZE, updated=None):
+    """{relative path: content} for index.md and its sub-indexes."""
+    updated = updated or date.today().isoformat()
+    files, sections, counts = {}, [], {}
+    for name, heading, columns in SECTIONS:
+        entries = state.conn.execute(
+            "SELECT title, row FROM index_rows WHERE section = ? ORDER BY sort_key, id", (name,)).fetchall()
+        counts[heading] = len(entries)
+        if len(entries) <= shard_size:
+            sections.append(f"## {heading}\n\n" + _table(columns, [row for _, row in entries]))
+            continue
+        shards = [entries[i:i + shard_size] for i in range(0, len(entries), shard_size)]
+        links = []
+        for number, shard in enumerate(shards, 1):
+            shard_id = f"wiki/{SHARD_DIR}/{name}-{number}"
+            nav = ["Back to [[wiki/index]]"]
+            if number > 1:
+                nav.append(f"Previous: [[wiki/{SHARD_DIR}/{name}-{number - 1}]]")
+            if number < len(shards):
+                nav.append(f"Next: [[wiki/{SHARD_DIR}/{name}-{number + 1}]]")
+            files[f"{shard_id}.md"] = (
+                f"# {heading} — page {number} of {len(shards)}\n\n"
+                + " · ".join(nav) + "\n\n"
+                + _table(columns, [row for _, row in shard])
+            )
+            links.append(f"- [[{shard_id}]] — {shard[0][0]} … {shard[-1][0]} ({len(shard)} pages)")
+        sections.append(f"## {heading}\n\n{len(entries)} pages in {len(shards)} sub-indexes:\n\n"
+                        + "\n".join(links) + "\n")
+
+    statistics = "".join(f"- **{heading}**: {count}\n" for heading, count in counts.items())
+    files["wiki/index.md"] = (
+        "# Wiki Index\n\n"
+        "Master catalog of all pages in this knowledge base.\n"
+        "Generated by `build_index.py` from page frontmatter; edit the pages, not this file.\n\n"
+        "---\n\n"
+        "## Overview\n\n"
+        "- [[wiki/overview]] — High-level synthesis\n\n"
+        + "\n".join(sections)
+        + "\n---\n\n## Statistics\n\n"
+        + statistics
+        + f"- **Last updated**: {updated}\n"
+    )
+    return files
+
+
+def compile_index(state, shard_size=DEFAULT_SHARD_SIZE, write=True):
+    """Bring index.md and its sub-indexes up to date; returns (rows regenerated, files changed)."""
+    regenerated = update_rows(state)
+    index = state.base / "wiki" / "index.md"
+    previous = index.read_text() if index.exists() else ""
+    match = re.search(r"^- \*\*Last updated\*\*: (\S+)", previous, re.M)
+    files = render(state, shard_size, match.group(1) if match else None)
+    if files["wiki/index.md"] != previous:
+        # Something besides the date changed: stamp today
+        files = render(state, shard_size)
+
+    changed = []
+    for relative, content in files.items():
+        path = state.base / relative
+        if not path.exists() or path.read_text() != content:
+            changed.append(relative)
+            if write:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(content)
+    shard_dir = state.base / "wiki" / SHARD_DIR
+    if shard_dir.is_dir():
+        for path in shard_dir.glob("*.md"):
+            relative = f"wiki/{SHARD_DIR}/{path.name}"
+            if relative not in files:
+                changed.append(relative)
+                if write:
+                    path.unlink()
+    return regenerated, changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate wiki/index.md from page frontmatter")
+    parser.add_argument("path", help="Knowledge base path (contains wiki/)")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE,
+                        help="Pages per section before it is split into sub-indexes")
+    parser.add_argument("--check", action="store_true", help="Only report whether the index is out of date")
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    try:
+        state = open_state(args.path)
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    with state:
+        regenerated, changed = compile_index(state, args.shard_size, write=not args.check)
+    elapsed = time.monotonic() - start
+
+    if args.check:
+        print("Index is up to date." if not changed else "Out of date: " + ", ".join(changed))
+        sys.exit(1 if changed else 0)
+    print(f"Regenerated {regenerated} row(s); {'wrote ' + ', '.join(changed) if changed else 'no file changed'} "
+          f"({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
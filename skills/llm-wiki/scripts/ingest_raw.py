@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""Plan and record bulk ingests of raw/ sources.
+
+Keeps a content-hash manifest of raw/ in <base>/.wiki/state.db and
+works out which files are new, changed or deleted since they were last
+ingested, so re-ingesting a large corpus only touches the delta.
+
+Usage:
+    python3 ingest_raw.py <path> plan [--workers N] [--batch-size 20] [--json]
+    python3 ingest_raw.py <path> commit
+    python3 ingest_raw.py <path> status
+
+plan     Hashes changed files and extracts their title, frontmatter, word
+         count and headings in a process pool, then writes the ingest
+         queue to .wiki/ingest_plan.json in batches. Each entry names the
+         source page to write (wiki/sources/<slug>.md).
+commit   After the source pages are written, marks every planned file
+         whose source page exists (or links to it) as ingested, drops
+         deleted files, and updates index.md (build_index.py), log.md
+         and overview.md once for the whole batch. A changed file counts
+         as ingested once its source page was rewritten after `plan`.
+status   Counts of ingested, pending and deleted files.
+
+Unchanged files (same mtime and size) are not read; touched files are
+re-hashed and stay ingested if their content is the same.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+
+from build_index import compile_index
+from wiki_lint import update_links
+from wiki_pages import open_state, page_id, parse_frontmatter, state_dir
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS raw_files (
+    path             TEXT PRIMARY KEY,  -- raw/paper.pdf
+    mtime_ns         INTEGER NOT NULL,
+    size             INTEGER NOT NULL,
+    sha256           TEXT NOT NULL,
+    ingested_sha256  TEXT,              -- content hash at the last committed ingest
+    page_sha256      TEXT,              -- changed files: source page hashes when planned (JSON)
+    deleted          INTEGER NOT NULL DEFAULT 0,
+    info             TEXT NOT NULL      -- extracted title/frontmatter/words/headings as JSON
+);
+"""
+
+PLAN_FILE = "ingest_plan.json"
+
+# Files read as text for extraction; others are only hashed
+TEXT_SUFFIXES = {".md", ".markdown", ".txt", ".rst", ".html", ".htm", ".csv", ".json", ".yaml", ".yml"}
+
+DEFAULT_BATCH_SIZE = 20
+# Fewer changed files than this are extracted in-process (pool start-up costs more)
+MIN_POOL_FILES = 32
+MAX_HEADINGS = 20
+# Waiting files listed by `commit`
+MAX_LISTED = 20
+
+
+def slugify(name: str) -> str:
+    """File stem -> kebab-case page name."""
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "source"
+
+
+def extract(base: str, path: str) -> dict:
+    """Hash one raw file and extract what the ingest needs (runs in a worker process)."""
+    full = os.path.join(base, path)
+    stat = os.stat(full)
+    data = Path(full).read_bytes()
+    info = {"title": Path(path).stem, "words": None, "headings": [], "frontmatter": {}}
+    if Path(path).suffix.lower() in TEXT_SUFFIXES:
+        text = data.decode("utf-8", errors="replace")
+        meta, body = parse_frontmatter(text)
+        headings = re.findall(r"^#{1,3} +(.+?)\s*$", body, re.M)
+        title = meta.get("title") or (headings[0] if headings else "")
+        info.update(
+            title=str(title or Path(path).stem),
+            words=len(body.split()),
+            headings=headings[:MAX_HEADINGS],
+            frontmatter=meta,
+        )
+    return {
+        "path": path,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "info": info,
+    }
+
+
+def walk_raw(base):
+    """(relative path, os.stat_result) for every file under raw/ except raw/assets/."""
+    base = os.path.normpath(base)
+    raw = os.path.join(base, "raw")
+    prefix = len(base) + 1
+    for root, dirs, files in os.walk(raw):
+        dirs[:] = [d for d in dirs if not d.startswith(".") and not (root == raw and d == "assets")]
+        for name in files:
+            if not name.startswith("."):
+                path = os.path.join(root, name)
+                yield path[prefix:].replace(os.sep, "/"), os.stat(path)
+
+
+def scan(state, workers=None):
+    """Update the manifest from raw/; returns how many files were hashed."""
+    conn = state.conn
+    conn.executescript(SCHEMA)
+    known = {row[0]: row[1:] for row in conn.execute("SELECT path, mtime_ns, size, deleted FROM raw_files")}
+    to_hash, seen = [], set()
+    for path, stat in walk_raw(state.base):
+        seen.add(path)
+        previous = known.get(path)
+        if not previous or previous[:2] != (stat.st_mtime_ns, stat.st_size) or previous[2]:
+            to_hash.append(path)
+
+    base = str(state.base)
+    if len(to_hash) >= MIN_POOL_FILES and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(extract, [base] * len(to_hash), to_hash,
+                                    chunksize=max(1, len(to_hash) // ((workers or os.cpu_count() or 1) * 4))))
+    else:
+        results = [extract(base, path) for path in to_hash]
+
+    with state.transaction() as tx:
+        tx.executemany(
+            "INSERT INTO raw_files (path, mtime_ns, size, sha256, info) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET mtime_ns = excluded.mtime_ns, size = excluded.size, "
+            "sha256 = excluded.sha256, info = excluded.info, deleted = 0",
+            [(r["path"], r["mtime_ns"], r["size"], r["sha256"], json.dumps(r["info"], default=str))
+             for r in results],
+        )
+        tx.executemany("UPDATE raw_files SET deleted = 1 WHERE path = ?",
+                       [(path,) for path in known if path not in seen])
+        # Files deleted before they were ever ingested have nothing to clean up
+        tx.execute("DELETE FROM raw_files WHERE deleted = 1 AND ingested_sha256 IS NULL")
+        # Changed back to the ingested content: forget the planned page hashes
+        tx.execute("UPDATE raw_files SET page_sha256 = NULL WHERE sha256 IS ingested_sha256")
+    return len(results)
+
+
+def source_pages(state):
+    """{raw page id: [source pages linking to it]} from the link graph."""
+    update_links(state)
+    pages = {}
+    for source, target in state.conn.execute(
+            "SELECT source, target FROM links WHERE source LIKE 'wiki/sources/%' AND target LIKE 'raw/%'"):
+        pages.setdefault(target, []).append(source)
+    return pages
+
+
+def planned_page(path):
+    return f"wiki/sources/{slugify(Path(path).stem)}"
+
+
+def pages_for(state, path, linked):
+    """Source pages of a raw file: pages linking to it, else the planned one if it exists."""
+    pages = linked.get(page_id(path)) or linked.get(path)
+    if not pages and (state.base / f"{planned_page(path)}.md").exists():
+        pages = [planned_page(path)]
+    return pages or []
+
+
+def page_hashes(state, pages):
+    """{page id: content hash} from the page table (pages missing from wiki/ are left out)."""
+    hashes = {}
+    for page in pages:
+        row = state.conn.execute("SELECT sha256 FROM pages WHERE id = ?", (page,)).fetchone()
+        if row:
+            hashes[page] = row[0]
+    return hashes
+
+
+def pending(state):
+    """(new, changed, deleted) manifest rows as dicts."""
+    rows = state.conn.execute(
+        "SELECT path, sha256, ingested_sha256, deleted, info, page_sha256 FROM raw_files "
+        "WHERE deleted = 1 OR ingested_sha256 IS NOT sha256 ORDER BY path").fetchall()
+    new, changed, deleted = [], [], []
+    for path, sha, ingested, is_deleted, info, planned_hashes in rows:
+        entry = {"path": path, **json.loads(info),
+                 "planned_hashes": json.loads(planned_hashes) if planned_hashes is not None else None}
+        if is_deleted:
+            deleted.append(entry)
+        elif ingested is None:
+            new.append(entry)
+        else:
+            changed.append(entry)
+    return new, changed, deleted
+
+
+def build_plan(state, batch_size=DEFAULT_BATCH_SIZE):
+    """Queue new and changed files; remembers the source page hashes of changed ones.
+
+    A changed file's source page already exists from its first ingest, so
+    `commit` only counts it as re-ingested once the page differs from the
+    hashes recorded here (kept across re-plans until the commit).
+    """
+    new, changed, deleted = pending(state)
+    linked = source_pages(state)
+    queue, baselines = [], []
+    for status, entries in (("new", new), ("changed", changed)):
+        for entry in entries:
+            existing = pages_for(state, entry["path"], linked)
+            if status == "changed" and entry["planned_hashes"] is None:
+                baselines.append((json.dumps(page_hashes(state, existing)), entry["path"]))
+            queue.append({
+                "status": status,
+                "path": entry["path"],
+                "title": entry["title"],
+                "words": entry["words"],
+                "headings": entry["headings"],
+                "source_url": entry["frontmatter"].get("source_url", ""),
+                "source_page": existing[0] if existing else planned_page(entry["path"]),
+            })
+    if baselines:
+        with state.transaction() as tx:
+            tx.executemany("UPDATE raw_files SET page_sha256 = ? WHERE path = ?", baselines)
+    return {
+        "created": date.today().isoformat(),
+        "counts": {"new": len(new), "changed": len(changed), "deleted": len(deleted)},
+        "batches": [queue[i:i + batch_size] for i in range(0, len(queue), batch_size)],
+        "deleted": [{"path": entry["path"], "source_pages": pages_for(state, entry["path"], linked)}
+                    for entry in deleted],
+    }
+
+
+def _replace_line(text, label, value):
+    """Set the value of a '- **Label**: value' line."""
+    return re.sub(rf"^(- \*\*{re.escape(label)}\*\*:).*$", lambda m: f"{m.group(1)} {value}", text, flags=re.M)
+
+
+def apply_batch(state, ingested, removed):
+    """One update of index.md, log.md and overview.md for a committed batch."""
+    wiki = state.base / "wiki"
+    today = date.today().isoformat()
+    total_ingested = state.conn.execute(
+        "SELECT COUNT(*) FROM raw_files WHERE ingested_sha256 IS NOT NULL AND deleted = 0").fetchone()[0]
+
+    compile_index(state)
+
+    overview = wiki / "overview.md"
+    if overview.exists():
+        text = _replace_line(overview.read_text(), "Sources ingested", total_ingested)
+        overview.write_text(_replace_line(text, "Last updated", today))
+
+    title = f"Batch of {len(ingested)} source(s)" + (f", {len(removed)} removed" if removed else "")
+    lines = [f"\n## [{today}] ingest | {title}"]
+    lines += [f"- {'Updated' if entry['status'] == 'changed' else 'New'}: [[{entry['page']}]] ([[{page_id(entry['path'])}]])"
+              for entry in ingested]
+    lines += [f"- Removed: {entry['path']}" + "".join(f" (source page [[{page}]])" for page in entry["pages"])
+              for entry in removed]
+    with open(wiki / "log.md", "a") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def rewritten(state, entry, pages):
+    """Whether a changed file's source pages differ from the hashes recorded by `plan`."""
+    planned = entry["planned_hashes"]
+    if planned is None:
+        return False
+    return any(sha != planned.get(page) for page, sha in page_hashes(state, pages).items())
+
+
+def commit(state):
+    """Mark planned files with a written source page as ingested; returns (ingested, removed, still pending).
+
+    New files count once a source page exists, changed files once one of
+    their source pages was rewritten after `plan`.
+    """
+    new, changed, deleted = pending(state)
+    linked = source_pages(state)
+    ingested, waiting = [], []
+    for status, entries in (("new", new), ("changed", changed)):
+        for entry in entries:
+            pages = pages_for(state, entry["path"], linked)
+            if pages and (status == "new" or rewritten(state, entry, pages)):
+                ingested.append({"status": status, "path": entry["path"], "title": entry["title"], "page": pages[0]})
+            else:
+                waiting.append(entry["path"])
+    removed = [{"path": entry["path"], "pages": pages_for(state, entry["path"], linked)} for entry in deleted]
+    if not (ingested or removed):
+        return ingested, removed, waiting
+    with state.transaction() as tx:
+        tx.executemany("UPDATE raw_files SET ingested_sha256 = sha256, page_sha256 = NULL WHERE path = ?",
+                       [(entry["path"],) for entry in ingested])
+        tx.executemany("DELETE FROM raw_files WHERE path = ?", [(entry["path"],) for entry in removed])
+    apply_batch(state, ingested, removed)
+    return ingested, removed, waiting
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan and record bulk ingests of raw/ sources")
+    parser.add_argument("path", help="Knowledge base path (contains raw/ and wiki/)")
+    subparsers = parser.add_subparsers(dest="command", help="Commands")
+    plan_parser = subparsers.add_parser("plan", help="Detect new/changed/deleted raw files and queue them")
+    plan_parser.add_argument("--workers", type=int, help="Extraction processes (default: CPU count)")
+    plan_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Files per ingest batch")
+    plan_parser.add_argument("--json", action="store_true", help="Print the plan as JSON")
+    subparsers.add_parser("commit", help="Record written source pages and update index/log/overview once")
+    subparsers.add_parser("status", help="Manifest counts")
+    args = parser.parse_args()
+
+    try:
+        state = open_state(args.path)
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    with state:
+        hashed = scan(state, getattr(args, "workers", None))
+        if args.command == "plan":
+            plan = build_plan(state, args.batch_size)
+            plan_path = state_dir(args.path) / PLAN_FILE
+            plan_path.write_text(json.dumps(plan, indent=2, default=str))
+            if args.json:
+                print(json.dumps(plan, indent=2, default=str))
+                return
+            counts = plan["counts"]
+            print(f"Hashed {hashed} file(s): {counts['new']} new, {counts['changed']} changed, "
+                  f"{counts['deleted']} deleted")
+            for number, batch in enumerate(plan["batches"], 1):
+                print(f"\nBatch {number}:")
+                for entry in batch:
+                    words = f"{entry['words']} words" if entry["words"] is not None else "binary"
+                    print(f"  {entry['status']:<8} {entry['path']} -> {entry['source_page']}.md ({words})")
+            for entry in plan["deleted"]:
+                pages = ", ".join(entry["source_pages"]) or "no source page"
+                print(f"  deleted  {entry['path']} ({pages})")
+            print(f"\nPlan: {plan_path}")
+        elif args.command == "commit":
+            ingested, removed, waiting = commit(state)
+            print(f"Recorded {len(ingested)} ingested and {len(removed)} removed source(s); "
+                  f"{len(waiting)} still waiting for a source page")
+            for path in waiting[:MAX_LISTED]:
+                print(f"  waiting  {path}")
+            if len(waiting) > MAX_LISTED:
+                print(f"  ... and {len(waiting) - MAX_LISTED} more (see `plan`)")
+        elif args.command == "status":
+            new, changed, deleted = pending(state)
+            total = state.conn.execute("SELECT COUNT(*) FROM raw_files WHERE deleted = 0").fetchone()[0]
+            print(f"{total} raw file(s): {total - len(new) - len(changed)} ingested, {len(new)} new, "
+                  f"{len(changed)} changed, {len(deleted)} deleted (hashed {hashed})")
+        else:
+            parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,10 @@ import os
 from pathlib import Path
 from datetime import date
 
+from build_index import compile_index
+from wiki_pages import open_state
+from wiki_search import update_index
+
 def create_wiki(base_path: str, name: str) -> None:
     """Create the LLM Wiki directory structure."""
     base = Path(base_path)
@@ -19,56 +23,23 @@ def create_wiki(base_path: str, name: str) -> None:
         base / "wiki" / "queries",
         base / "wiki" / "outputs" / "slides",
         base / "wiki" / "outputs" / "charts",
+        base / ".wiki",
     ]
     for d in dirs:
         d.mkdir(parents=True, exist_ok=True)
         print(f"Created: {d}")
 
+    # .wiki/ holds derived indexes (link graph, page hashes); never commit it
+    ignore = base / ".wiki" / ".gitignore"
+    if not ignore.exists():
+        ignore.write_text("*\n")
+
     # Create CLAUDE.md schema
     schema = base / "CLAUDE.md"
     if not schema.exists():
         schema.write_text(get_schema_template(name))
         print(f"Created: {schema}")
 
-    # Create wiki/index.md
-    index = base / "wiki" / "index.md"
-    if not index.exists():
-        index.write_text(f"""# Wiki Index
-
-Master catalog of all pages in this knowledge base.
-
----
-
-## Overview
-
-- [[wiki/overview]] — High-level synthesis
-
-## Sources
-
-| Page | Summary |
-|------|---------|
-
-## Concepts
-
-| Page | Summary |
-|------|---------|
-
-## Entities
-
-| Page | Type | Summary |
-|------|------|---------|
-
----
-
-## Statistics
-
-- **Sources**: 0
-- **Concepts**: 0
-- **Entities**: 0
-- **Last updated**: {date.today().isoformat()}
-""")
-        print(f"Created: {index}")
-
     # Create wiki/log.md
     log = base / "wiki" / "log.md"
     if not log.exists():
@@ -142,6 +113,15 @@ Run `lint wiki` to populate this report.
 """)
         print(f"Created: {health}")
 
+    # Create the search index (and page table) in .wiki/state.db, and wiki/index.md from the pages
+    index = base / "wiki" / "index.md"
+    with open_state(base) as state:
+        update_index(state)
+        if not index.exists():
+            compile_index(state)
+            print(f"Created: {index}")
+    print(f"Created: {base / '.wiki' / 'state.db'}")
+
     print(f"\n✅ LLM Wiki initialized at: {base}")
     print("\nNext steps:")
     print("1. Add source documents to raw/")
@@ -159,10 +139,12 @@ This schema governs how the LLM maintains this knowledge base.
 ```
 {name}/
 ├── CLAUDE.md          # This schema file
+├── .wiki/             # Derived indexes maintained by the scripts (never edit)
 ├── raw/               # Immutable source documents (never modify)
 │   └── assets/        # Downloaded images from sources
 └── wiki/              # LLM-generated knowledge base
-    ├── index.md       # Master catalog of all wiki pages
+    ├── index.md       # Master catalog of all wiki pages (generated by build_index.py)
+    ├── index/         # Paged sub-indexes of large sections (generated)
     ├── log.md         # Chronological activity log
     ├── overview.md    # High-level synthesis of the knowledge base
     ├── health.md      # Lint report (LLM-maintained)
@@ -329,17 +311,21 @@ Reference in wiki pages: `![[wiki/outputs/charts/<name>.png]]`
 2. Create a summary page in `wiki/sources/`
 3. Identify concepts — create or update pages in `wiki/concepts/`
 4. Identify entities — create or update pages in `wiki/entities/`
-5. Update `wiki/index.md` with new pages
+5. Regenerate `wiki/index.md`: `python3 <llm-wiki skill>/scripts/build_index.py .`
 6. Update `wiki/overview.md` if the synthesis changes
 7. Append entry to `wiki/log.md`
 
+For many raw/ files at once, run `python3 <llm-wiki skill>/scripts/ingest_raw.py . plan`, do steps 1-4
+for each queued file, then `ingest_raw.py . commit` to update index.md, log.md and overview.md in one batch.
+
 ### Answer Query
-1. Read `wiki/index.md` to find relevant pages
-2. Read relevant wiki pages
+1. Find relevant pages with `python3 <llm-wiki skill>/scripts/wiki_search.py . search "<question keywords>"`
+   (fall back to `wiki/index.md` for broad questions)
+2. Read the top-ranked wiki pages
 3. **Use a subagent to verify** the answer against source material before responding
 4. Synthesize answer with citations
 5. If answer is valuable → file to `wiki/queries/<slug>.md`
-6. Update `wiki/index.md` with query entry
+6. Regenerate `wiki/index.md` (`build_index.py .`)
 7. Append to `wiki/log.md`: `## [YYYY-MM-DD] query | <Question Summary>`
 
 ## Query Response Requirements
@@ -362,14 +348,14 @@ Reference in wiki pages: `![[wiki/outputs/charts/<name>.png]]`
 5. **If synthesizing across multiple sources**, cite each source explicitly
 
 ### Lint/Health Check
-1. Check for:
+1. Run `python3 <llm-wiki skill>/scripts/wiki_lint.py . --write` — fills these `wiki/health.md` sections from the link graph:
    - Orphan pages (no inbound links)
    - Missing pages (referenced but don't exist)
-   - Contradictions between pages
    - Stale sources (raw files without wiki summaries)
-   - Suggested articles (concepts mentioned 3+ times without page)
-2. Write results to `wiki/health.md`
-3. Append to `wiki/log.md`: `## [YYYY-MM-DD] lint | Health Check`
+   - Suggested articles (concepts linked from 3+ pages without a page)
+2. Run `python3 <llm-wiki skill>/scripts/wiki_dedupe.py .` — lists likely duplicate concept/entity pages. Merge true duplicates (keep one page, add the other's title to its `aliases`) and note the pairs kept apart under Inconsistencies
+3. Check for contradictions between pages; write them under Inconsistencies and Action Items in `wiki/health.md`
+4. Append to `wiki/log.md`: `## [YYYY-MM-DD] lint | Health Check`
 
 ### Generate Output
 1. Identify wiki content for output (slides, chart, report)
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""Find near-duplicate concept and entity pages with MinHash/LSH.
+
+Candidate merge pairs for the Lint "Inconsistencies" section: pages whose
+names (title and aliases, after case, punctuation and plural folding) or
+body text are near-identical. No embeddings, network or model needed.
+
+Usage:
+    python3 wiki_dedupe.py <path> [--json]
+    python3 wiki_dedupe.py <path> --page wiki/concepts/rate-limiting
+
+Each page gets two MinHash signatures, one over word 3-shingles of its
+body and one over character 3-grams of its names. Each signature is split
+into LSH bands, and pages sharing a band bucket become candidates, so
+finding a page's duplicates looks up a few buckets instead of comparing
+it with every page. Short names that share a common word ("Page 12",
+"Page 34") collide in single name bands, so a name match needs at least
+two shared name bands, and name buckets are keyed by the numbers in the
+names too (names with different numbers never match). Candidates are then kept when they share a name, their
+estimated body similarity reaches --content-threshold, or two of their
+names are alike (trigram similarity, numbers must match) beyond
+--name-threshold.
+
+Signatures and buckets are stored in <base>/.wiki/state.db and only
+recomputed for pages changed since the last run (see wiki_pages.py).
+"""
+
+import argparse
+import json
+import operator
+import re
+import sys
+import time
+import zlib
+from array import array
+from functools import lru_cache
+
+from wiki_pages import open_state, parse_frontmatter, read_page
+
+CONSUMER = "dedupe"
+
+# Page sections compared with each other
+DEDUPE_SECTIONS = ("wiki/concepts/", "wiki/entities/")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dedupe_pages (
+    id           TEXT PRIMARY KEY,
+    title        TEXT NOT NULL,
+    names        TEXT NOT NULL,  -- normalized title and aliases, JSON list
+    content_sig  BLOB,
+    name_sig     BLOB
+);
+CREATE TABLE IF NOT EXISTS dedupe_buckets (
+    kind  TEXT NOT NULL,     -- 'content', 'name' or 'key' (exact normalized name)
+    band  INTEGER NOT NULL,
+    key   INTEGER NOT NULL,
+    id    TEXT NOT NULL
+);
+-- Covers the bucket grouping, so listing pairs never reads the table itself
+CREATE INDEX IF NOT EXISTS idx_dedupe_buckets_bucket ON dedupe_buckets(kind, band, key, id);
+CREATE INDEX IF NOT EXISTS idx_dedupe_buckets_id ON dedupe_buckets(id);
+"""
+
+# Signature size and LSH banding: 16 bands of 4 values catch pairs from ~0.5 similarity
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+
+CONTENT_THRESHOLD = 0.5
+NAME_THRESHOLD = 0.6
+SHINGLE_WORDS = 3
+
+# Buckets larger than this (e.g. many empty stubs) are skipped for pair listing
+MAX_BUCKET = 50
+# Name bands two pages must share to become a name candidate (~0.7 similarity)
+MIN_NAME_BANDS = 2
+
+_EMPTY = 0xFFFFFFFF
+
+
+def singular(word):
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def normalize_name(name):
+    """'Rate-Limits' -> 'rate limit'."""
+    return " ".join(singular(word) for word in re.findall(r"[a-z0-9]+", str(name).lower()))
+
+
+def content_shingles(body):
+    text = re.sub(r"^#.*$", "", body, flags=re.M)
+    words = [singular(word) for word in re.findall(r"[a-z0-9]+", text.lower())]
+    if len(words) < SHINGLE_WORDS:
+        return set(words)
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+@lru_cache(maxsize=None)
+def trigrams(name):
+    padded = f" {name} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+@lru_cache(maxsize=None)
+def _numbers(name):
+    return tuple(re.findall(r"\d+", name))
+
+
+def name_shingles(names):
+    return set().union(*(trigrams(name) for name in names)) if names else set()
+
+
+def name_similarity(names_a, names_b):
+    """Best trigram Jaccard between a name of each page; names with different numbers don't match."""
+    best = 0.0
+    for a in names_a:
+        for b in names_b:
+            if _numbers(a) != _numbers(b):
+                continue
+            grams_a, grams_b = trigrams(a), trigrams(b)
+            best = max(best, len(grams_a & grams_b) / len(grams_a | grams_b))
+    return best
+
+
+def minhash(shingles):
+    """One-permutation MinHash signature (NUM_HASHES values), or None for an empty set.
+
+    Each shingle's CRC32 picks a bin by its low bits and competes on the
+    rest; empty bins borrow the next filled bin's value (densification).
+    """
+    if not shingles:
+        return None
+    bits = NUM_HASHES.bit_length() - 1
+    bins = [_EMPTY] * NUM_HASHES
+    for shingle in shingles:
+        h = zlib.crc32(shingle.encode())
+        slot, value = h & (NUM_HASHES - 1), h >> bits
+        if value < bins[slot]:
+            bins[slot] = value
+    for i in range(NUM_HASHES):
+        if bins[i] == _EMPTY:
+            for distance in range(1, NUM_HASHES):
+                borrowed = bins[(i + distance) % NUM_HASHES]
+                if borrowed != _EMPTY and borrowed < (1 << 26):
+                    bins[i] = borrowed + (distance << 26)
+                    break
+    return bins
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures."""
+    if a is None or b is None:
+        return 0.0
+    return sum(map(operator.eq, a, b)) / NUM_HASHES
+
+
+def band_keys(signature, salt=0):
+    return [(band, zlib.crc32(array("I", signature[band * ROWS:(band + 1) * ROWS]).tobytes(), salt))
+            for band in range(BANDS)]
+
+
+def name_band_keys(signature, names):
+    """Name band keys, once per distinct number sequence among the names."""
+    salts = {zlib.crc32(" ".join(_numbers(name)).encode()) for name in names}
+    return sorted({key for salt in salts for key in band_keys(signature, salt)})
+
+
+def _pack(signature):
+    return array("I", signature).tobytes() if signature else None
+
+
+def _unpack(blob):
+    return array("I", blob).tolist() if blob else None
+
+
+def page_entry(pid, text):
+    meta, body = parse_frontmatter(text)
+    title = str(meta.get("title") or pid.rsplit("/", 1)[-1].replace("-", " "))
+    aliases = meta.get("aliases") or []
+    aliases = aliases if isinstance(aliases, list) else [aliases]
+    names = sorted({normalize_name(name) for name in [title, pid.rsplit("/", 1)[-1], *aliases]} - {""})
+    return title, names, minhash(content_shingles(body)), minhash(name_shingles(names))
+
+
+def update_signatures(state):
+    """Recompute signatures of pages changed since the last run; returns how many."""
+    state.sync()
+    state.conn.executescript(SCHEMA)
+    stale, removed = state.pending(CONSUMER)
+    if not (stale or removed):
+        return 0
+    pages, buckets = [], []
+    for pid in stale:
+        if not pid.startswith(DEDUPE_SECTIONS):
+            continue
+        title, names, content_sig, name_sig = page_entry(pid, read_page(state.base, pid))
+        pages.append((pid, title, json.dumps(names), _pack(content_sig), _pack(name_sig)))
+        if content_sig:
+            buckets.extend(("content", band, key, pid) for band, key in band_keys(content_sig))
+        if name_sig:
+            buckets.extend(("name", band, key, pid) for band, key in name_band_keys(name_sig, names))
+        buckets.extend(("key", 0, zlib.crc32(name.encode()), pid) for name in names)
+    with state.transaction() as conn:
+        for pid in stale + removed:
+            conn.execute("DELETE FROM dedupe_pages WHERE id = ?", (pid,))
+            conn.execute("DELETE FROM dedupe_buckets WHERE id = ?", (pid,))
+        conn.executemany("INSERT INTO dedupe_pages VALUES (?, ?, ?, ?, ?)", pages)
+        conn.executemany("INSERT INTO dedupe_buckets VALUES (?, ?, ?, ?)", buckets)
+        state.mark_indexed(conn, CONSUMER, stale, removed)
+    return len(pages)
+
+
+def _load(conn, ids):
+    entries = {}
+    ids = list(ids)
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        for pid, title, names, content_sig, name_sig in conn.execute(
+                f"SELECT * FROM dedupe_pages WHERE id IN ({','.join('?' * len(chunk))})", chunk):
+            entries[pid] = {"title": title, "names": json.loads(names),
+                            "content": _unpack(content_sig), "name": _unpack(name_sig)}
+    return entries
+
+
+def score_pairs(conn, pairs, threshold_content=CONTENT_THRESHOLD, threshold_name=NAME_THRESHOLD):
+    """Verify candidate pairs ({(a, b): bucket kinds}); returns the kept pairs, most similar first."""
+    entries = _load(conn, {pid for pair in pairs for pid in pair})
+    results = []
+    for (a, b), kinds in pairs.items():
+        first, second = entries.get(a), entries.get(b)
+        if not first or not second:
+            continue
+        shared = sorted(set(first["names"]) & set(second["names"])) if "key" in kinds else []
+        content = similarity(first["content"], second["content"])
+        name = name_similarity(first["names"], second["names"]) if kinds != {"content"} else 0.0
+        if shared or content >= threshold_content or name >= threshold_name:
+            results.append({
+                "pages": [a, b],
+                "titles": [first["title"], second["title"]],
+                "shared_names": shared,
+                "content_similarity": round(content, 2),
+                "name_similarity": round(name, 2),
+            })
+    return sorted(results, key=lambda r: (not r["shared_names"], -max(r["content_similarity"], r["name_similarity"])))
+
+
+def _with_name_bands(pairs, name_bands):
+    """Add "name" to the kinds of pairs sharing at least MIN_NAME_BANDS name buckets."""
+    for pair, shared in name_bands.items():
+        if shared >= MIN_NAME_BANDS:
+            pairs.setdefault(pair, set()).add("name")
+    return pairs
+
+
+def candidate_pairs(conn):
+    """{(a, b): bucket kinds} for pages sharing a content bucket, a normalized name or enough name buckets."""
+    pairs, name_bands = {}, {}
+    for kind, members in conn.execute(
+            "SELECT kind, GROUP_CONCAT(id, '\n') FROM dedupe_buckets GROUP BY kind, band, key "
+            "HAVING COUNT(*) > 1 AND COUNT(*) <= ?", (MAX_BUCKET,)):
+        ids = sorted(set(members.split("\n")))
+        for i, a in enumerate(ids):
+            for b in ids[i + 1:]:
+                if kind == "name":
+                    name_bands[(a, b)] = name_bands.get((a, b), 0) + 1
+                else:
+                    pairs.setdefault((a, b), set()).add(kind)
+    return _with_name_bands(pairs, name_bands)
+
+
+def page_candidates(conn, pid):
+    """{(a, b): bucket kinds} for pid and the pages sharing its buckets (a few indexed lookups)."""
+    pairs, name_bands = {}, {}
+    for kind, other in conn.execute(
+            "SELECT mine.kind, other.id FROM dedupe_buckets mine JOIN dedupe_buckets other "
+            "ON other.kind = mine.kind AND other.band = mine.band AND other.key = mine.key "
+            "WHERE mine.id = ? AND other.id != ? AND (SELECT COUNT(*) FROM dedupe_buckets size "
+            "WHERE size.kind = mine.kind AND size.band = mine.band AND size.key = mine.key) <= ?",
+            (pid, pid, MAX_BUCKET)):
+        pair = tuple(sorted((pid, other)))
+        if kind == "name":
+            name_bands[pair] = name_bands.get(pair, 0) + 1
+        else:
+            pairs.setdefault(pair, set()).add(kind)
+    return _with_name_bands(pairs, name_bands)
+
+
+def format_pair(result):
+    a, b = result["pages"]
+    reasons = []
+    if result["shared_names"]:
+        reasons.append("same name " + ", ".join(f'"{name}"' for name in result["shared_names"]))
+    reasons.append(f"content {result['content_similarity']:.2f}")
+    reasons.append(f"name {result['name_similarity']:.2f}")
+    return f"- Possible duplicates: [[{a}]] ↔ [[{b}]] ({'; '.join(reasons)})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate concept/entity pages")
+    parser.add_argument("path", help="Knowledge base path (contains wiki/)")
+    parser.add_argument("command", nargs="?", default="dedupe", choices=["dedupe"])
+    parser.add_argument("--page", help="Only list duplicates of this page (e.g. wiki/concepts/foo)")
+    parser.add_argument("--content-threshold", type=float, default=CONTENT_THRESHOLD,
+                        help="Minimum estimated body similarity")
+    parser.add_argument("--name-threshold", type=float, default=NAME_THRESHOLD,
+                        help="Minimum estimated name similarity")
+    parser.add_argument("--json", action="store_true", help="Print pairs as JSON")
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    try:
+        state = open_state(args.path)
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    with state:
+        updated = update_signatures(state)
+        page = args.page[:-3] if args.page and args.page.endswith(".md") else args.page
+        pairs = page_candidates(state.conn, page) if page else candidate_pairs(state.conn)
+        results = score_pairs(state.conn, pairs, args.content_threshold, args.name_threshold)
+        total = state.conn.execute("SELECT COUNT(*) FROM dedupe_pages").fetchone()[0]
+    elapsed = time.monotonic() - start
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+    for result in results:
+        print(format_pair(result))
+    print(f"\n{len(results)} candidate pair(s) among {total} page(s) from {len(pairs)} LSH candidate(s); "
+          f"updated {updated} signature(s) in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""Lint an LLM Wiki from a persistent link graph.
+
+Finds orphan pages, missing link targets, stale raw sources and suggested
+articles (the mechanical part of the Lint operation) without re-reading
+every page: links are kept in <base>/.wiki/state.db and only pages whose
+content changed since the last run are re-parsed.
+
+Usage:
+    python3 wiki_lint.py <path> [--json] [--write]
+    python3 wiki_lint.py <path> mentions [--top 20]
+
+Checks:
+    Orphaned pages    Pages under sources/, concepts/, entities/ and queries/
+                      with no inbound link (index.md and its sub-indexes,
+                      log.md and health.md don't count: they list every page)
+    Missing pages     Link targets under wiki/ or raw/ that don't exist (links
+                      in log.md and health.md are not checked)
+    Stale sources     raw/ files (outside raw/assets/) no source page links to
+    Suggested         Missing wiki/ pages linked from 3+ pages
+
+--write replaces those four sections of wiki/health.md and its
+"Last checked" date; Inconsistencies and Action Items are left as they are.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+from wiki_pages import extract_links, open_state, page_id, read_page
+
+CONSUMER = "links"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS links (
+    source  TEXT NOT NULL,
+    target  TEXT NOT NULL,
+    count   INTEGER NOT NULL,
+    PRIMARY KEY (source, target)
+);
+CREATE INDEX IF NOT EXISTS idx_links_target ON links(target);
+"""
+
+# Pages whose links don't make a page "linked": they catalog everything
+LINK_HUBS = ("wiki/index", "wiki/log", "wiki/health")
+# ... and so do the generated sub-indexes (build_index.py)
+HUB_PREFIX = "wiki/index/"
+# Pages whose links are not checked: history and this script's own output
+REPORT_PAGES = ("wiki/log", "wiki/health")
+
+# Sections whose pages must be linked from somewhere
+CONTENT_SECTIONS = ("wiki/sources/", "wiki/concepts/", "wiki/entities/", "wiki/queries/")
+
+# Referring pages before a missing page is suggested as an article
+SUGGEST_MIN_MENTIONS = 3
+
+HEALTH_SECTIONS = {
+    "orphans": "Orphaned Pages",
+    "missing": "Missing Pages",
+    "stale_sources": "Stale Sources",
+    "suggested": "Suggested Articles",
+}
+
+
+def update_links(state):
+    """Re-parse the links of pages changed since the last run; returns how many were parsed."""
+    state.sync()
+    state.conn.executescript(SCHEMA)
+    stale, removed = state.pending(CONSUMER)
+    rows = []
+    for pid in stale:
+        counts = {}
+        for target in extract_links(read_page(state.base, pid)):
+            counts[target] = counts.get(target, 0) + 1
+        rows.extend((pid, target, count) for target, count in counts.items())
+    if stale or removed:
+        with state.transaction() as conn:
+            conn.executemany("DELETE FROM links WHERE source = ?", [(pid,) for pid in stale + removed])
+            conn.executemany("INSERT INTO links VALUES (?, ?, ?)", rows)
+            state.mark_indexed(conn, CONSUMER, stale, removed)
+    return len(stale)
+
+
+def _not_hub(column):
+    """SQL condition (with LINK_HUBS + HUB_PREFIX as parameters) that column is not a hub page."""
+    return f"{column} NOT IN ({','.join('?' * len(LINK_HUBS))}) AND {column} NOT LIKE ? || '%'"
+
+
+def mention_counts(state, limit=None):
+    """[(target, referring pages, total links)] most referenced first (hubs excluded)."""
+    sql = (f"SELECT target, COUNT(*), SUM(count) FROM links WHERE {_not_hub('source')} "
+           "AND source != target GROUP BY target ORDER BY COUNT(*) DESC, target")
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return state.conn.execute(sql, (*LINK_HUBS, HUB_PREFIX)).fetchall()
+
+
+def raw_files(base):
+    """Page ids of the files under raw/, raw/assets/ excluded."""
+    base = os.path.normpath(base)
+    raw = os.path.join(base, "raw")
+    prefix = len(base) + 1
+    found = []
+    for root, dirs, files in os.walk(raw):
+        dirs[:] = [d for d in dirs if not d.startswith(".") and not (root == raw and d == "assets")]
+        found.extend(page_id(os.path.join(root, name)[prefix:]) for name in files if not name.startswith("."))
+    return found
+
+
+def target_exists(base, target):
+    """Link targets that aren't pages may still be files (raw/ documents, charts, images)."""
+    path = os.path.join(base, target)
+    return os.path.exists(path) or os.path.exists(f"{path}.md")
+
+
+def lint(state):
+    """Run the link checks; returns the report dict."""
+    conn = state.conn
+    pages = set(state.page_ids())
+
+    orphans = [pid for (pid,) in conn.execute(
+        f"SELECT p.id FROM pages p WHERE NOT EXISTS ("
+        f"  SELECT 1 FROM links l WHERE l.target = p.id AND l.source != p.id AND {_not_hub('l.source')}"
+        f") ORDER BY p.id", (*LINK_HUBS, HUB_PREFIX)) if pid.startswith(CONTENT_SECTIONS)]
+
+    missing = []
+    for target, referrers in conn.execute(
+            f"SELECT target, GROUP_CONCAT(source, '\n') FROM links "
+            f"WHERE (target LIKE 'wiki/%' OR target LIKE 'raw/%') AND source NOT IN ({','.join('?' * len(REPORT_PAGES))}) "
+            f"GROUP BY target ORDER BY target", REPORT_PAGES):
+        if target not in pages and not target_exists(state.base, target):
+            missing.append({"target": target, "referenced_by": sorted(referrers.split("\n"))})
+
+    cited = {target for (target,) in conn.execute(
+        "SELECT DISTINCT target FROM links WHERE source LIKE 'wiki/sources/%' AND target LIKE 'raw/%'")}
+    stale_sources = sorted(pid for pid in raw_files(state.base)
+                           if pid not in cited and pid.rsplit(".", 1)[0] not in cited)
+
+    mentions = {target: count for target, count, _ in mention_counts(state)}
+    suggested = sorted(
+        ({"target": entry["target"], "mentions": mentions.get(entry["target"], 0)} for entry in missing
+         if entry["target"].startswith("wiki/") and mentions.get(entry["target"], 0) >= SUGGEST_MIN_MENTIONS),
+        key=lambda entry: (-entry["mentions"], entry["target"]),
+    )
+    return {
+        "pages": len(pages),
+        "links": conn.execute("SELECT COALESCE(SUM(count), 0) FROM links").fetchone()[0],
+        "orphans": orphans,
+        "missing": missing,
+        "stale_sources": stale_sources,
+        "suggested": suggested,
+    }
+
+
+def section_lines(report, key):
+    if key == "orphans":
+        lines = [f"- [[{pid}]]" for pid in report["orphans"]]
+    elif key == "missing":
+        lines = [f"- [[{entry['target']}]] — referenced by "
+                 + ", ".join(f"[[{source}]]" for source in entry["referenced_by"]) for entry in report["missing"]]
+    elif key == "stale_sources":
+        lines = [f"- [[{pid}]]" for pid in report["stale_sources"]]
+    else:
+        lines = [f"- [[{entry['target']}]] — linked from {entry['mentions']} pages" for entry in report["suggested"]]
+    return lines or ["- (none)"]
+
+
+def write_health(base, report):
+    """Replace the checked sections of wiki/health.md, keeping the LLM-written ones."""
+    path = Path(base) / "wiki" / "health.md"
+    text = path.read_text() if path.exists() else "# Wiki Health Report\nLast checked: Never\n"
+    text = re.sub(r"^Last checked:.*$", f"Last checked: {date.today().isoformat()}", text, count=1, flags=re.M)
+    for key, heading in HEALTH_SECTIONS.items():
+        body = "\n".join(section_lines(report, key)) + "\n"
+        pattern = re.compile(rf"^## {re.escape(heading)}\n.*?(?=^## |\Z)", re.M | re.S)
+        replacement = f"## {heading}\n{body}\n"
+        if pattern.search(text):
+            text = pattern.sub(lambda _: replacement, text, count=1)
+        else:
+            text = text.rstrip("\n") + f"\n\n{replacement}"
+    path.write_text(text.rstrip("\n") + "\n")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lint an LLM Wiki from its link graph")
+    parser.add_argument("path", help="Knowledge base path (contains wiki/)")
+    parser.add_argument("command", nargs="?", default="lint", choices=["lint", "mentions"])
+    parser.add_argument("--json", action="store_true", help="Print the lint report as JSON")
+    parser.add_argument("--write", action="store_true", help="Update the checked sections of wiki/health.md")
+    parser.add_argument("--top", type=int, default=20, help="Targets to list for 'mentions'")
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    try:
+        state = open_state(args.path)
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    with state:
+        parsed = update_links(state)
+        if args.command == "mentions":
+            print(f"{'Pages':>6} {'Links':>6}  Target")
+            for target, referrers, total in mention_counts(state, args.top):
+                print(f"{referrers:>6} {total:>6}  {target}")
+            return
+        report = lint(state)
+    elapsed = time.monotonic() - start
+
+    health = write_health(args.path, report) if args.write else None
+    if args.json:
+        print(json.dumps(report, indent=2))
+        if health:
+            # Keep stdout parseable
+            print(f"Updated: {health}", file=sys.stderr)
+        return
+    for key, heading in HEALTH_SECTIONS.items():
+        print(f"## {heading}")
+        print("\n".join(section_lines(report, key)) + "\n")
+    print(f"{report['pages']} page(s), {report['links']} link(s); re-parsed {parsed} changed page(s) in {elapsed:.2f}s")
+    if health:
+        print(f"Updated: {health}")
+
+
+if __name__ == "__main__":
+    main()
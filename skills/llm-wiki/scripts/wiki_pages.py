@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""Page store shared by the LLM Wiki scripts.
+
+Keeps one row per markdown page under wiki/ (mtime, size, SHA-256 and
+frontmatter) in <base>/.wiki/state.db, so the lint, search and index
+scripts only re-read pages that changed since they last ran.
+
+Each script that derives data from pages is a *consumer*: it records the
+hash of every page it indexed and asks `pending()` for the pages whose
+current hash differs (changed or new) and for those that were deleted.
+
+Usage:
+    python3 wiki_pages.py <path> [--rebuild]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+STATE_DIR = ".wiki"
+STATE_DB = "state.db"
+
+# Seconds to wait for another writer's lock
+BUSY_TIMEOUT = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id        TEXT PRIMARY KEY,  -- wiki/concepts/foo (path without .md)
+    mtime_ns  INTEGER NOT NULL,
+    size      INTEGER NOT NULL,
+    sha256    TEXT NOT NULL,
+    meta      TEXT NOT NULL      -- frontmatter as JSON
+);
+CREATE TABLE IF NOT EXISTS indexed (
+    consumer  TEXT NOT NULL,
+    id        TEXT NOT NULL,
+    sha256    TEXT NOT NULL,
+    PRIMARY KEY (consumer, id)
+);
+"""
+
+# [[wiki/concepts/foo]], [[wiki/concepts/foo|label]], [[wiki/concepts/foo#section]], ![[raw/assets/x.png]]
+LINK_RE = re.compile(r"\[\[([^\]|#\n]+)(?:#[^\]|\n]*)?(?:\|[^\]\n]*)?\]\]")
+
+
+def state_dir(base) -> Path:
+    return Path(base) / STATE_DIR
+
+
+def page_id(relative_path: str) -> str:
+    """'wiki/concepts/foo.md' (or a link target) -> 'wiki/concepts/foo'."""
+    relative_path = relative_path.strip().lstrip("./").replace(os.sep, "/")
+    return relative_path[:-3] if relative_path.endswith(".md") else relative_path
+
+
+def extract_links(text: str) -> list:
+    """Link targets in a page (frontmatter included), as page ids."""
+    return [page_id(target) for target in LINK_RE.findall(text)]
+
+
+def _scalar(value: str):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    if value.lstrip("-").isdigit():
+        return int(value)
+    return value
+
+
+def parse_frontmatter(text: str):
+    """Split a page into (frontmatter dict, body).
+
+    Handles the flat frontmatter the page formats use: scalars, quoted
+    strings, [a, b] lists and "- item" block lists.
+    """
+    if not text.startswith("---"):
+        return {}, text
+    end = text.find("\n---", 3)
+    if end == -1:
+        return {}, text
+    meta, key = {}, None
+    for line in text[3:end].splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped.startswith("- ") and key is not None:
+            if not isinstance(meta[key], list):
+                meta[key] = []
+            meta[key].append(_scalar(stripped[2:]))
+            continue
+        name, sep, value = line.partition(":")
+        if not sep:
+            continue
+        key = name.strip()
+        value = value.strip()
+        if value.startswith("[") and value.endswith("]") and not value.startswith("[["):
+            meta[key] = [_scalar(item) for item in value[1:-1].split(",") if item.strip()]
+        else:
+            meta[key] = _scalar(value) if value else ""
+    body = text[end + 4:]
+    return meta, body[body.find("\n") + 1:] if "\n" in body else ""
+
+
+def read_page(base, pid: str) -> str:
+    return (Path(base) / f"{pid}.md").read_text(encoding="utf-8", errors="replace")
+
+
+def walk_pages(base):
+    """(page id, os.stat_result) for every .md file under wiki/."""
+    base = os.path.normpath(base)
+    prefix = len(base) + 1
+    for root, dirs, files in os.walk(os.path.join(base, "wiki")):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in files:
+            if name.endswith(".md"):
+                path = os.path.join(root, name)
+                yield page_id(path[prefix:]), os.stat(path)
+
+
+class WikiState:
+    """Page table and per-consumer index bookkeeping in SQLite (WAL mode)."""
+
+    def __init__(self, base):
+        self.base = Path(base)
+        directory = state_dir(base)
+        directory.mkdir(exist_ok=True)
+        self.conn = sqlite3.connect(str(directory / STATE_DB), timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction that takes the database write lock up front."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def sync(self):
+        """Bring the page table up to date with wiki/; returns (changed ids, deleted ids).
+
+        Files whose mtime and size match are not read. Touched files are
+        re-hashed and only count as changed if their content differs.
+        """
+        known = {row[0]: row[1:] for row in self.conn.execute("SELECT id, mtime_ns, size, sha256 FROM pages")}
+        changed, touched, seen = [], [], set()
+        for pid, stat in walk_pages(self.base):
+            seen.add(pid)
+            previous = known.get(pid)
+            if previous and previous[:2] == (stat.st_mtime_ns, stat.st_size):
+                continue
+            text = read_page(self.base, pid)
+            sha = hashlib.sha256(text.encode()).hexdigest()
+            if previous and previous[2] == sha:
+                touched.append((stat.st_mtime_ns, stat.st_size, pid))
+                continue
+            meta, _ = parse_frontmatter(text)
+            changed.append((pid, stat.st_mtime_ns, stat.st_size, sha, json.dumps(meta, default=str)))
+        deleted = [pid for pid in known if pid not in seen]
+        if changed or touched or deleted:
+            with self.transaction() as conn:
+                conn.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)", changed)
+                conn.executemany("UPDATE pages SET mtime_ns = ?, size = ? WHERE id = ?", touched)
+                conn.executemany("DELETE FROM pages WHERE id = ?", [(pid,) for pid in deleted])
+        return [row[0] for row in changed], deleted
+
+    def pending(self, consumer):
+        """(ids a consumer has not indexed at their current hash, ids it indexed that no longer exist)."""
+        stale = [row[0] for row in self.conn.execute(
+            "SELECT p.id FROM pages p LEFT JOIN indexed i ON i.consumer = ? AND i.id = p.id "
+            "WHERE i.sha256 IS NOT p.sha256", (consumer,))]
+        removed = [row[0] for row in self.conn.execute(
+            "SELECT id FROM indexed WHERE consumer = ? AND id NOT IN (SELECT id FROM pages)", (consumer,))]
+        return stale, removed
+
+    def mark_indexed(self, conn, consumer, ids, removed=()):
+        """Record (inside the consumer's transaction) that ids are indexed at their current hash."""
+        conn.executemany(
+            "INSERT OR REPLACE INTO indexed SELECT ?, id, sha256 FROM pages WHERE id = ?",
+            [(consumer, pid) for pid in ids],
+        )
+        conn.executemany("DELETE FROM indexed WHERE consumer = ? AND id = ?", [(consumer, pid) for pid in removed])
+
+    def reset(self, consumer=None):
+        """Forget what a consumer (default: every consumer and the page table) has indexed."""
+        with self.transaction() as conn:
+            if consumer:
+                conn.execute("DELETE FROM indexed WHERE consumer = ?", (consumer,))
+            else:
+                conn.execute("DELETE FROM indexed")
+                conn.execute("DELETE FROM pages")
+
+    def meta(self, pid):
+        row = self.conn.execute("SELECT meta FROM pages WHERE id = ?", (pid,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def page_ids(self):
+        return [row[0] for row in self.conn.execute("SELECT id FROM pages ORDER BY id")]
+
+
+def open_state(base) -> WikiState:
+    """Open the wiki's state database, creating .wiki/ if needed."""
+    if not (Path(base) / "wiki").is_dir():
+        raise FileNotFoundError(f"No wiki/ directory under {base} (run init_wiki.py first)")
+    return WikiState(base)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the LLM Wiki page table")
+    parser.add_argument("path", help="Knowledge base path (contains wiki/)")
+    parser.add_argument("--rebuild", action="store_true", help="Forget all indexed state first")
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    with open_state(args.path) as state:
+        if args.rebuild:
+            state.reset()
+        changed, deleted = state.sync()
+        total = len(state.page_ids())
+    print(f"{total} page(s): {len(changed)} changed, {len(deleted)} deleted "
+          f"({time.monotonic() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
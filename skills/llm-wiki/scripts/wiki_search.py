@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Ranked full-text search over LLM Wiki pages.
+
+Indexes the title, aliases, other frontmatter fields and body of every
+page in sources/, concepts/ and entities/ in an SQLite FTS5 table in
+<base>/.wiki/state.db. Only pages changed since the last run are
+re-indexed (see wiki_pages.py), so searching right after an ingest is
+as cheap as any other search.
+
+Usage:
+    python3 wiki_search.py <path> search "rate limiting retries" [-k 10] [--json]
+    python3 wiki_search.py <path> search 'title:webhook* AND body:"signature"' --raw
+    python3 wiki_search.py <path> update
+
+Results are ranked by BM25, with matches in the title and aliases
+weighted above frontmatter and body matches. Each result has a snippet
+of the best-matching body text. Without --raw, the words of the query
+are ORed together and the last word also matches as a prefix.
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import time
+
+from wiki_pages import open_state, parse_frontmatter, read_page
+
+CONSUMER = "search"
+
+# Page sections that are indexed
+SEARCH_SECTIONS = ("wiki/sources/", "wiki/concepts/", "wiki/entities/")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_docs (
+    id  TEXT PRIMARY KEY  -- its rowid is the FTS rowid
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5(
+    title, aliases, meta, body,
+    tokenize = 'porter unicode61'
+);
+"""
+
+# bm25() column weights: title, aliases, meta, body
+COLUMN_WEIGHTS = (10.0, 8.0, 2.0, 1.0)
+
+DEFAULT_TOP_K = 10
+SNIPPET_TOKENS = 16
+
+
+def _text(value):
+    if isinstance(value, list):
+        return " ".join(str(item) for item in value)
+    return str(value)
+
+
+def document(text):
+    """(title, aliases, meta, body) columns for a page."""
+    meta, body = parse_frontmatter(text)
+    title = _text(meta.pop("title", ""))
+    if not title:
+        heading = re.search(r"^# (.+)$", body, re.M)
+        title = heading.group(1) if heading else ""
+    aliases = _text(meta.pop("aliases", ""))
+    fields = " ".join(f"{key} {_text(value)}" for key, value in meta.items())
+    return title, aliases, fields, body
+
+
+def update_index(state):
+    """Re-index pages changed since the last run; returns how many were indexed."""
+    state.sync()
+    state.conn.executescript(SCHEMA)
+    stale, removed = state.pending(CONSUMER)
+    if not (stale or removed):
+        return 0
+    # Pages outside SEARCH_SECTIONS are only marked, so they aren't pending again
+    documents = [(pid, document(read_page(state.base, pid))) for pid in stale if pid.startswith(SEARCH_SECTIONS)]
+    with state.transaction() as conn:
+        for pid in stale + removed:
+            row = conn.execute("SELECT rowid FROM search_docs WHERE id = ?", (pid,)).fetchone()
+            if row:
+                conn.execute("DELETE FROM search WHERE rowid = ?", row)
+        conn.executemany("DELETE FROM search_docs WHERE id = ?", [(pid,) for pid in removed])
+        for pid, columns in documents:
+            conn.execute("INSERT OR IGNORE INTO search_docs (id) VALUES (?)", (pid,))
+            rowid = conn.execute("SELECT rowid FROM search_docs WHERE id = ?", (pid,)).fetchone()[0]
+            conn.execute("INSERT INTO search (rowid, title, aliases, meta, body) VALUES (?, ?, ?, ?, ?)",
+                         (rowid, *columns))
+        state.mark_indexed(conn, CONSUMER, stale, removed)
+    return len(documents)
+
+
+def match_expression(query):
+    """FTS5 MATCH expression for free text: words ORed, the last one as a prefix."""
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " OR ".join(terms)
+
+
+def search(state, query, top_k=DEFAULT_TOP_K, raw=False):
+    """[{"id", "title", "type", "score", "snippet"}] best match first."""
+    expression = query if raw else match_expression(query)
+    if not expression:
+        return []
+    weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS)
+    rows = state.conn.execute(
+        f"SELECT d.id, s.title, bm25(search, {weights}) AS score, "
+        f"snippet(search, 3, '**', '**', '…', {SNIPPET_TOKENS}) "
+        f"FROM search s JOIN search_docs d ON d.rowid = s.rowid "
+        f"WHERE search MATCH ? ORDER BY score LIMIT ?",
+        (expression, top_k),
+    ).fetchall()
+    results = []
+    for pid, title, score, snippet in rows:
+        meta = state.meta(pid) or {}
+        results.append({
+            "id": pid,
+            "title": title,
+            "type": meta.get("type", ""),
+            "score": round(-score, 3),
+            "snippet": " ".join(snippet.split()),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search LLM Wiki pages")
+    parser.add_argument("path", help="Knowledge base path (contains wiki/)")
+    subparsers = parser.add_subparsers(dest="command", help="Commands")
+    search_parser = subparsers.add_parser("search", help="Top pages for a query")
+    search_parser.add_argument("query", help="Words to search for (FTS5 syntax with --raw)")
+    search_parser.add_argument("-k", "--top", type=int, default=DEFAULT_TOP_K, help="Results to return")
+    search_parser.add_argument("--raw", action="store_true", help="Pass the query to FTS5 MATCH unchanged")
+    search_parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    subparsers.add_parser("update", help="Index pages changed since the last run")
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    try:
+        state = open_state(args.path)
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    with state:
+        indexed = update_index(state)
+        if args.command == "update":
+            print(f"Indexed {indexed} changed page(s) in {time.monotonic() - start:.2f}s")
+            return
+        if args.command != "search":
+            parser.print_help()
+            return
+        try:
+            results = search(state, args.query, args.top, args.raw)
+        except sqlite3.OperationalError as e:
+            print(f"Error: invalid search query: {e}", file=sys.stderr)
+            sys.exit(1)
+    elapsed = time.monotonic() - start
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+    if not results:
+        print("No matching pages.")
+    for number, result in enumerate(results, 1):
+        kind = f" ({result['type']})" if result["type"] else ""
+        print(f"{number:>2}. [[{result['id']}]] — {result['title']}{kind}")
+        print(f"    {result['snippet']}")
+    print(f"\n{len(results)} result(s) in {elapsed:.2f}s" + (f" (indexed {indexed} changed page(s))" if indexed else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+BigQuery Log Arrival Poller
+Waits until the app logs of every collected RQ ID are queryable in
+BigQuery (Steps 3-4 of SKILL.md), replacing the fixed `sleep 30` and 30s
+poll interval.
+
+Usage:
+    python3 log_poller.py poll [--lifecycle /tmp/senders_api_lifecycle.json]
+    python3 log_poller.py poll --batch-results /tmp/senders_api_batch_results.jsonl
+    python3 log_poller.py poll --env dev --rq-id RQ... [--rq-id RQ...]
+    python3 log_poller.py lag [--env dev]
+
+Poll options:
+    --deadline 300        Give up on missing RQ IDs after this many seconds
+    --initial-wait N      First poll after N seconds (default: from recorded ingest lag)
+    --min-interval 2      First retry interval; grows by --backoff (1.6x) per attempt
+    --max-interval 30     Retry interval cap
+
+The first poll is timed from the ingest lag recorded for the environment
+(minus the time since the requests finished). Each retry only queries the
+RQ IDs not found yet, and polling stops as soon as all of them are found.
+Both bounds of each ID's ingest lag are appended to
+/tmp/senders_ingest_lag.json: the time from its first log line to the poll
+that found it is an upper bound, and for an ID found on a retry the time to
+the previous poll (which missed it) is a lower bound. The wait is the median
+lower bound, capped by the median upper bound; while fewer than
+MIN_LAG_SAMPLES lower bounds exist (every ID found on the first poll), it is
+half the median upper bound, so it shrinks run by run until a poll misses.
+Results are written to /tmp/senders_log_poll.json.
+
+Exit status: 0 when every RQ ID was found, 2 when some are still missing at
+the deadline, 1 on a BigQuery error.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from senders_api import LIFECYCLE_RESULTS_FILE, SCRIPT_DIR, build_rq_id_query
+
+# Streaming bq reader shared with the error scanner
+sys.path.insert(0, str(SCRIPT_DIR.parent / "bigquery-error-scanner"))
+from bq_stream import BigQueryError, parse_timestamp, run_query  # noqa: E402
+
+LAG_HISTORY_FILE = Path("/tmp/senders_ingest_lag.json")
+POLL_RESULTS_FILE = Path("/tmp/senders_log_poll.json")
+
+DEFAULT_DEADLINE = 300
+DEFAULT_INITIAL_WAIT = 5
+DEFAULT_MIN_INTERVAL = 2
+DEFAULT_MAX_INTERVAL = 30
+DEFAULT_BACKOFF = 1.6
+
+# Lag samples kept per environment
+LAG_HISTORY_SIZE = 200
+# Samples (of either bound) needed before they set the initial wait
+MIN_LAG_SAMPLES = 3
+# Without enough lower bounds, the first poll probes at this fraction of the median upper bound
+UPPER_BOUND_PROBE = 0.5
+
+
+def load_lag_history(path=LAG_HISTORY_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def record_lag(env, lower=(), upper=(), path=LAG_HISTORY_FILE):
+    """Append lower and upper ingest lag bounds (seconds) for an environment."""
+    if not lower and not upper:
+        return
+    history = load_lag_history(path)
+    bounds = history.setdefault(env, {})
+    for kind, samples in (("lower", lower), ("upper", upper)):
+        bounds[kind] = (bounds.get(kind, []) + [round(s, 1) for s in samples])[-LAG_HISTORY_SIZE:]
+    with open(path, "w") as f:
+        json.dump(history, f)
+
+
+def lag_summary(samples):
+    ordered = sorted(samples)
+    return {
+        "samples": len(ordered),
+        "p50": statistics.median(ordered),
+        "p90": ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))],
+        "max": ordered[-1],
+    }
+
+
+def env_wait(bounds):
+    """Expected ingest lag of one env from its recorded {"lower": [...], "upper": [...]} bounds."""
+    lower, upper = bounds.get("lower", []), bounds.get("upper", [])
+    wait = DEFAULT_INITIAL_WAIT
+    if len(lower) >= MIN_LAG_SAMPLES:
+        wait = statistics.median(lower)
+    elif len(upper) >= MIN_LAG_SAMPLES:
+        wait = min(wait, statistics.median(upper) * UPPER_BOUND_PROBE)
+    if len(upper) >= MIN_LAG_SAMPLES:
+        wait = min(wait, statistics.median(upper))
+    return wait
+
+
+def initial_wait(envs, history, since_requests=0.0):
+    """Seconds until the first poll: expected lag of the slowest env, minus time already passed."""
+    wait = max(env_wait(history.get(env, {})) for env in envs) if envs else DEFAULT_INITIAL_WAIT
+    return max(0.0, wait - since_requests)
+
+
+def load_targets(lifecycle=None, batch_results=None, env=None, rq_ids=()):
+    """Return ({rq_id: env}, seconds since the requests finished)."""
+    targets = {rq_id: env for rq_id in rq_ids}
+    since = 0.0
+    if lifecycle:
+        with open(lifecycle) as f:
+            result = json.load(f)
+        targets.update({rq_id: result["environment"] for rq_id in result["rq_ids"]})
+        since = time.time() - Path(lifecycle).stat().st_mtime
+    if batch_results:
+        with open(batch_results) as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    if row.get("rq_id") and row["rq_id"] != "N/A":
+                        targets[row["rq_id"]] = row["env"]
+        since = time.time() - Path(batch_results).stat().st_mtime
+    return targets, max(0.0, since)
+
+
+def default_query(sql):
+    return list(run_query(sql))
+
+
+def poll_logs(targets, deadline=DEFAULT_DEADLINE, wait=None, min_interval=DEFAULT_MIN_INTERVAL,
+              max_interval=DEFAULT_MAX_INTERVAL, backoff=DEFAULT_BACKOFF, query=default_query,
+              sleep=time.sleep, clock=time.time, on_query=None, on_attempt=None):
+    """Poll until every RQ ID in {rq_id: env} has logs or the deadline passes.
+
+    Returns {"found": {rq_id: first_logged}, "missing": [...], "attempts": [...],
+    "lag": {env: [seconds, ...]}, "lag_upper": {env: [seconds, ...]}}; lag
+    samples are lower bounds from RQ IDs an earlier poll missed, lag_upper
+    samples the time from each found ID's first log line to the poll that
+    found it. `query(sql)` returns the result rows.
+    `on_query(number, env, sql)` is called before each query and
+    `on_attempt(attempt)` after each poll attempt.
+    """
+    start = clock()
+    found, lag, lag_upper, attempts = {}, {}, {}, []
+    # env -> when its previous query started (its missing IDs were not queryable then)
+    previous_poll = {}
+    wait = initial_wait(set(targets.values()), load_lag_history()) if wait is None else wait
+    interval = min_interval
+    sleep(min(wait, deadline))
+
+    while True:
+        missing_by_env = {}
+        for rq_id, env in targets.items():
+            if rq_id not in found:
+                missing_by_env.setdefault(env, []).append(rq_id)
+        if not missing_by_env:
+            break
+
+        number = len(attempts) + 1
+        queried = 0
+        for env, rq_ids in sorted(missing_by_env.items()):
+            sql = build_rq_id_query(env, rq_ids)
+            if on_query:
+                on_query(number, env, sql)
+            polled_at = clock()
+            rows = query(sql)
+            queried += len(rq_ids)
+            for row in rows:
+                rq_id = row.get("request_id")
+                if rq_id in targets and rq_id not in found:
+                    found[rq_id] = row.get("first_logged")
+                    logged = parse_timestamp(row.get("first_logged"))
+                    if logged is None:
+                        continue
+                    lag_upper.setdefault(env, []).append(max(0.0, polled_at - logged))
+                    if env in previous_poll:
+                        lag.setdefault(env, []).append(max(0.0, previous_poll[env] - logged))
+            previous_poll[env] = polled_at
+        attempts.append({
+            "attempt": number,
+            "elapsed_s": round(clock() - start, 1),
+            "queried": queried,
+            "found": len(found),
+        })
+        if on_attempt:
+            on_attempt(attempts[-1])
+
+        remaining = deadline - (clock() - start)
+        if len(found) == len(targets) or remaining <= 0:
+            break
+        sleep(min(interval, remaining))
+        interval = min(max_interval, interval * backoff)
+
+    return {
+        "found": found,
+        "missing": [rq_id for rq_id in targets if rq_id not in found],
+        "attempts": attempts,
+        "lag": lag,
+        "lag_upper": lag_upper,
+        "elapsed_s": round(clock() - start, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wait for RQ ID logs to arrive in BigQuery")
+    subparsers = parser.add_subparsers(dest="command", help="Commands")
+
+    poll_parser = subparsers.add_parser("poll", help="Poll BigQuery until every RQ ID has logs")
+    poll_parser.add_argument("--lifecycle", help="Lifecycle results JSON (default when no other input is given)")
+    poll_parser.add_argument("--batch-results", help="Batch results JSONL")
+    poll_parser.add_argument("--env", "-e", choices=["dev", "stage", "prod"], help="Environment for --rq-id")
+    poll_parser.add_argument("--rq-id", action="append", default=[], help="RQ ID to wait for (repeatable)")
+    poll_parser.add_argument("--deadline", type=float, default=DEFAULT_DEADLINE, help="Seconds before giving up")
+    poll_parser.add_argument("--initial-wait", type=float, help="Seconds before the first poll (default: from recorded lag)")
+    poll_parser.add_argument("--min-interval", type=float, default=DEFAULT_MIN_INTERVAL, help="First retry interval")
+    poll_parser.add_argument("--max-interval", type=float, default=DEFAULT_MAX_INTERVAL, help="Retry interval cap")
+    poll_parser.add_argument("--backoff", type=float, default=DEFAULT_BACKOFF, help="Retry interval growth factor")
+    poll_parser.add_argument("--output", "-o", default=str(POLL_RESULTS_FILE), help="Poll results JSON")
+
+    lag_parser = subparsers.add_parser("lag", help="Show recorded ingest lag per environment")
+    lag_parser.add_argument("--env", "-e", choices=["dev", "stage", "prod"], help="Only this environment")
+
+    args = parser.parse_args()
+
+    if args.command == "poll":
+        if args.rq_id and not args.env:
+            poll_parser.error("--rq-id requires --env")
+        lifecycle = args.lifecycle
+        if not (lifecycle or args.batch_results or args.rq_id):
+            lifecycle = str(LIFECYCLE_RESULTS_FILE)
+        targets, since = load_targets(lifecycle, args.batch_results, args.env, args.rq_id)
+        if not targets:
+            print("No RQ IDs to poll for.")
+            return
+
+        envs = sorted(set(targets.values()))
+        wait = args.initial_wait
+        if wait is None:
+            wait = initial_wait(envs, load_lag_history(), since)
+        print(f"Waiting for logs of {len(targets)} RQ ID(s) in {', '.join(envs)} "
+              f"(first poll in {wait:.0f}s, deadline {args.deadline:.0f}s)...")
+
+        def on_query(number, env, sql):
+            print(f"\n=== BIGQUERY QUERY (Poll Attempt {number}, {env}) ===\n{sql}\n", flush=True)
+
+        def on_attempt(attempt):
+            print(f"Attempt {attempt['attempt']} at {attempt['elapsed_s']:.1f}s: queried {attempt['queried']} "
+                  f"RQ ID(s), found logs for {attempt['found']}/{len(targets)} requests", flush=True)
+
+        try:
+            result = poll_logs(targets, args.deadline, wait, args.min_interval, args.max_interval,
+                               args.backoff, on_query=on_query, on_attempt=on_attempt)
+        except BigQueryError as e:
+            print(f"BigQuery error: {e}", file=sys.stderr)
+            sys.exit(1)
+        for env in set(result["lag"]) | set(result["lag_upper"]):
+            record_lag(env, result["lag"].get(env, []), result["lag_upper"].get(env, []))
+
+        with open(args.output, "w") as f:
+            json.dump({"targets": targets, **result}, f, indent=2)
+
+        print("\n" + "-" * 60)
+        print(f"Found:          {len(result['found'])}/{len(targets)} RQ IDs in {result['elapsed_s']:.1f}s "
+              f"({len(result['attempts'])} poll(s))")
+        for env, samples in sorted(result["lag"].items()):
+            print(f"Ingest lag:     {env}: median {statistics.median(samples):.1f}s, max {max(samples):.1f}s")
+        for env, samples in sorted(result["lag_upper"].items()):
+            if env not in result["lag"]:
+                print(f"Ingest lag:     {env}: at most {statistics.median(samples):.1f}s (median upper bound)")
+        for rq_id in result["missing"]:
+            print(f"Missing:        {rq_id} ({targets[rq_id]})")
+        print(f"Results:        {args.output}")
+        print("-" * 60)
+        if result["missing"]:
+            sys.exit(2)
+    elif args.command == "lag":
+        history = load_lag_history()
+        envs = [args.env] if args.env else sorted(history)
+        if not any(history.get(env) for env in envs):
+            print("No ingest lag recorded yet.")
+            return
+        print(f"{'Env':<6} {'Bound':<6} {'Samples':>8} {'p50':>7} {'p90':>7} {'Max':>7} {'Next wait':>10}")
+        for env in envs:
+            for kind in ("lower", "upper"):
+                if history.get(env, {}).get(kind):
+                    s = lag_summary(history[env][kind])
+                    print(f"{env:<6} {kind:<6} {s['samples']:>8} {s['p50']:>6.1f}s {s['p90']:>6.1f}s "
+                          f"{s['max']:>6.1f}s {env_wait(history[env]):>9.1f}s")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,25 +10,43 @@ Usage:
     python3 senders_api.py get SENDER_SID
     python3 senders_api.py update SENDER_SID [--description "New desc"] [--name "New name"]
     python3 senders_api.py delete SENDER_SID
+    python3 senders_api.py batch MANIFEST.jsonl [--output results.jsonl] [--workers 16] [--per-env 8]
+    python3 senders_api.py lifecycle --env dev --sender-id "whatsapp:+1234567890" [--sender-id ...] [--workers 8]
 
 Credentials are stored in /tmp/twilio_senders_test_credentials.json
 Responses are saved to /tmp/senders_api_response.json
 Headers are saved to /tmp/senders_api_headers.json
+  (--response-sink=off|last|log|ring; log/ring write /tmp/senders_api_responses.jsonl)
+Batch results are streamed to /tmp/senders_api_batch_results.jsonl
+Lifecycle results are saved to /tmp/senders_api_lifecycle.json
 """
 
 import argparse
+import csv
+import http.client
 import json
 import os
 import sys
-import urllib.request
-import urllib.error
-import base64
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 
 # Paths
+SCRIPT_DIR = Path(__file__).parent.resolve()
 CREDENTIALS_FILE = Path("/tmp/twilio_senders_test_credentials.json")
 RESPONSE_FILE = Path("/tmp/senders_api_response.json")
 HEADERS_FILE = Path("/tmp/senders_api_headers.json")
+RESPONSE_LOG_FILE = Path("/tmp/senders_api_responses.jsonl")
+BATCH_RESULTS_FILE = Path("/tmp/senders_api_batch_results.jsonl")
+LIFECYCLE_RESULTS_FILE = Path("/tmp/senders_api_lifecycle.json")
+
+# Shared Twilio modules (pooled keep-alive transport, rate-limit scheduler, response sink)
+sys.path.insert(0, str(SCRIPT_DIR.parent / "twilio-common"))
+import twilio_scheduler  # noqa: E402
+import twilio_sink  # noqa: E402
+import twilio_transport  # noqa: E402
 
 # Environment to URL mapping
 ENV_URLS = {
@@ -37,6 +55,26 @@ ENV_URLS = {
     "prod": "https://messaging.twilio.com"
 }
 
+# Point every environment at one host instead (e.g. the local mock server)
+if os.environ.get("SENDERS_API_BASE_URL"):
+    ENV_URLS = {env: os.environ["SENDERS_API_BASE_URL"].rstrip("/") for env in ENV_URLS}
+
+# BigQuery app logs table used to verify RQ IDs
+BIGQUERY_LOGS_TABLE = "qtco-messaging-channels.{env}.app_messaging_ott_management_api_mgmt_stdout"
+
+# Operation to HTTP method mapping
+OPERATION_METHODS = {
+    "create": "POST",
+    "get": "GET",
+    "update": "PATCH",
+    "delete": "DELETE"
+}
+
+# Batch mode concurrency defaults
+BATCH_WORKERS = 16
+BATCH_PER_ENV_LIMIT = 8
+LIFECYCLE_WORKERS = 8
+
 # Default profile template
 DEFAULT_PROFILE = {
     "name": "Twilio Test1",
@@ -47,8 +85,20 @@ DEFAULT_PROFILE = {
 }
 
 
+# Credentials file is read once per process (batch mode calls this per operation)
+_credentials_cache = {}
+_credentials_lock = threading.Lock()
+
+# Where api_request records responses (see configure_response_sink)
+_response_sink = None
+
+
 def load_credentials(environment):
     """Load credentials for a specific environment."""
+    with _credentials_lock:
+        if environment in _credentials_cache:
+            return _credentials_cache[environment]
+
     if not CREDENTIALS_FILE.exists():
         print(f"Error: No credentials found at {CREDENTIALS_FILE}")
         print("Run: python3 senders_api.py set-credentials ACCOUNT_SID AUTH_TOKEN ENV")
@@ -59,6 +109,8 @@ def load_credentials(environment):
 
     for cred in data.get("credentials", []):
         if cred.get("environment") == environment:
+            with _credentials_lock:
+                _credentials_cache[environment] = (cred["account_sid"], cred["auth_token"])
             return cred["account_sid"], cred["auth_token"]
 
     print(f"Error: No credentials found for environment '{environment}'")
@@ -92,6 +144,9 @@ def save_credentials(account_sid, auth_token, environment):
     with open(CREDENTIALS_FILE, "w") as f:
         json.dump(data, f, indent=2)
 
+    with _credentials_lock:
+        _credentials_cache.pop(environment, None)
+
     print(f"Credentials saved for environment: {environment}")
     print(f"Account: {account_sid[:6]}...{account_sid[-4:]}")
 
@@ -119,54 +174,99 @@ def list_credentials():
     print()
 
 
-def api_request(method, url, account_sid, auth_token, data=None):
-    """Make authenticated request to Senders API."""
-    # Create auth header
-    auth_string = f"{account_sid}:{auth_token}"
-    auth_bytes = base64.b64encode(auth_string.encode()).decode()
+def configure_response_sink(mode):
+    """Select how responses are recorded: off, last, log or ring."""
+    global _response_sink
+    if _response_sink is not None:
+        _response_sink.close()
+    _response_sink = twilio_sink.ResponseSink(
+        mode,
+        last_files={"body": RESPONSE_FILE, "headers": HEADERS_FILE},
+        log_file=RESPONSE_LOG_FILE
+    )
+    return _response_sink
 
-    headers = {
-        "Authorization": f"Basic {auth_bytes}",
-        "Content-Type": "application/json"
-    }
 
+def get_response_sink():
+    """Return the active response sink, defaulting to last-response files."""
+    if _response_sink is None:
+        configure_response_sink(os.environ.get(twilio_sink.ENV_VAR, "last"))
+    return _response_sink
+
+
+def api_request(method, url, account_sid, auth_token, data=None):
+    """Make authenticated request to Senders API."""
     encoded_data = None
     if data:
         encoded_data = json.dumps(data).encode()
 
-    req = urllib.request.Request(url, data=encoded_data, headers=headers, method=method)
+    status_code, response_headers, raw = twilio_transport.request(
+        method, url, account_sid, auth_token, encoded_data
+    )
 
-    response_headers = {}
     response_body = {}
-    status_code = 0
-
-    try:
-        with urllib.request.urlopen(req) as response:
-            status_code = response.status
-            response_headers = dict(response.headers)
-            body = response.read().decode()
-            if body:
-                response_body = json.loads(body)
-    except urllib.error.HTTPError as e:
-        status_code = e.code
-        response_headers = dict(e.headers)
-        body = e.read().decode()
-        if body:
+    body = raw.decode()
+    if body:
+        if status_code < 400:
+            response_body = json.loads(body)
+        else:
             try:
                 response_body = json.loads(body)
             except json.JSONDecodeError:
                 response_body = {"raw_error": body}
 
-    # Save to files
-    with open(RESPONSE_FILE, "w") as f:
-        json.dump(response_body, f, indent=2)
-
-    with open(HEADERS_FILE, "w") as f:
-        json.dump(response_headers, f, indent=2)
+    # Recorded off the request thread
+    get_response_sink().record(method, url, status_code, response_headers, response_body)
 
     return status_code, response_headers, response_body
 
 
+def get_request_id(headers):
+    """Extract the Twilio-Request-Id header (case-insensitive)."""
+    return headers.get("Twilio-Request-Id", headers.get("twilio-request-id", "N/A"))
+
+
+def get_base_url(environment):
+    """Resolve the Senders API base URL for an environment."""
+    base_url = ENV_URLS.get(environment)
+    if not base_url:
+        print(f"Error: Unknown environment '{environment}'")
+        sys.exit(1)
+    return base_url
+
+
+def build_profile(profile_name=None, profile_desc=None):
+    """Return the default profile with optional name/description overrides."""
+    profile = DEFAULT_PROFILE.copy()
+    if profile_name:
+        profile["name"] = profile_name
+    if profile_desc:
+        profile["description"] = profile_desc
+    return profile
+
+
+def build_request(operation, environment, sender_sid=None, sender_id=None, waba_id=None,
+                  profile_name=None, profile_desc=None):
+    """Return (method, url, payload) for a Senders API operation."""
+    base_url = get_base_url(environment)
+    method = OPERATION_METHODS[operation]
+
+    if operation == "create":
+        payload = {
+            "sender_id": sender_id,
+            "profile": build_profile(profile_name, profile_desc)
+        }
+        if waba_id:
+            payload["configuration"] = {"waba_id": waba_id}
+        return method, f"{base_url}/v2/Channels/Senders", payload
+
+    url = f"{base_url}/v2/Channels/Senders/{sender_sid}"
+    if operation == "update":
+        # Only profile fields are allowed on update
+        return method, url, {"profile": build_profile(profile_name, profile_desc)}
+    return method, url, None
+
+
 def print_response(operation, method, url, env, status_code, headers, body, payload=None, key_params=None):
     """Print formatted response."""
     print("=" * 60)
@@ -180,7 +280,7 @@ def print_response(operation, method, url, env, status_code, headers, body, payl
         print("\n=== REQUEST PAYLOAD ===")
         print(json.dumps(payload, indent=2))
 
-    rq_id = headers.get("Twilio-Request-Id", headers.get("twilio-request-id", "N/A"))
+    rq_id = get_request_id(headers)
 
     print(f"\n=== RESPONSE (HTTP {status_code}) ===")
     print(json.dumps(body, indent=2))
@@ -204,29 +304,12 @@ def print_response(operation, method, url, env, status_code, headers, body, payl
 def create_sender(environment, sender_id, waba_id=None, profile_name=None, profile_desc=None):
     """Create a new sender."""
     account_sid, auth_token = load_credentials(environment)
-    base_url = ENV_URLS.get(environment)
-    if not base_url:
-        print(f"Error: Unknown environment '{environment}'")
-        sys.exit(1)
-
-    url = f"{base_url}/v2/Channels/Senders"
-
-    # Build payload
-    profile = DEFAULT_PROFILE.copy()
-    if profile_name:
-        profile["name"] = profile_name
-    if profile_desc:
-        profile["description"] = profile_desc
-
-    payload = {
-        "sender_id": sender_id,
-        "profile": profile
-    }
-
-    if waba_id:
-        payload["configuration"] = {"waba_id": waba_id}
+    method, url, payload = build_request(
+        "create", environment, sender_id=sender_id, waba_id=waba_id,
+        profile_name=profile_name, profile_desc=profile_desc
+    )
 
-    status, headers, body = api_request("POST", url, account_sid, auth_token, payload)
+    status, headers, body = api_request(method, url, account_sid, auth_token, payload)
 
     # Extract key params for summary
     sender_sid = body.get("sid", "N/A")
@@ -247,14 +330,9 @@ def create_sender(environment, sender_id, waba_id=None, profile_name=None, profi
 def get_sender(environment, sender_sid):
     """Get a sender by SID."""
     account_sid, auth_token = load_credentials(environment)
-    base_url = ENV_URLS.get(environment)
-    if not base_url:
-        print(f"Error: Unknown environment '{environment}'")
-        sys.exit(1)
-
-    url = f"{base_url}/v2/Channels/Senders/{sender_sid}"
+    method, url, _ = build_request("get", environment, sender_sid=sender_sid)
 
-    status, headers, body = api_request("GET", url, account_sid, auth_token)
+    status, headers, body = api_request(method, url, account_sid, auth_token)
 
     # Extract key params for summary
     key_params = {
@@ -272,23 +350,12 @@ def get_sender(environment, sender_sid):
 def update_sender(environment, sender_sid, profile_name=None, profile_desc=None):
     """Update a sender."""
     account_sid, auth_token = load_credentials(environment)
-    base_url = ENV_URLS.get(environment)
-    if not base_url:
-        print(f"Error: Unknown environment '{environment}'")
-        sys.exit(1)
+    method, url, payload = build_request(
+        "update", environment, sender_sid=sender_sid,
+        profile_name=profile_name, profile_desc=profile_desc
+    )
 
-    url = f"{base_url}/v2/Channels/Senders/{sender_sid}"
-
-    # Build update payload - only profile fields allowed
-    profile = DEFAULT_PROFILE.copy()
-    if profile_name:
-        profile["name"] = profile_name
-    if profile_desc:
-        profile["description"] = profile_desc
-
-    payload = {"profile": profile}
-
-    status, headers, body = api_request("PATCH", url, account_sid, auth_token, payload)
+    status, headers, body = api_request(method, url, account_sid, auth_token, payload)
 
     # Extract key params for summary
     key_params = {
@@ -306,14 +373,9 @@ def update_sender(environment, sender_sid, profile_name=None, profile_desc=None)
 def delete_sender(environment, sender_sid):
     """Delete a sender."""
     account_sid, auth_token = load_credentials(environment)
-    base_url = ENV_URLS.get(environment)
-    if not base_url:
-        print(f"Error: Unknown environment '{environment}'")
-        sys.exit(1)
-
-    url = f"{base_url}/v2/Channels/Senders/{sender_sid}"
+    method, url, _ = build_request("delete", environment, sender_sid=sender_sid)
 
-    status, headers, body = api_request("DELETE", url, account_sid, auth_token)
+    status, headers, body = api_request(method, url, account_sid, auth_token)
 
     # Extract key params for summary
     key_params = {
@@ -326,8 +388,314 @@ def delete_sender(environment, sender_sid):
     return rq_id
 
 
+def make_operation(op, env, sender_id=None, sender_sid=None, waba_id=None, name=None, description=None):
+    """Build an operation record as consumed by run_operation()."""
+    return {
+        "op": op,
+        "env": env,
+        "sender_id": sender_id,
+        "sender_sid": sender_sid,
+        "waba_id": waba_id,
+        "name": name,
+        "description": description
+    }
+
+
+def load_manifest(manifest_path):
+    """Load batch operations from a JSONL or CSV manifest.
+
+    Each row needs `env` and `op` (create/get/update/delete). CREATE rows need
+    `sender_id`; other ops need `sid` (or `sender_sid`). Optional columns:
+    `waba_id`, `name`, `description`.
+    """
+    path = Path(manifest_path)
+    if not path.exists():
+        print(f"Error: Manifest not found: {path}")
+        sys.exit(1)
+
+    with open(path, newline="") as f:
+        if path.suffix.lower() == ".csv":
+            rows = [dict(r) for r in csv.DictReader(f)]
+        else:
+            rows = []
+            for file_line, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    print(f"Error: Manifest line {file_line}: invalid JSON ({e})")
+                    sys.exit(1)
+                if not isinstance(rows[-1], dict):
+                    print(f"Error: Manifest line {file_line}: expected a JSON object")
+                    sys.exit(1)
+
+    operations = []
+    for line_no, row in enumerate(rows, 1):
+        row = {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+        op = (row.get("op") or "").lower()
+        env = row.get("env") or row.get("environment")
+        sender_sid = row.get("sid") or row.get("sender_sid")
+
+        if op not in OPERATION_METHODS:
+            print(f"Error: Manifest row {line_no}: unknown op '{op}'")
+            sys.exit(1)
+        if env not in ENV_URLS:
+            print(f"Error: Manifest row {line_no}: unknown environment '{env}'")
+            sys.exit(1)
+        if op == "create" and not row.get("sender_id"):
+            print(f"Error: Manifest row {line_no}: create requires sender_id")
+            sys.exit(1)
+        if op != "create" and not sender_sid:
+            print(f"Error: Manifest row {line_no}: {op} requires sid")
+            sys.exit(1)
+
+        operations.append(make_operation(
+            op, env,
+            sender_id=row.get("sender_id") or None,
+            sender_sid=sender_sid or None,
+            waba_id=row.get("waba_id") or None,
+            name=row.get("name") or None,
+            description=row.get("description") or None
+        ))
+
+    return operations
+
+
+def run_operation(operation):
+    """Execute one manifest operation quietly and return a result record."""
+    env = operation["env"]
+    account_sid, auth_token = load_credentials(env)
+    method, url, payload = build_request(
+        operation["op"], env,
+        sender_sid=operation["sender_sid"], sender_id=operation["sender_id"],
+        waba_id=operation["waba_id"], profile_name=operation["name"],
+        profile_desc=operation["description"]
+    )
+
+    start = time.monotonic()
+    error = None
+    try:
+        status, headers, body = api_request(method, url, account_sid, auth_token, payload)
+    except (OSError, ValueError, http.client.HTTPException) as e:
+        status, headers, body = 0, {}, {}
+        error = str(e)
+    elapsed_ms = (time.monotonic() - start) * 1000
+
+    return {
+        "op": operation["op"],
+        "env": env,
+        "method": method,
+        "url": url,
+        "sender_id": body.get("sender_id", operation["sender_id"]),
+        "sender_sid": body.get("sid", operation["sender_sid"]),
+        "status": status,
+        "rq_id": get_request_id(headers),
+        "elapsed_ms": round(elapsed_ms, 1),
+        "error": error,
+        "body": body
+    }
+
+
+def run_batch(manifest_path, output_path=BATCH_RESULTS_FILE, workers=BATCH_WORKERS,
+              per_env_limit=BATCH_PER_ENV_LIMIT):
+    """Run manifest operations concurrently, streaming results to JSONL."""
+    operations = load_manifest(manifest_path)
+    if not operations:
+        print("Manifest is empty.")
+        return []
+
+    # Resolve credentials up front so a missing env fails before any request
+    envs = sorted({op["env"] for op in operations})
+    for env in envs:
+        load_credentials(env)
+
+    # One queue per env: an op is only submitted when its env has a free slot,
+    # so a busy env never parks pool threads that another env could use
+    queues = {env: deque() for env in envs}
+    for index, operation in enumerate(operations, 1):
+        queues[operation["env"]].append((index, operation))
+    in_flight = dict.fromkeys(envs, 0)
+
+    def worker(index, operation):
+        result = run_operation(operation)
+        result["index"] = index
+        return result
+
+    print(f"Running {len(operations)} operation(s) across {', '.join(envs)} "
+          f"(workers={workers}, per-env={per_env_limit})...")
+
+    results = []
+    pending = {}
+    start = time.monotonic()
+    with open(output_path, "w") as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            # Fill free worker slots round-robin across envs with spare per-env capacity
+            submitted = True
+            while submitted and len(pending) < workers:
+                submitted = False
+                for env in envs:
+                    if queues[env] and in_flight[env] < per_env_limit and len(pending) < workers:
+                        index, operation = queues[env].popleft()
+                        pending[pool.submit(worker, index, operation)] = env
+                        in_flight[env] += 1
+                        submitted = True
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                in_flight[pending.pop(future)] -= 1
+                result = future.result()
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                results.append(result)
+                print(f"[{len(results):>4}/{len(operations)}] {result['op'].upper():<6} {result['env']:<5} "
+                      f"HTTP {result['status']:<3} {result['rq_id']}  ({result['elapsed_ms']:.0f}ms)")
+    elapsed = time.monotonic() - start
+
+    failed = [r for r in results if r["error"] or r["status"] >= 400]
+    print("\n" + "-" * 60)
+    print("BATCH SUMMARY")
+    print("-" * 60)
+    print(f"Operations:     {len(results)}")
+    print(f"Failed:         {len(failed)}")
+    print(f"Elapsed:        {elapsed:.2f}s ({len(results) / elapsed if elapsed else 0:.1f} ops/s)")
+    print(f"Throttling:     {twilio_scheduler.format_stats(twilio_scheduler.get_scheduler().stats())}")
+    print(f"Results:        {output_path}")
+    print("-" * 60)
+
+    return results
+
+
+def build_rq_id_query(environment, rq_ids):
+    """Build the batch BigQuery log-check query for a set of RQ IDs."""
+    table = BIGQUERY_LOGS_TABLE.format(env=environment)
+    id_list = ", ".join(f'"{rq_id}"' for rq_id in rq_ids)
+    return (
+        f"SELECT request_id, MIN(timestamp) AS first_logged\n"
+        f"FROM `{table}`\n"
+        f"WHERE request_id IN ({id_list})\n"
+        f"  AND PARTITIONDATE = CURRENT_DATE()\n"
+        f"GROUP BY request_id"
+    )
+
+
+def run_lifecycle(environment, sender_id, step_pool, waba_id=None, profile_name=None,
+                  profile_desc=None, update_desc=None, skip_delete=False):
+    """Run CREATE -> GET + UPDATE -> DELETE for one sender.
+
+    GET and UPDATE only depend on the SID returned by CREATE, so they are
+    dispatched together as soon as CREATE returns. DELETE waits for both.
+    """
+    steps = []
+    create = run_operation(make_operation(
+        "create", environment, sender_id=sender_id, waba_id=waba_id,
+        name=profile_name, description=profile_desc
+    ))
+    steps.append(create)
+    sender_sid = create["sender_sid"]
+
+    if not create["error"] and create["status"] < 400 and sender_sid:
+        get_future = step_pool.submit(run_operation, make_operation(
+            "get", environment, sender_id=sender_id, sender_sid=sender_sid
+        ))
+        update_future = step_pool.submit(run_operation, make_operation(
+            "update", environment, sender_id=sender_id, sender_sid=sender_sid,
+            name=profile_name, description=update_desc or profile_desc
+        ))
+        steps.extend([get_future.result(), update_future.result()])
+
+        if not skip_delete:
+            steps.append(run_operation(make_operation(
+                "delete", environment, sender_id=sender_id, sender_sid=sender_sid
+            )))
+
+    return {
+        "sender_id": sender_id,
+        "sender_sid": sender_sid,
+        "ok": all(not step["error"] and step["status"] < 400 for step in steps),
+        "steps": [
+            {
+                "op": step["op"],
+                "status": step["status"],
+                "rq_id": step["rq_id"],
+                "sender_status": step["body"].get("status") if isinstance(step["body"], dict) else None,
+                "elapsed_ms": step["elapsed_ms"],
+                "error": step["error"] or (step["body"] if step["status"] >= 400 else None)
+            }
+            for step in steps
+        ]
+    }
+
+
+def run_lifecycles(environment, sender_ids, waba_id=None, profile_name=None, profile_desc=None,
+                   update_desc=None, skip_delete=False, workers=LIFECYCLE_WORKERS,
+                   output_path=LIFECYCLE_RESULTS_FILE):
+    """Run independent sender lifecycles in parallel and collect all RQ IDs."""
+    load_credentials(environment)
+    get_base_url(environment)
+
+    print(f"Running {len(sender_ids)} lifecycle(s) on {environment} (workers={workers})...")
+
+    start = time.monotonic()
+    # Steps get their own pool so lifecycle threads never wait on themselves
+    with ThreadPoolExecutor(max_workers=workers) as lifecycle_pool, \
+            ThreadPoolExecutor(max_workers=workers) as step_pool:
+        futures = [
+            lifecycle_pool.submit(
+                run_lifecycle, environment, sender_id, step_pool, waba_id,
+                profile_name, profile_desc, update_desc, skip_delete
+            )
+            for sender_id in sender_ids
+        ]
+        lifecycles = [future.result() for future in futures]
+    elapsed = time.monotonic() - start
+
+    rq_ids = [
+        step["rq_id"]
+        for lifecycle in lifecycles
+        for step in lifecycle["steps"]
+        if step["rq_id"] != "N/A"
+    ]
+    result = {
+        "environment": environment,
+        "elapsed_s": round(elapsed, 2),
+        "lifecycles": lifecycles,
+        "rq_ids": rq_ids,
+        "bigquery_query": build_rq_id_query(environment, rq_ids) if rq_ids else None,
+        "scheduler": twilio_scheduler.get_scheduler().stats()
+    }
+
+    with open(output_path, "w") as f:
+        json.dump(result, f, indent=2)
+
+    for lifecycle in lifecycles:
+        print("\n" + "-" * 60)
+        print(f"Sender ID:      {lifecycle['sender_id']}")
+        print(f"Sender SID:     {lifecycle['sender_sid']}")
+        for step in lifecycle["steps"]:
+            print(f"  {step['op'].upper():<7} HTTP {step['status']:<3} {step['rq_id']}  ({step['elapsed_ms']:.0f}ms)")
+
+    failed = [lifecycle for lifecycle in lifecycles if not lifecycle["ok"]]
+    print("\n" + "-" * 60)
+    print("LIFECYCLE SUMMARY")
+    print("-" * 60)
+    print(f"Lifecycles:     {len(lifecycles)}")
+    print(f"Failed:         {len(failed)}")
+    print(f"RQ IDs:         {len(rq_ids)}")
+    print(f"Elapsed:        {elapsed:.2f}s")
+    print(f"Throttling:     {twilio_scheduler.format_stats(result['scheduler'])}")
+    print(f"Results:        {output_path}")
+    print("-" * 60)
+
+    return result
+
+
 def main():
     parser = argparse.ArgumentParser(description="Senders API E2E Testing Script")
+    parser.add_argument("--response-sink", choices=twilio_sink.MODES,
+                        default=os.environ.get(twilio_sink.ENV_VAR),
+                        help="How responses are recorded (default: last; log for batch/lifecycle)")
     subparsers = parser.add_subparsers(dest="command", help="Command to run")
 
     # set-credentials command
@@ -364,8 +732,35 @@ def main():
     delete_parser.add_argument("--env", "-e", required=True, choices=["dev", "stage", "prod"], help="Environment")
     delete_parser.add_argument("sender_sid", help="Sender SID (XE...)")
 
+    # batch command
+    batch_parser = subparsers.add_parser("batch", help="Run operations from a JSONL/CSV manifest concurrently")
+    batch_parser.add_argument("manifest", help="Manifest file (.jsonl or .csv) with env, op, sender_id/sid, name, description")
+    batch_parser.add_argument("--output", "-o", default=str(BATCH_RESULTS_FILE), help="JSONL results file")
+    batch_parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Max concurrent requests")
+    batch_parser.add_argument("--per-env", type=int, default=BATCH_PER_ENV_LIMIT, help="Max concurrent requests per environment")
+    batch_parser.add_argument("--rate", type=twilio_scheduler.rate_arg, default=twilio_scheduler.DEFAULT_RATE, help="Max requests/second per environment and per account")
+    batch_parser.add_argument("--max-retries", type=int, default=twilio_scheduler.DEFAULT_MAX_RETRIES, help="Retries for 429/503 responses")
+
+    # lifecycle command
+    lifecycle_parser = subparsers.add_parser("lifecycle", help="Run CREATE -> GET/UPDATE -> DELETE per sender in one process")
+    lifecycle_parser.add_argument("--env", "-e", required=True, choices=["dev", "stage", "prod"], help="Environment")
+    lifecycle_parser.add_argument("--sender-id", "-s", action="append", default=[], help="Sender ID (repeat for parallel lifecycles)")
+    lifecycle_parser.add_argument("--sender-ids-file", help="File with one sender ID per line")
+    lifecycle_parser.add_argument("--waba-id", "-w", help="WABA ID (optional)")
+    lifecycle_parser.add_argument("--name", "-n", help="Profile name (default: Twilio Test1)")
+    lifecycle_parser.add_argument("--description", "-d", help="Profile description for CREATE")
+    lifecycle_parser.add_argument("--update-description", help="Profile description for UPDATE (default: same as CREATE)")
+    lifecycle_parser.add_argument("--skip-delete", action="store_true", help="Leave senders in place after UPDATE")
+    lifecycle_parser.add_argument("--workers", type=int, default=LIFECYCLE_WORKERS, help="Max parallel lifecycles")
+    lifecycle_parser.add_argument("--output", "-o", default=str(LIFECYCLE_RESULTS_FILE), help="JSON results file")
+    lifecycle_parser.add_argument("--rate", type=twilio_scheduler.rate_arg, default=twilio_scheduler.DEFAULT_RATE, help="Max requests/second per environment and per account")
+    lifecycle_parser.add_argument("--max-retries", type=int, default=twilio_scheduler.DEFAULT_MAX_RETRIES, help="Retries for 429/503 responses")
+
     args = parser.parse_args()
 
+    default_sink = "log" if args.command in ("batch", "lifecycle") else "last"
+    configure_response_sink(args.response_sink or default_sink)
+
     if args.command == "set-credentials":
         save_credentials(args.account_sid, args.auth_token, args.environment)
     elif args.command == "list-credentials":
@@ -378,6 +773,21 @@ def main():
         update_sender(args.env, args.sender_sid, args.name, args.description)
     elif args.command == "delete":
         delete_sender(args.env, args.sender_sid)
+    elif args.command == "batch":
+        twilio_scheduler.configure(rate=args.rate, max_retries=args.max_retries)
+        run_batch(args.manifest, args.output, args.workers, args.per_env)
+    elif args.command == "lifecycle":
+        sender_ids = list(args.sender_id)
+        if args.sender_ids_file:
+            with open(args.sender_ids_file) as f:
+                sender_ids.extend(line.strip() for line in f if line.strip())
+        if not sender_ids:
+            lifecycle_parser.error("provide --sender-id or --sender-ids-file")
+        twilio_scheduler.configure(rate=args.rate, max_retries=args.max_retries)
+        run_lifecycles(
+            args.env, sender_ids, args.waba_id, args.name, args.description,
+            args.update_description, args.skip_delete, args.workers, args.output
+        )
     else:
         parser.print_help()
 
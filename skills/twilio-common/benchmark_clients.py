@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Twilio Client Benchmark
+Measures throughput and p50/p95/p99 latency of the senders_api.py and
+phone_manager.py client code against the local mock server.
+
+Usage:
+    python3 benchmark_clients.py [--scenario senders-create] [--requests 500] [--concurrency 16]
+                                 [--latency-ms 50] [--jitter-ms 10] [--error-rate 0] [--throttle-rate 0]
+                                 [--max-p95-ms 120] [--min-throughput 100] [--output results.json]
+
+Scenarios:
+    senders-create      POST /v2/Channels/Senders (senders_api.run_operation)
+    senders-lifecycle   CREATE -> GET + UPDATE -> DELETE (senders_api.run_lifecycle, timed per lifecycle)
+    phone-search        AvailablePhoneNumbers search (phone_manager.api_request)
+    phone-purchase      IncomingPhoneNumbers purchase (phone_manager.api_request)
+
+The mock server is started in-process unless --url points at a running one.
+Exits 1 when a --max-p95-ms / --min-throughput gate fails, so the harness
+can be used as a performance regression check for the client code.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import mock_twilio_server
+import twilio_scheduler
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+SENDERS_DIR = SCRIPT_DIR.parent / "senders-e2e-testing"
+PHONE_DIR = SCRIPT_DIR.parent / "twilio-phone-number-manager"
+
+SCENARIOS = ["senders-create", "senders-lifecycle", "phone-search", "phone-purchase"]
+
+# Fake credentials accepted by the mock server
+ACCOUNT_SID = "AC" + "0" * 32
+AUTH_TOKEN = "mock-token"
+
+
+def load_clients(base_url, work_dir):
+    """Import both client scripts pointed at the mock server and temp files."""
+    os.environ["SENDERS_API_BASE_URL"] = base_url
+    os.environ["TWILIO_API_BASE"] = f"{base_url}/2010-04-01"
+    for path in (SENDERS_DIR, PHONE_DIR):
+        if str(path) not in sys.path:
+            sys.path.insert(0, str(path))
+
+    senders_api = importlib.import_module("senders_api")
+    phone_manager = importlib.import_module("phone_manager")
+
+    senders_api.CREDENTIALS_FILE = work_dir / "senders_credentials.json"
+    senders_api.RESPONSE_FILE = work_dir / "senders_response.json"
+    senders_api.HEADERS_FILE = work_dir / "senders_headers.json"
+    senders_api.CREDENTIALS_FILE.write_text(json.dumps({"credentials": [
+        {"account_sid": ACCOUNT_SID, "auth_token": AUTH_TOKEN, "environment": "dev"}
+    ]}))
+
+    phone_manager.CREDENTIALS_FILE = work_dir / "phone_credentials.json"
+    phone_manager.TEMP_RESPONSE_FILE = work_dir / "phone_response.json"
+    phone_manager.CREDENTIALS_FILE.write_text(json.dumps(
+        {"account_sid": ACCOUNT_SID, "auth_token": AUTH_TOKEN}
+    ))
+    return senders_api, phone_manager
+
+
+def build_scenario(name, senders_api, phone_manager, step_pool):
+    """Return a callable(i) that performs one timed unit of work and returns success."""
+    if name == "senders-create":
+        def run(i):
+            result = senders_api.run_operation(senders_api.make_operation(
+                "create", "dev", sender_id=f"whatsapp:+1555{i:07d}"
+            ))
+            return not result["error"] and result["status"] < 400
+        return run
+
+    if name == "senders-lifecycle":
+        def run(i):
+            return senders_api.run_lifecycle("dev", f"whatsapp:+1555{i:07d}", step_pool)["ok"]
+        return run
+
+    base = f"{phone_manager.TWILIO_API_BASE}/Accounts/{ACCOUNT_SID}"
+    if name == "phone-search":
+        def run(i):
+            url = f"{base}/AvailablePhoneNumbers/US/Local.json?SmsEnabled=true&AreaCode={random.randint(201, 989)}"
+            try:
+                return bool(phone_manager.api_request("GET", url, ACCOUNT_SID, AUTH_TOKEN))
+            except SystemExit:
+                return False
+        return run
+
+    if name == "phone-purchase":
+        def run(i):
+            data = f"PhoneNumber=%2B1555{i:07d}"
+            try:
+                return bool(phone_manager.api_request("POST", f"{base}/IncomingPhoneNumbers.json",
+                                                      ACCOUNT_SID, AUTH_TOKEN, data))
+            except SystemExit:
+                return False
+        return run
+
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_benchmark(run, requests, concurrency):
+    """Execute `requests` calls with bounded concurrency; return latencies (ms), failures, elapsed."""
+    def timed(i):
+        start = time.perf_counter()
+        ok = run(i)
+        return (time.perf_counter() - start) * 1000, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    failures = sum(1 for _, ok in results if not ok)
+    return latencies, failures, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Twilio client scripts against the mock server")
+    parser.add_argument("--scenario", "-s", choices=SCENARIOS, action="append",
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--requests", "-n", type=int, default=500, help="Calls per scenario")
+    parser.add_argument("--concurrency", "-c", type=int, default=16, help="Concurrent callers")
+    parser.add_argument("--url", help="Use an already running mock server (e.g. http://127.0.0.1:8765)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Mock server latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Mock server latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Mock server 500 rate")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Mock server 429 rate")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="Mock server Retry-After on 429")
+    parser.add_argument("--rate", type=twilio_scheduler.rate_arg, default=10000,
+                        help="Client scheduler rate ceiling (high by default so the client code is measured)")
+    parser.add_argument("--max-retries", type=int, default=twilio_scheduler.DEFAULT_MAX_RETRIES,
+                        help="Client retries for 429/503")
+    parser.add_argument("--max-p95-ms", type=float, help="Fail if any scenario's p95 exceeds this")
+    parser.add_argument("--min-throughput", type=float, help="Fail if any scenario's ops/s is below this")
+    parser.add_argument("--output", "-o", help="Write results as JSON")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        server = mock_twilio_server.start_server(
+            latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate, retry_after=args.retry_after
+        )
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+    work_dir = Path(tempfile.mkdtemp(prefix="twilio_bench_"))
+    senders_api, phone_manager = load_clients(base_url.rstrip("/"), work_dir)
+
+    print(f"Benchmarking against {base_url} "
+          f"(requests={args.requests}, concurrency={args.concurrency}, latency={args.latency_ms}ms)\n")
+    print("| Scenario          | Ops  | Fail | Ops/s   | p50 ms  | p95 ms  | p99 ms  | Retries |")
+    print("|-------------------|------|------|---------|---------|---------|---------|---------|")
+
+    results = []
+    gate_failures = []
+    with ThreadPoolExecutor(max_workers=args.concurrency) as step_pool:
+        for name in args.scenario or SCENARIOS:
+            scheduler = twilio_scheduler.configure(rate=args.rate, max_retries=args.max_retries)
+            run = build_scenario(name, senders_api, phone_manager, step_pool)
+            latencies, failures, elapsed = run_benchmark(run, args.requests, args.concurrency)
+            stats = scheduler.stats()
+
+            result = {
+                "scenario": name,
+                "operations": len(latencies),
+                "failures": failures,
+                "elapsed_s": round(elapsed, 3),
+                "throughput": round(len(latencies) / elapsed, 1),
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+                "scheduler": stats
+            }
+            results.append(result)
+            print(f"| {name:<17} | {result['operations']:<4} | {failures:<4} | {result['throughput']:<7} "
+                  f"| {result['p50_ms']:<7} | {result['p95_ms']:<7} | {result['p99_ms']:<7} | {stats['retries']:<7} |")
+
+            if args.max_p95_ms is not None and result["p95_ms"] > args.max_p95_ms:
+                gate_failures.append(f"{name}: p95 {result['p95_ms']}ms > {args.max_p95_ms}ms")
+            if args.min_throughput is not None and result["throughput"] < args.min_throughput:
+                gate_failures.append(f"{name}: {result['throughput']} ops/s < {args.min_throughput} ops/s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"base_url": base_url, "requests": args.requests,
+                       "concurrency": args.concurrency, "results": results}, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+    if server:
+        server.shutdown()
+
+    if gate_failures:
+        print("\nREGRESSION GATE FAILED:")
+        for failure in gate_failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
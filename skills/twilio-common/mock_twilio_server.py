@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Mock Twilio API Server
+Local stand-in for the Senders API and the phone number endpoints, for
+offline load and latency benchmarking of senders_api.py / phone_manager.py.
+
+Usage:
+    python3 mock_twilio_server.py [--port 8765] [--latency-ms 50] [--jitter-ms 20]
+                                  [--error-rate 0.01] [--throttle-rate 0.05] [--retry-after 1]
+
+Point the clients at it:
+    SENDERS_API_BASE_URL=http://127.0.0.1:8765 python3 senders_api.py ...
+    TWILIO_API_BASE=http://127.0.0.1:8765/2010-04-01 python3 phone_manager.py ...
+
+Endpoints:
+    POST/GET/PATCH/DELETE  /v2/Channels/Senders[/{sid}]
+    GET   /2010-04-01/Accounts/{AC}/AvailablePhoneNumbers/{country}/{type}.json
+    GET   /2010-04-01/Accounts/{AC}/IncomingPhoneNumbers.json[?PhoneNumber=...]
+    POST  /2010-04-01/Accounts/{AC}/IncomingPhoneNumbers.json
+
+Every response carries a Twilio-Request-Id header. Error and 429 responses
+use Twilio's error body shape.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_PORT = 8765
+
+SENDERS_PATH = re.compile(r"^/v2/Channels/Senders(?:/(?P<sid>XE[0-9a-f]{32}))?/?$")
+AVAILABLE_PATH = re.compile(
+    r"^/2010-04-01/Accounts/(?P<account>AC\w+)/AvailablePhoneNumbers/(?P<country>[A-Z]{2})/(?P<type>\w+)\.json$"
+)
+INCOMING_PATH = re.compile(r"^/2010-04-01/Accounts/(?P<account>AC\w+)/IncomingPhoneNumbers\.json$")
+
+LOCALITIES = [
+    ("San Francisco", "CA"), ("Amboy", "IN"), ("Dalton", "GA"),
+    ("Rio", "WI"), ("Moraga", "CA"), ("Kingman", "IN"),
+]
+CAPABILITIES = {"voice": True, "SMS": True, "MMS": True, "fax": False}
+
+
+def new_sid(prefix):
+    return prefix + uuid.uuid4().hex
+
+
+def error_body(status, code, message):
+    return {
+        "code": code,
+        "message": message,
+        "more_info": f"https://www.twilio.com/docs/errors/{code}",
+        "status": status
+    }
+
+
+def friendly_name(phone_number):
+    digits = phone_number[-10:]
+    return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
+
+
+class MockState:
+    """In-memory senders and purchased numbers, plus fault-injection settings."""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, throttle_rate=0.0, retry_after=1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.senders = {}
+        self.numbers = {}
+        self.lock = threading.Lock()
+
+    def delay(self):
+        latency = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server_version = "MockTwilio/1.0"
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status, body=None, headers=None):
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Twilio-Request-Id", new_sid("RQ"))
+        self.send_header("Content-Length", str(len(payload)))
+        if payload:
+            self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if payload:
+            self.wfile.write(payload)
+
+    def _handle(self):
+        raw_body = self._read_body()
+        self.state.delay()
+
+        if not self.headers.get("Authorization", "").startswith("Basic "):
+            return self._send(401, error_body(401, 20003, "Authenticate"))
+
+        roll = random.random()
+        if roll < self.state.throttle_rate:
+            return self._send(429, error_body(429, 20429, "Too Many Requests"),
+                              {"Retry-After": f"{self.state.retry_after:g}"})
+        if roll < self.state.throttle_rate + self.state.error_rate:
+            return self._send(500, error_body(500, 20500, "Internal Server Error"))
+
+        url = urlsplit(self.path)
+        match = SENDERS_PATH.match(url.path)
+        if match:
+            return self._senders(match.group("sid"), raw_body)
+        match = AVAILABLE_PATH.match(url.path)
+        if match and self.command == "GET":
+            return self._available_numbers(match, parse_qs(url.query))
+        match = INCOMING_PATH.match(url.path)
+        if match and self.command == "POST":
+            return self._purchase_number(match, parse_qs(raw_body.decode()))
+        if match and self.command == "GET":
+            return self._incoming_numbers(parse_qs(url.query))
+        return self._send(404, error_body(404, 20404, "The requested resource was not found"))
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _handle
+
+    def _senders(self, sid, raw_body):
+        state = self.state
+        try:
+            data = json.loads(raw_body) if raw_body else {}
+        except json.JSONDecodeError:
+            return self._send(400, error_body(400, 20001, "Invalid JSON body"))
+
+        if sid is None:
+            if self.command != "POST":
+                return self._send(405, error_body(405, 20004, "Method not allowed"))
+            if not data.get("sender_id"):
+                return self._send(400, error_body(400, 21604, "sender_id is required"))
+            sid = new_sid("XE")
+            sender = {
+                "sid": sid,
+                "status": "CREATING",
+                "sender_id": data["sender_id"],
+                "configuration": data.get("configuration", {}),
+                "profile": data.get("profile", {}),
+                "properties": None,
+                "offline_reasons": None,
+                "url": f"https://messaging.twilio.com/v2/Channels/Senders/{sid}"
+            }
+            with state.lock:
+                state.senders[sid] = sender
+            return self._send(202, sender)
+
+        with state.lock:
+            sender = state.senders.get(sid)
+            if sender is None:
+                return self._send(404, error_body(404, 20404, f"Sender {sid} not found"))
+            if self.command == "GET":
+                sender["status"] = "ONLINE"
+                snapshot = dict(sender)
+            elif self.command == "PATCH":
+                if "sender_id" in data or "configuration" in data:
+                    return self._send(400, error_body(400, 63100, "Only profile fields can be updated"))
+                sender["profile"] = data.get("profile", sender["profile"])
+                sender["status"] = "UPDATING"
+                snapshot = dict(sender)
+            elif self.command == "DELETE":
+                del state.senders[sid]
+                snapshot = None
+            else:
+                return self._send(405, error_body(405, 20004, "Method not allowed"))
+
+        if snapshot is None:
+            return self._send(204)
+        return self._send(202 if self.command == "PATCH" else 200, snapshot)
+
+    def _available_numbers(self, match, query):
+        area_code = (query.get("AreaCode") or [str(random.randint(201, 989))])[0]
+        numbers = []
+        for _ in range(20):
+            phone_number = f"+1{area_code}{random.randint(2000000, 9999999)}"
+            locality, region = random.choice(LOCALITIES)
+            numbers.append({
+                "phone_number": phone_number,
+                "friendly_name": friendly_name(phone_number),
+                "locality": locality,
+                "region": region,
+                "iso_country": match.group("country"),
+                "capabilities": dict(CAPABILITIES)
+            })
+        self._send(200, {
+            "available_phone_numbers": numbers,
+            "uri": self.path
+        })
+
+    def _purchase_number(self, match, form):
+        phone_number = (form.get("PhoneNumber") or [""])[0].strip()
+        if not phone_number:
+            return self._send(400, error_body(400, 21421, "PhoneNumber is required"))
+        # "+" arrives as a space when the client does not URL-encode it
+        if not phone_number.startswith("+"):
+            phone_number = "+" + phone_number
+        with self.state.lock:
+            if phone_number in self.state.numbers:
+                return self._send(400, error_body(400, 21422, "Phone number is not available"))
+            number = {
+                "sid": new_sid("PN"),
+                "account_sid": match.group("account"),
+                "phone_number": phone_number,
+                "friendly_name": friendly_name(phone_number),
+                "capabilities": {"voice": True, "sms": True, "mms": True, "fax": False},
+                "date_created": time.strftime("%a, %d %b %Y %H:%M:%S +0000", time.gmtime())
+            }
+            self.state.numbers[phone_number] = number
+        self._send(201, number)
+
+    def _incoming_numbers(self, query):
+        phone_number = (query.get("PhoneNumber") or [None])[0]
+        with self.state.lock:
+            numbers = [dict(number) for number in self.state.numbers.values()
+                       if phone_number is None or number["phone_number"] == phone_number]
+        self._send(200, {"incoming_phone_numbers": numbers, "uri": self.path})
+
+
+def start_server(port=0, host="127.0.0.1", verbose=False, **state_options):
+    """Start the mock server on a background thread and return it."""
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.state = MockState(**state_options)
+    server.verbose = verbose
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Twilio API server for offline benchmarking")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Random +/- latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After seconds on 429 responses")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), MockHandler)
+    server.daemon_threads = True
+    server.state = MockState(args.latency_ms, args.jitter_ms, args.error_rate,
+                             args.throttle_rate, args.retry_after)
+    server.verbose = args.verbose
+
+    print(f"Mock Twilio API listening on http://{args.host}:{server.server_port}")
+    print(f"  SENDERS_API_BASE_URL=http://{args.host}:{server.server_port}")
+    print(f"  TWILIO_API_BASE=http://{args.host}:{server.server_port}/2010-04-01")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
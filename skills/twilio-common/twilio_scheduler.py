@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Twilio Request Scheduler
+Rate-limit aware scheduling for Twilio API calls.
+
+Every request draws a token from one bucket per budget key (the API host,
+i.e. the environment, and the account SID). A 429 or 503 response is
+retried after the server's Retry-After delay, or a jittered exponential
+backoff when the header is missing, and halves the refill rate of the
+buckets involved. Successful responses slowly restore the rate (AIMD), so
+concurrency can be pushed up to whatever the API actually allows.
+
+A 503 may come back after the request was processed, so it is only
+retried for idempotent calls; a non-idempotent POST (create sender,
+purchase number) is retried on 429 alone.
+
+Usage:
+    import twilio_scheduler
+
+    twilio_scheduler.configure(rate=50, max_retries=5)
+    status, headers, body = twilio_scheduler.get_scheduler().call(keys, send)
+    print(twilio_scheduler.get_scheduler().stats())
+"""
+
+import argparse
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# Statuses that mean "slow down and try again"
+RETRY_STATUSES = {429, 503}
+# The subset that guarantees the request was not processed
+NON_IDEMPOTENT_RETRY_STATUSES = {429}
+
+# Defaults (requests/second per budget key, retries per request)
+DEFAULT_RATE = 100.0
+DEFAULT_MAX_RETRIES = 5
+BASE_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+# Longest Retry-After honoured; larger values are clamped
+MAX_RETRY_AFTER = 60.0
+
+# Adaptive rate: multiply on throttle, add a fraction of the ceiling on success
+THROTTLE_FACTOR = 0.5
+RECOVERY_FRACTION = 0.05
+MIN_RATE = 0.5
+
+# Concurrent 429s from one burst only cut the rate once per cooldown window
+THROTTLE_COOLDOWN = 1.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket with an adjustable refill rate."""
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError(f"Token bucket rate must be positive, got {rate}")
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        # At least one whole token, or acquire() could never succeed
+        self.capacity = max(1.0, float(burst or rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._throttled_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Take one token, sleeping until one is available. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def throttle(self):
+        """Cut the refill rate after the server pushed back."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._throttled_at < THROTTLE_COOLDOWN:
+                return
+            self._throttled_at = now
+            self._refill()
+            self.rate = max(MIN_RATE, self.rate * THROTTLE_FACTOR)
+            self._tokens = min(self._tokens, 0.0)
+
+    def recover(self):
+        """Raise the refill rate back toward its configured ceiling."""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY_FRACTION)
+
+
+def parse_retry_after(headers):
+    """Return the Retry-After delay in seconds, or None if absent/invalid."""
+    value = None
+    for name, header_value in headers.items():
+        if name.lower() == "retry-after":
+            value = header_value.strip()
+            break
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def rate_arg(value):
+    """argparse type for a requests/second rate (must be positive)."""
+    rate = float(value)
+    if rate <= 0:
+        raise argparse.ArgumentTypeError(f"rate must be positive, got {value}")
+    return rate
+
+
+def backoff_delay(attempt, base=BASE_BACKOFF, cap=MAX_BACKOFF):
+    """Full-jitter exponential backoff for a 0-based retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class Scheduler:
+    """Applies per-key token buckets and 429/503 retries around a send callable."""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=None, max_retries=DEFAULT_MAX_RETRIES):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "retries": 0,
+            "throttled_responses": 0,
+            "throttled_seconds": 0.0,
+            "gave_up": 0
+        }
+
+    def bucket(self, key):
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(self.rate, self.burst)
+            return self._buckets[key]
+
+    def _record(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self._stats[name] += delta
+
+    def call(self, keys, send, idempotent=True):
+        """Run send() -> (status, headers, body) under the budgets for `keys`.
+
+        Non-idempotent calls are only retried on 429, never on 503.
+        """
+        buckets = [self.bucket(key) for key in keys]
+        retry_statuses = RETRY_STATUSES if idempotent else NON_IDEMPOTENT_RETRY_STATUSES
+        attempt = 0
+        while True:
+            waited = sum(bucket.acquire() for bucket in buckets)
+            self._record(requests=1, throttled_seconds=waited)
+
+            status, headers, body = send()
+            if status not in RETRY_STATUSES:
+                for bucket in buckets:
+                    bucket.recover()
+                return status, headers, body
+
+            for bucket in buckets:
+                bucket.throttle()
+            if status not in retry_statuses or attempt >= self.max_retries:
+                self._record(throttled_responses=1, gave_up=1)
+                return status, headers, body
+
+            delay = parse_retry_after(headers)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            delay = min(delay, MAX_RETRY_AFTER)
+            self._record(throttled_responses=1, retries=1, throttled_seconds=delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def stats(self):
+        """Snapshot of retry/throttle counters and current per-key rates."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["throttled_seconds"] = round(snapshot["throttled_seconds"], 3)
+            snapshot["rates"] = {key: round(b.rate, 2) for key, b in self._buckets.items()}
+        return snapshot
+
+
+_scheduler = Scheduler()
+
+
+def get_scheduler():
+    """Return the process-wide scheduler."""
+    return _scheduler
+
+
+def configure(rate=DEFAULT_RATE, burst=None, max_retries=DEFAULT_MAX_RETRIES):
+    """Replace the process-wide scheduler with new limits."""
+    global _scheduler
+    _scheduler = Scheduler(rate, burst, max_retries)
+    return _scheduler
+
+
+def format_stats(stats):
+    """One-line human-readable summary of scheduler stats."""
+    return (f"{stats['retries']} retries, {stats['throttled_responses']} throttled responses, "
+            f"{stats['throttled_seconds']:.2f}s throttled")
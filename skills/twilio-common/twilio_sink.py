@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Twilio Response Sink
+Pluggable, buffered recording of API responses for the Twilio skill scripts.
+
+The scripts used to json.dump every response (indent=2) to fixed /tmp files
+on the request thread. A sink takes that work off the hot path: record()
+only enqueues, and a background thread does the writing.
+
+Modes:
+    off    Record nothing
+    last   Keep only the most recent body/headers in the script's /tmp files
+           (coalesced: intermediate responses are never written)
+    log    Append one compact JSON line per response to a JSONL log
+    ring   Like log, but the JSONL log is compacted to the last N request IDs
+           (checked on exit, rewritten once it grows past 2N lines)
+
+JSONL records are keyed by request ID:
+    {"rq_id": "RQ...", "ts": "...", "method": "POST", "url": "...", "status": 202, "headers": {...}, "body": {...}}
+
+Usage:
+    sink = twilio_sink.ResponseSink("log", last_files={"body": RESPONSE_FILE}, log_file=LOG_FILE)
+    sink.record(method, url, status, headers, body)
+"""
+
+import atexit
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+MODES = ("off", "last", "log", "ring")
+DEFAULT_RING_SIZE = 1000
+
+# Environment variable scripts use for their default mode
+ENV_VAR = "TWILIO_RESPONSE_SINK"
+
+_STOP = object()
+
+
+def request_id(headers):
+    """Extract the Twilio-Request-Id header (case-insensitive)."""
+    for name, value in headers.items():
+        if name.lower() == "twilio-request-id":
+            return value
+    return None
+
+
+def write_atomic(path, text):
+    """Replace a file in one step so concurrent readers never see partial JSON."""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class ResponseSink:
+    """Records API responses on a background writer thread."""
+
+    def __init__(self, mode="last", last_files=None, log_file=None, ring_size=DEFAULT_RING_SIZE):
+        if mode not in MODES:
+            raise ValueError(f"Unknown response sink mode '{mode}' (choose from {', '.join(MODES)})")
+        if mode in ("log", "ring") and not log_file:
+            raise ValueError(f"Response sink mode '{mode}' needs a log_file")
+        self.mode = mode
+        self.last_files = last_files or {}
+        self.log_file = Path(log_file) if log_file else None
+        self.ring_size = ring_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._failed = False
+        if mode != "off":
+            atexit.register(self.close)
+
+    def record(self, method, url, status, headers, body):
+        """Enqueue a response; never blocks on disk I/O."""
+        if self.mode == "off" or self._closed or self._failed:
+            return
+        entry = {
+            "rq_id": request_id(headers),
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "method": method,
+            "url": url,
+            "status": status,
+            "headers": headers,
+            "body": body
+        }
+        self._ensure_writer()
+        self._queue.put(entry)
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="response-sink", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Drain whatever else is pending so it is written in one go
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in batch)
+            entries = [item for item in batch if item is not _STOP]
+            try:
+                if entries and not self._failed:
+                    self._write(entries)
+            except Exception as e:
+                # Recording is best effort: report once, then drop further responses
+                self._failed = True
+                print(f"Warning: response sink disabled, could not write responses: {e}", file=sys.stderr)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, entries):
+        if self.mode == "last":
+            latest = entries[-1]
+            if "body" in self.last_files:
+                write_atomic(self.last_files["body"], json.dumps(latest["body"], indent=2))
+            if "headers" in self.last_files:
+                write_atomic(self.last_files["headers"], json.dumps(latest["headers"], indent=2))
+        else:
+            lines = "".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries)
+            with open(self.log_file, "a") as f:
+                f.write(lines)
+
+    def flush(self):
+        """Block until every queued response has been written."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def compact(self):
+        """Trim the JSONL log to the newest entry per request ID, last ring_size IDs."""
+        if not self.log_file or not self.log_file.exists():
+            return
+        with open(self.log_file) as f:
+            tail = deque(f, maxlen=self.ring_size * 2)
+        if len(tail) < self.ring_size * 2:
+            return
+        latest = OrderedDict()
+        for line in tail:
+            try:
+                key = json.loads(line).get("rq_id") or line
+            except json.JSONDecodeError:
+                continue
+            latest.pop(key, None)
+            latest[key] = line
+        write_atomic(self.log_file, "".join(list(latest.values())[-self.ring_size:]))
+
+    def close(self):
+        """Flush and stop the writer thread (registered with atexit)."""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+        if self.mode == "ring" and not self._failed:
+            self.compact()
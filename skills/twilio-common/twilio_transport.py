@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Twilio HTTP Transport
+Pooled keep-alive HTTP transport shared by the Twilio skill scripts.
+
+Every call used to build a fresh urllib request, which meant a full TCP + TLS
+handshake per API call. This module keeps persistent http.client connections
+per host (e.g. messaging.dev.twilio.com, api.twilio.com) and caches the Basic
+auth header per credential, so consecutive calls in one process reuse the
+same socket. Requests are routed through twilio_scheduler, which enforces
+per-host and per-account budgets and retries 429/503 responses.
+
+Usage:
+    sys.path.insert(0, str(SKILLS_DIR / "twilio-common"))
+    import twilio_transport
+
+    status, headers, body = twilio_transport.request("GET", url, account_sid, auth_token)
+
+`body` is returned as raw bytes; callers decode JSON themselves.
+"""
+
+import base64
+import http.client
+import threading
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+import twilio_scheduler
+
+# Idle connections kept open per host
+MAX_IDLE_PER_HOST = 8
+
+# Socket timeout in seconds
+TIMEOUT = 60
+
+# Methods safe to send twice (a POST may create a sender or buy a number)
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+# Raised when the server already closed an idle keep-alive connection
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+@lru_cache(maxsize=None)
+def auth_header(account_sid, auth_token):
+    """Return the Basic auth header value for a credential pair (cached)."""
+    auth_string = f"{account_sid}:{auth_token}"
+    return "Basic " + base64.b64encode(auth_string.encode()).decode()
+
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive connections keyed by (scheme, host)."""
+
+    def __init__(self, max_idle_per_host=MAX_IDLE_PER_HOST, timeout=TIMEOUT):
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, scheme, netloc):
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        if scheme == "http":
+            return http.client.HTTPConnection(netloc, timeout=self.timeout)
+        raise ValueError(f"Unsupported URL scheme: {scheme}")
+
+    def _acquire(self, key):
+        """Return (connection, reused) for a host, preferring an idle one."""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        return self._connect(*key), False
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, method, url, body=None, headers=None):
+        """Send a request and return (status, headers, body_bytes)."""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        while True:
+            conn, reused = self._acquire(key)
+            sent = False
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                sent = True
+                response = conn.getresponse()
+                data = response.read()
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                # An idle socket the server already dropped: retry on a new one, unless
+                # the request went out and replaying it could repeat a side effect
+                if reused and (idempotent or not sent):
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return response.status, dict(response.getheaders()), data
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+# Process-wide pool shared by all callers
+_POOL = ConnectionPool()
+
+
+def request(method, url, account_sid, auth_token, body=None, content_type="application/json"):
+    """Make an authenticated, rate-limited request over the shared connection pool."""
+    headers = {
+        "Authorization": auth_header(account_sid, auth_token),
+        "Content-Type": content_type,
+    }
+    if isinstance(body, str):
+        body = body.encode()
+
+    # Budgets: one per API host (environment) and one per account
+    keys = (f"host:{urlsplit(url).netloc}", f"account:{account_sid}")
+    return twilio_scheduler.get_scheduler().call(
+        keys, lambda: _POOL.request(method, url, body=body, headers=headers),
+        idempotent=method.upper() in IDEMPOTENT_METHODS
+    )
+
+
+def close():
+    """Close all pooled connections."""
+    _POOL.close()
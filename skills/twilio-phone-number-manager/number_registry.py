@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Phone Number Registry Store
+SQLite-backed registry of purchased phone numbers, used by phone_manager.py.
+
+Replaces the whole-file rewrite of phone-numbers.json: every purchase is a
+single indexed INSERT inside an IMMEDIATE transaction, the database runs in
+WAL mode so readers never block writers, and concurrent purchases from
+several processes serialize on SQLite's write lock instead of clobbering
+each other.
+
+Indexes cover phone_number (primary key), sid, capability and purchased_at,
+so lookups and filtered listings stay fast with tens of thousands of numbers.
+The legacy JSON registry ({"purchased_numbers": [...]}) can be imported and
+exported.
+
+The registry also acts as a number pool for parallel E2E workers: lease()
+hands out numbers nobody else holds, release() returns them, and leases
+expire after a TTL so a crashed worker cannot strand numbers. Lease and
+release run inside IMMEDIATE transactions, which is the cross-process lock.
+Work too slow to hold that lock for (buying numbers to refill the pool)
+is serialized with claim(): a meta row naming its holder, with an expiry
+so a crashed holder's claim lapses.
+"""
+
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Seconds to wait for another process holding the write lock
+BUSY_TIMEOUT = 30
+
+# Default lease lifetime in seconds
+DEFAULT_LEASE_TTL = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS numbers (
+    phone_number  TEXT PRIMARY KEY,
+    sid           TEXT UNIQUE,
+    friendly_name TEXT,
+    purchased_at  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_numbers_purchased_at ON numbers(purchased_at);
+
+CREATE TABLE IF NOT EXISTS capabilities (
+    capability   TEXT NOT NULL,
+    phone_number TEXT NOT NULL REFERENCES numbers(phone_number) ON DELETE CASCADE,
+    PRIMARY KEY (capability, phone_number)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_capabilities_number ON capabilities(phone_number);
+
+CREATE TABLE IF NOT EXISTS leases (
+    phone_number TEXT PRIMARY KEY REFERENCES numbers(phone_number) ON DELETE CASCADE,
+    holder       TEXT NOT NULL,
+    leased_at    REAL NOT NULL,
+    expires_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_leases_expires_at ON leases(expires_at);
+CREATE INDEX IF NOT EXISTS idx_leases_holder ON leases(holder);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class NumberRegistry:
+    """Purchased phone numbers stored in SQLite (WAL mode)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction that takes the database write lock up front."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def add(self, entries):
+        """Insert registry entries atomically; returns how many were new."""
+        added = 0
+        with self.transaction() as conn:
+            for entry in entries:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO numbers (phone_number, sid, friendly_name, purchased_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (entry["phone_number"], entry.get("sid"), entry.get("friendly_name"),
+                     entry.get("purchased_at") or "")
+                )
+                if cursor.rowcount:
+                    added += 1
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO capabilities (capability, phone_number) VALUES (?, ?)",
+                        [(cap, entry["phone_number"]) for cap in entry.get("capabilities", [])]
+                    )
+        return added
+
+    def _entries(self, rows):
+        rows = list(rows)
+        if not rows:
+            return []
+        numbers = [row["phone_number"] for row in rows]
+        caps = {}
+        placeholders = ",".join("?" * len(numbers))
+        for cap_row in self.conn.execute(
+            f"SELECT phone_number, capability FROM capabilities WHERE phone_number IN ({placeholders})",
+            numbers
+        ):
+            caps.setdefault(cap_row["phone_number"], []).append(cap_row["capability"])
+        return [
+            {
+                "phone_number": row["phone_number"],
+                "sid": row["sid"],
+                "friendly_name": row["friendly_name"],
+                "capabilities": caps.get(row["phone_number"], []),
+                "purchased_at": row["purchased_at"]
+            }
+            for row in rows
+        ]
+
+    def get(self, phone_number=None, sid=None):
+        """Look up one number by phone number or SID (indexed)."""
+        if phone_number:
+            rows = self.conn.execute("SELECT * FROM numbers WHERE phone_number = ?", (phone_number,))
+        else:
+            rows = self.conn.execute("SELECT * FROM numbers WHERE sid = ?", (sid,))
+        entries = self._entries(rows)
+        return entries[0] if entries else None
+
+    def existing(self, phone_numbers):
+        """Return the subset of phone_numbers already in the registry."""
+        phone_numbers = list(phone_numbers)
+        found = set()
+        # Chunk to stay under SQLite's bound-parameter limit
+        for i in range(0, len(phone_numbers), 500):
+            chunk = phone_numbers[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(row[0] for row in self.conn.execute(
+                f"SELECT phone_number FROM numbers WHERE phone_number IN ({placeholders})", chunk
+            ))
+        return found
+
+    def _filter(self, capability=None, since=None):
+        clauses, params = [], []
+        if capability:
+            clauses.append("phone_number IN (SELECT phone_number FROM capabilities WHERE capability = ?)")
+            params.append(capability)
+        if since:
+            clauses.append("purchased_at >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def list(self, capability=None, since=None, limit=None, offset=0):
+        """List numbers ordered by purchase time, optionally filtered."""
+        where, params = self._filter(capability, since)
+        sql = f"SELECT * FROM numbers {where} ORDER BY purchased_at, phone_number"
+        if limit:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        return self._entries(self.conn.execute(sql, params))
+
+    def count(self, capability=None, since=None):
+        where, params = self._filter(capability, since)
+        return self.conn.execute(f"SELECT COUNT(*) FROM numbers {where}", params).fetchone()[0]
+
+    def expire_leases(self, now=None):
+        """Drop leases past their TTL (indexed range delete); returns how many."""
+        now = time.time() if now is None else now
+        return self.conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,)).rowcount
+
+    def free_count(self, capability=None):
+        """Numbers with `capability` that are not currently leased."""
+        now = time.time()
+        if capability:
+            sql = ("SELECT COUNT(*) FROM capabilities c WHERE c.capability = ? AND NOT EXISTS "
+                   "(SELECT 1 FROM leases l WHERE l.phone_number = c.phone_number AND l.expires_at > ?)")
+            return self.conn.execute(sql, (capability, now)).fetchone()[0]
+        sql = ("SELECT COUNT(*) FROM numbers n WHERE NOT EXISTS "
+               "(SELECT 1 FROM leases l WHERE l.phone_number = n.phone_number AND l.expires_at > ?)")
+        return self.conn.execute(sql, (now,)).fetchone()[0]
+
+    def lease(self, count, capability="SMS", holder="", ttl=DEFAULT_LEASE_TTL):
+        """Atomically lease up to `count` free numbers with `capability`.
+
+        Returns the leased entries (fewer than `count` if the pool runs dry),
+        each with `holder` and `expires_at` added. There is no separate free
+        list: the capability index is walked skipping leased numbers (a
+        primary-key probe each), so the cost grows with the numbers currently
+        leased plus `count`, not with the size of the pool.
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+            free = [row[0] for row in conn.execute(
+                "SELECT c.phone_number FROM capabilities c WHERE c.capability = ? AND NOT EXISTS "
+                "(SELECT 1 FROM leases l WHERE l.phone_number = c.phone_number) LIMIT ?",
+                (capability, count)
+            )]
+            conn.executemany(
+                "INSERT INTO leases (phone_number, holder, leased_at, expires_at) VALUES (?, ?, ?, ?)",
+                [(phone_number, holder, now, now + ttl) for phone_number in free]
+            )
+        entries = []
+        for phone_number in free:
+            entry = self.get(phone_number=phone_number)
+            entry["holder"] = holder
+            entry["expires_at"] = now + ttl
+            entries.append(entry)
+        return entries
+
+    def release(self, phone_numbers=None, holder=None):
+        """Release leases by phone number and/or holder; returns how many."""
+        clauses, params = [], []
+        if phone_numbers:
+            clauses.append(f"phone_number IN ({','.join('?' * len(phone_numbers))})")
+            params.extend(phone_numbers)
+        if holder:
+            clauses.append("holder = ?")
+            params.append(holder)
+        if not clauses:
+            return 0
+        with self.transaction() as conn:
+            return conn.execute(f"DELETE FROM leases WHERE {' AND '.join(clauses)}", params).rowcount
+
+    def active_leases(self, holder=None, capability=None):
+        """Unexpired leases (of numbers with `capability`), soonest expiry first."""
+        sql = "SELECT * FROM leases WHERE expires_at > ?"
+        params = [time.time()]
+        if holder:
+            sql += " AND holder = ?"
+            params.append(holder)
+        if capability:
+            sql += " AND phone_number IN (SELECT phone_number FROM capabilities WHERE capability = ?)"
+            params.append(capability)
+        return [dict(row) for row in self.conn.execute(sql + " ORDER BY expires_at", params)]
+
+    def get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def claim(self, name, holder, ttl, now=None):
+        """Take the named claim unless another holder has an unexpired one; returns whether taken."""
+        now = time.time() if now is None else now
+        key = f"claim:{name}"
+        with self.transaction() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            current = json.loads(row[0]) if row else None
+            if current and current["holder"] != holder and current["expires_at"] > now:
+                return False
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                         (key, json.dumps({"holder": holder, "expires_at": now + ttl})))
+        return True
+
+    def drop_claim(self, name, holder):
+        """Give up a claim taken by holder (a lapsed claim taken over by someone else is left alone)."""
+        key = f"claim:{name}"
+        with self.transaction() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            if row and json.loads(row[0])["holder"] == holder:
+                conn.execute("DELETE FROM meta WHERE key = ?", (key,))
+
+    def import_json(self, json_path):
+        """Import entries from a legacy phone-numbers.json file; returns how many were new."""
+        with open(json_path) as f:
+            data = json.load(f)
+        return self.add(data.get("purchased_numbers", []))
+
+    def export_json(self, json_path):
+        """Write the registry in the legacy JSON format."""
+        with open(json_path, "w") as f:
+            json.dump({"purchased_numbers": self.list()}, f, indent=2)
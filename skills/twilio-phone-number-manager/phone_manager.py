@@ -4,33 +4,80 @@ Twilio Phone Number Manager
 Handles searching, purchasing, and managing Twilio phone numbers.
 
 Usage:
-    python3 phone_manager.py search [--area-code=XXX]
+    python3 phone_manager.py search [--area-code=XXX] [--no-cache] [--prefetch]
+    python3 phone_manager.py prefetch [--area-codes 415,650,...] [--interval 60]
     python3 phone_manager.py purchase +1XXXXXXXXXX
-    python3 phone_manager.py list
+    python3 phone_manager.py provision --count N [--area-codes 415,650,...] [--workers 4] [--capability SMS]
+    python3 phone_manager.py list [--capability SMS] [--since 2026-01-01] [--limit N]
+    python3 phone_manager.py lookup +1XXXXXXXXXX|PNXXXX
+    python3 phone_manager.py export-registry [PATH]
+    python3 phone_manager.py lease N [--capability SMS] [--holder NAME] [--ttl 3600] [--min-free 5] [--json]
+    python3 phone_manager.py release [+1XXXXXXXXXX ...] [--holder NAME]
+    python3 phone_manager.py pool [--capability SMS]
     python3 phone_manager.py set-credentials ACCOUNT_SID AUTH_TOKEN
 
 Credentials are stored in /tmp/twilio_prod_credentials.json
-Registry is stored alongside this script in phone-numbers.json
+Last response is saved to /tmp/twilio_api_response.json
+  (--response-sink=off|last|log|ring; log/ring write /tmp/twilio_api_responses.jsonl)
+Search results are cached for a short TTL in /tmp/twilio_search_cache.db
+  (prefetch area codes from $TWILIO_PREFETCH_AREA_CODES, e.g. "415,650")
+Registry is stored alongside this script in phone-numbers.db (SQLite, WAL mode);
+entries from a legacy phone-numbers.json are imported on first use
 """
 
 import argparse
+import getpass
 import json
 import os
+import socket
 import sys
-import urllib.request
-import urllib.error
-import base64
+import time
+from contextlib import redirect_stdout
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlencode
+
+from number_registry import DEFAULT_LEASE_TTL, NumberRegistry
+from search_cache import SearchCache, cache_key
 
 # Paths
 SCRIPT_DIR = Path(__file__).parent.resolve()
+REGISTRY_DB = SCRIPT_DIR / "phone-numbers.db"
 REGISTRY_FILE = SCRIPT_DIR / "phone-numbers.json"
 CREDENTIALS_FILE = Path("/tmp/twilio_prod_credentials.json")
 TEMP_RESPONSE_FILE = Path("/tmp/twilio_api_response.json")
+RESPONSE_LOG_FILE = Path("/tmp/twilio_api_responses.jsonl")
+SEARCH_CACHE_DB = Path("/tmp/twilio_search_cache.db")
+
+# Twilio API (always Prod for phone purchases; overridable for the local mock server)
+TWILIO_API_BASE = os.environ.get("TWILIO_API_BASE", "https://api.twilio.com/2010-04-01").rstrip("/")
+
+# Bulk provisioning defaults
+PROVISION_WORKERS = 4
+SEARCH_PAGE_SIZE = 50
+
+# AvailablePhoneNumbers filter for each registry capability
+CAPABILITY_FILTERS = {"SMS": "SmsEnabled", "MMS": "MmsEnabled", "Voice": "VoiceEnabled", "Fax": "FaxEnabled"}
+
+# Pool refills by `lease --min-free`: one worker buys at a time; its claim lapses after this many seconds
+REFILL_CLAIM_TTL = 600
+REFILL_POLL_INTERVAL = 2
+
+# Search cache: seconds a result stays fresh, and area codes kept warm by prefetch
+SEARCH_CACHE_TTL = 120
+PREFETCH_AREA_CODES = [a.strip() for a in os.environ.get("TWILIO_PREFETCH_AREA_CODES", "").split(",") if a.strip()]
 
-# Twilio API (always Prod for phone purchases)
-TWILIO_API_BASE = "https://api.twilio.com/2010-04-01"
+# Environment variable naming the lease holder (one per parallel E2E worker)
+HOLDER_ENV_VAR = "E2E_WORKER_ID"
+
+# Shared Twilio modules (pooled keep-alive transport, response sink)
+sys.path.insert(0, str(SCRIPT_DIR.parent / "twilio-common"))
+import twilio_sink  # noqa: E402
+import twilio_transport  # noqa: E402
+
+# Where api_request records responses (see configure_response_sink)
+_response_sink = None
 
 
 def load_credentials():
@@ -58,32 +105,56 @@ def save_credentials(account_sid, auth_token):
     print(f"Account: {account_sid[:6]}...{account_sid[-4:]}")
 
 
-def api_request(method, url, account_sid, auth_token, data=None):
-    """Make authenticated request to Twilio API."""
-    # Create auth header
-    auth_string = f"{account_sid}:{auth_token}"
-    auth_bytes = base64.b64encode(auth_string.encode()).decode()
-
-    headers = {
-        "Authorization": f"Basic {auth_bytes}",
-        "Content-Type": "application/x-www-form-urlencoded"
-    }
+def configure_response_sink(mode):
+    """Select how responses are recorded: off, last, log or ring."""
+    global _response_sink
+    if _response_sink is not None:
+        _response_sink.close()
+    _response_sink = twilio_sink.ResponseSink(
+        mode, last_files={"body": TEMP_RESPONSE_FILE}, log_file=RESPONSE_LOG_FILE
+    )
+    return _response_sink
+
 
-    if data:
-        data = data.encode()
+def get_response_sink():
+    """Return the active response sink, defaulting to the last-response file."""
+    if _response_sink is None:
+        configure_response_sink(os.environ.get(twilio_sink.ENV_VAR, "last"))
+    return _response_sink
 
-    req = urllib.request.Request(url, data=data, headers=headers, method=method)
 
+class TwilioAPIError(Exception):
+    """Twilio returned an error status."""
+
+    def __init__(self, status, body):
+        super().__init__(f"API Error {status}: {body}")
+        self.status = status
+        self.body = body
+
+
+def call_api(method, url, account_sid, auth_token, data=None):
+    """Make authenticated request to Twilio API, raising TwilioAPIError on failure."""
+    status, headers, raw = twilio_transport.request(
+        method, url, account_sid, auth_token, data,
+        content_type="application/x-www-form-urlencoded"
+    )
+
+    if status >= 400:
+        get_response_sink().record(method, url, status, headers, {"raw_error": raw.decode()})
+        raise TwilioAPIError(status, raw.decode())
+
+    result = json.loads(raw.decode())
+    # Recorded off the request thread for debugging
+    get_response_sink().record(method, url, status, headers, result)
+    return result
+
+
+def api_request(method, url, account_sid, auth_token, data=None):
+    """Make authenticated request to Twilio API (exits on error)."""
     try:
-        with urllib.request.urlopen(req) as response:
-            result = json.loads(response.read().decode())
-            # Save to temp file for debugging
-            with open(TEMP_RESPONSE_FILE, "w") as f:
-                json.dump(result, f, indent=2)
-            return result
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode()
-        print(f"API Error {e.code}: {error_body}")
+        return call_api(method, url, account_sid, auth_token, data)
+    except TwilioAPIError as e:
+        print(str(e))
         sys.exit(1)
 
 
@@ -98,18 +169,110 @@ def get_capabilities(caps_dict):
     return result
 
 
-def search_numbers(area_code=None, limit=5):
-    """Search for available US Local SMS-enabled numbers."""
-    account_sid, auth_token = load_credentials()
-
-    url = f"{TWILIO_API_BASE}/Accounts/{account_sid}/AvailablePhoneNumbers/US/Local.json?SmsEnabled=true"
+def build_search_url(account_sid, area_code=None, page_size=None, capability="SMS"):
+    """Build the AvailablePhoneNumbers URL for US Local numbers with `capability` (default SMS)."""
+    url = (f"{TWILIO_API_BASE}/Accounts/{account_sid}/AvailablePhoneNumbers/US/Local.json"
+           f"?{CAPABILITY_FILTERS[capability]}=true")
     if area_code:
         url += f"&AreaCode={area_code}"
+    if page_size:
+        url += f"&PageSize={page_size}"
+    return url
 
-    print("Searching for available US Local SMS-enabled numbers...")
-    result = api_request("GET", url, account_sid, auth_token)
 
-    numbers = result.get("available_phone_numbers", [])[:limit]
+def open_search_cache():
+    return SearchCache(SEARCH_CACHE_DB, ttl=SEARCH_CACHE_TTL)
+
+
+def fetch_available(account_sid, auth_token, area_code=None, use_cache=True, request=api_request):
+    """Return (numbers, cache age in seconds or None) for a US Local SMS-enabled search."""
+    key = cache_key(area_code=area_code)
+    with open_search_cache() as cache:
+        if use_cache:
+            numbers = cache.get(key)
+            if numbers is not None:
+                return numbers, cache.age(key)
+        result = request("GET", build_search_url(account_sid, area_code), account_sid, auth_token)
+        numbers = result.get("available_phone_numbers", [])
+        cache.put(key, numbers)
+    return numbers, None
+
+
+def invalidate_search_cache(phone_numbers):
+    """Drop cached searches that returned numbers which have now been purchased."""
+    with open_search_cache() as cache:
+        return cache.invalidate(phone_numbers)
+
+
+def refresh_searches(area_codes, account_sid, auth_token, workers=PROVISION_WORKERS):
+    """Fetch area codes whose cached search is missing or past half its TTL.
+
+    Returns the area codes refreshed; failures are skipped (the next
+    interactive search simply misses the cache).
+    """
+    with open_search_cache() as cache:
+        stale = [a for a in area_codes
+                 if (age := cache.age(cache_key(area_code=a))) is None or age > SEARCH_CACHE_TTL / 2]
+
+    def refresh(area_code):
+        try:
+            fetch_available(account_sid, auth_token, area_code, use_cache=False, request=call_api)
+            return area_code
+        except (TwilioAPIError, OSError):
+            return None
+
+    if not stale:
+        return []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [a for a in pool.map(refresh, stale) if a]
+
+
+def prefetch_searches(area_codes=None, interval=None):
+    """Warm the search cache for area codes, once or every `interval` seconds."""
+    area_codes = area_codes or PREFETCH_AREA_CODES
+    if not area_codes:
+        print("No area codes to prefetch. Pass --area-codes or set TWILIO_PREFETCH_AREA_CODES.")
+        return
+    account_sid, auth_token = load_credentials()
+
+    while True:
+        refreshed = refresh_searches(area_codes, account_sid, auth_token)
+        print(f"Prefetched {len(refreshed)} of {len(area_codes)} area code(s)"
+              f"{': ' + ', '.join(refreshed) if refreshed else ' (all fresh)'}", flush=True)
+        if not interval:
+            return
+        time.sleep(interval)
+
+
+def search_numbers(area_code=None, limit=5, use_cache=True, prefetch=False):
+    """Search for available US Local SMS-enabled numbers.
+
+    Results come from the search cache when fresh. With `prefetch`, the
+    configured area codes are refreshed in the background while this search
+    is printed, so the next search for any of them is a cache hit.
+    """
+    account_sid, auth_token = load_credentials()
+
+    prefetcher = None
+    if prefetch and PREFETCH_AREA_CODES:
+        prefetcher = ThreadPoolExecutor(max_workers=1)
+        prefetcher.submit(refresh_searches, [a for a in PREFETCH_AREA_CODES if a != area_code],
+                          account_sid, auth_token)
+
+    try:
+        return _print_search(account_sid, auth_token, area_code, limit, use_cache)
+    finally:
+        if prefetcher:
+            # Finish the background refresh before the process exits
+            prefetcher.shutdown(wait=True)
+
+
+def _print_search(account_sid, auth_token, area_code, limit, use_cache):
+    print("Searching for available US Local SMS-enabled numbers...")
+    numbers, age = fetch_available(account_sid, auth_token, area_code, use_cache)
+    numbers = numbers[:limit]
+    if age is not None:
+        print(f"(cached {age:.0f}s ago; --no-cache to refresh)")
 
     if not numbers:
         print("No available numbers found.")
@@ -133,7 +296,7 @@ def purchase_number(phone_number):
     account_sid, auth_token = load_credentials()
 
     url = f"{TWILIO_API_BASE}/Accounts/{account_sid}/IncomingPhoneNumbers.json"
-    data = f"PhoneNumber={phone_number}"
+    data = urlencode({"PhoneNumber": phone_number})
 
     print(f"Purchasing {phone_number}...")
     result = api_request("POST", url, account_sid, auth_token, data)
@@ -152,31 +315,27 @@ def purchase_number(phone_number):
     print(f"Capabilities:   {', '.join(caps)}")
     print(f"{'='*50}\n")
 
-    # Add to registry
+    # Add to registry; cached searches listing this number are now stale
     add_to_registry(phone_number, result)
+    invalidate_search_cache([phone_number])
 
     return result
 
 
-def load_registry():
-    """Load phone number registry."""
-    if not REGISTRY_FILE.exists():
-        return {"purchased_numbers": []}
-    with open(REGISTRY_FILE) as f:
-        return json.load(f)
-
-
-def save_registry(registry):
-    """Save phone number registry."""
-    with open(REGISTRY_FILE, "w") as f:
-        json.dump(registry, f, indent=2)
+def open_registry():
+    """Open the SQLite registry, importing the legacy JSON registry once."""
+    registry = NumberRegistry(REGISTRY_DB)
+    if REGISTRY_FILE.exists() and not registry.get_meta("json_imported"):
+        imported = registry.import_json(REGISTRY_FILE)
+        registry.set_meta("json_imported", datetime.utcnow().isoformat() + "Z")
+        if imported:
+            print(f"Imported {imported} number(s) from {REGISTRY_FILE}")
+    return registry
 
 
-def add_to_registry(phone_number, api_response):
-    """Add purchased number to registry."""
-    registry = load_registry()
-
-    new_entry = {
+def make_registry_entry(phone_number, api_response):
+    """Build a registry entry from an IncomingPhoneNumbers response."""
+    return {
         "phone_number": phone_number,
         "sid": api_response.get("sid"),
         "friendly_name": api_response.get("friendly_name"),
@@ -184,15 +343,24 @@ def add_to_registry(phone_number, api_response):
         "purchased_at": datetime.utcnow().isoformat() + "Z"
     }
 
-    registry["purchased_numbers"].append(new_entry)
-    save_registry(registry)
-    print(f"Added to registry: {REGISTRY_FILE}")
+
+def add_to_registry(phone_number, api_response):
+    """Add purchased number to registry."""
+    add_many_to_registry([make_registry_entry(phone_number, api_response)])
+    print(f"Added to registry: {REGISTRY_DB}")
+
+
+def add_many_to_registry(entries):
+    """Add several entries to the registry in one transaction."""
+    with open_registry() as registry:
+        return registry.add(entries)
 
 
-def list_numbers():
-    """List all purchased numbers from registry."""
-    registry = load_registry()
-    numbers = registry.get("purchased_numbers", [])
+def list_numbers(capability=None, since=None, limit=None):
+    """List purchased numbers from registry, optionally filtered."""
+    with open_registry() as registry:
+        numbers = registry.list(capability=capability, since=since, limit=limit)
+        total = registry.count(capability=capability, since=since)
 
     if not numbers:
         print("No purchased numbers in registry.")
@@ -208,25 +376,377 @@ def list_numbers():
         sid_short = f"{sid[:8]}...{sid[-4:]}" if len(sid) > 12 else sid
         print(f"| {i:<2} | {n['phone_number']:<16} | {purchased:<20} | {sid_short:<20} |")
 
-    print(f"\nTotal: {len(numbers)} number(s)")
+    if total > len(numbers):
+        print(f"\nShowing {len(numbers)} of {total} number(s)")
+    else:
+        print(f"\nTotal: {total} number(s)")
     return numbers
 
 
+def lookup_number(key):
+    """Show one registry entry by phone number or SID."""
+    with open_registry() as registry:
+        entry = registry.get(sid=key) if key.startswith("PN") else registry.get(phone_number=key)
+
+    if not entry:
+        print(f"{key} not found in registry.")
+        return None
+
+    print(f"Phone Number:   {entry['phone_number']}")
+    print(f"SID:            {entry['sid']}")
+    print(f"Friendly Name:  {entry['friendly_name']}")
+    print(f"Capabilities:   {', '.join(entry['capabilities'])}")
+    print(f"Purchased:      {entry['purchased_at']}")
+    return entry
+
+
+def export_registry(path=REGISTRY_FILE):
+    """Write the registry in the legacy phone-numbers.json format."""
+    with open_registry() as registry:
+        registry.export_json(path)
+        total = registry.count()
+    print(f"Exported {total} number(s) to {path}")
+
+
+def provision_numbers(count, area_codes=None, workers=PROVISION_WORKERS, capability="SMS"):
+    """Search and purchase `count` numbers with `capability` concurrently, then register them in one write.
+
+    Searches for every area code run in parallel; candidates are de-duplicated
+    (and numbers already in the registry skipped) and interleaved across area
+    codes. Purchases run with bounded parallelism; a failed purchase is
+    replaced by the next candidate until `count` numbers are bought or the
+    candidates run out.
+
+    A purchase whose outcome is unknown (5xx, unreadable response, dropped
+    connection after the POST went out) may still have bought the number,
+    so it is not replaced; once the in-flight purchases finish it is looked
+    up in IncomingPhoneNumbers and counted as purchased or failed.
+    """
+    account_sid, auth_token = load_credentials()
+    area_codes = area_codes or [None]
+    start = time.monotonic()
+
+    def search(area_code):
+        url = build_search_url(account_sid, area_code, SEARCH_PAGE_SIZE, capability)
+        try:
+            return call_api("GET", url, account_sid, auth_token).get("available_phone_numbers", [])
+        except (TwilioAPIError, OSError) as e:
+            print(f"Search failed for area code {area_code or 'any'}: {e}")
+            return []
+
+    print(f"Searching {len(area_codes)} area code(s) for {count} {capability} number(s)...")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        search_results = list(pool.map(search, area_codes))
+
+    # De-duplicate and interleave so purchases spread across area codes
+    seen = set()
+    candidates = []
+    for i in range(max((len(r) for r in search_results), default=0)):
+        for results in search_results:
+            if i < len(results) and results[i]["phone_number"] not in seen:
+                seen.add(results[i]["phone_number"])
+                candidates.append(results[i]["phone_number"])
+    with open_registry() as registry:
+        registered = registry.existing(candidates)
+    candidates = [n for n in candidates if n not in registered]
+    print(f"Found {len(candidates)} unique candidate(s).")
+
+    purchase_url = f"{TWILIO_API_BASE}/Accounts/{account_sid}/IncomingPhoneNumbers.json"
+
+    def purchase(phone_number):
+        t0 = time.monotonic()
+        try:
+            result = call_api("POST", purchase_url, account_sid, auth_token,
+                              urlencode({"PhoneNumber": phone_number}))
+            error = None
+        except TwilioAPIError as e:
+            # A 4xx was refused; a 5xx may have arrived after the number was bought
+            result, error, unknown = None, str(e), e.status >= 500
+        except Exception as e:
+            # Bad JSON on a 2xx, IncompleteRead, a reset after the POST was sent, ...
+            result, error, unknown = None, f"{type(e).__name__}: {e}", True
+        else:
+            error, unknown = None, False
+        return phone_number, result, error, unknown, (time.monotonic() - t0) * 1000
+
+    purchased = []
+    failed = []
+    unknown = []
+    pending = set()
+    remaining = iter(candidates)
+
+    def collect(future):
+        phone_number, result, error, is_unknown, latency_ms = future.result()
+        if is_unknown:
+            unknown.append((phone_number, error, latency_ms))
+            print(f"  UNKNOWN    {phone_number:<16} ({latency_ms:.0f}ms) {error}")
+        elif error:
+            failed.append((phone_number, error, latency_ms))
+            print(f"  FAILED     {phone_number:<16} ({latency_ms:.0f}ms) {error}")
+        else:
+            purchased.append((make_registry_entry(phone_number, result), latency_ms))
+            print(f"  PURCHASED  {phone_number:<16} ({latency_ms:.0f}ms) {result.get('sid')}")
+
+    def resolve_unknown():
+        """Look up unknown purchases on the account; the ones that can't be checked stay unknown."""
+        unresolved = []
+        for phone_number, error, latency_ms in unknown:
+            url = f"{purchase_url}?{urlencode({'PhoneNumber': phone_number})}"
+            try:
+                owned = call_api("GET", url, account_sid, auth_token).get("incoming_phone_numbers", [])
+            except Exception as e:
+                unresolved.append((phone_number, error, latency_ms))
+                print(f"  UNKNOWN    {phone_number:<16} lookup failed: {type(e).__name__}: {e}")
+                continue
+            if owned:
+                purchased.append((make_registry_entry(phone_number, owned[0]), latency_ms))
+                print(f"  PURCHASED  {phone_number:<16} (confirmed) {owned[0].get('sid')}")
+            else:
+                failed.append((phone_number, error, latency_ms))
+                print(f"  FAILED     {phone_number:<16} (not on the account) {error}")
+        unknown[:] = unresolved
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                # Unknown purchases may have bought their number: don't buy a replacement yet
+                while len(purchased) + len(unknown) + len(pending) < count and len(pending) < workers:
+                    phone_number = next(remaining, None)
+                    if phone_number is None:
+                        break
+                    pending.add(pool.submit(purchase, phone_number))
+                if not pending:
+                    if not unknown:
+                        break
+                    resolve_unknown()
+                    if unknown:
+                        break
+                    continue
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future)
+    finally:
+        # Interrupted: purchases still in flight finished when the pool shut down
+        for future in pending:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                collect(future)
+        if unknown and pending:
+            resolve_unknown()
+        # Numbers already bought must reach the registry whatever went wrong
+        if purchased:
+            add_many_to_registry([entry for entry, _ in purchased])
+            invalidate_search_cache([entry["phone_number"] for entry, _ in purchased])
+    elapsed = time.monotonic() - start
+
+    print(f"\n{'='*50}")
+    print("Provisioning Summary")
+    print(f"{'='*50}")
+    print(f"Requested:      {count}")
+    print(f"Purchased:      {len(purchased)}")
+    print(f"Failed:         {len(failed)}")
+    if unknown:
+        print(f"Unknown:        {len(unknown)} (could not check; not registered)")
+    if purchased:
+        latencies = sorted(latency for _, latency in purchased)
+        print(f"Purchase p50:   {latencies[len(latencies) // 2]:.0f}ms")
+        print(f"Purchase max:   {latencies[-1]:.0f}ms")
+    print(f"Elapsed:        {elapsed:.2f}s ({len(purchased) / elapsed:.1f} numbers/s)")
+    if purchased:
+        print(f"Registry:       {REGISTRY_DB} (+{len(purchased)})")
+    if len(purchased) < count:
+        print(f"WARNING: only {len(purchased)} of {count} numbers were provisioned")
+    for phone_number, error, _ in unknown:
+        print(f"WARNING: {phone_number} may have been bought ({error}); check the account's "
+              f"IncomingPhoneNumbers before buying more")
+    print(f"{'='*50}\n")
+
+    return [entry for entry, _ in purchased]
+
+
+def default_holder():
+    """Lease holder name: $E2E_WORKER_ID, else user@host.
+
+    Stable across processes, so a plain `release` returns what an earlier
+    `lease` call from the same worker took.
+    """
+    if os.environ.get(HOLDER_ENV_VAR):
+        return os.environ[HOLDER_ENV_VAR]
+    try:
+        user = getpass.getuser()
+    except (KeyError, OSError):
+        user = str(os.getuid())
+    return f"{user}@{socket.gethostname()}"
+
+
+def refill_pool(needed, capability="SMS", area_codes=None):
+    """Buy numbers until `needed` free `capability` numbers are in the pool.
+
+    Only one worker buys at a time: the others wait for its refill claim
+    and re-check the free count, so workers hitting the watermark together
+    buy the shortfall once instead of once each.
+    """
+    claimant = f"{default_holder()}:{os.getpid()}:{time.monotonic_ns()}"
+    claim = f"refill:{capability}"
+    waiting = False
+    while True:
+        with open_registry() as registry:
+            registry.expire_leases()
+            if needed - registry.free_count(capability) <= 0:
+                return
+            claimed = registry.claim(claim, claimant, REFILL_CLAIM_TTL)
+        if claimed:
+            break
+        if not waiting:
+            print(f"Another worker is refilling the {capability} pool; waiting...")
+            waiting = True
+        time.sleep(REFILL_POLL_INTERVAL)
+
+    try:
+        # Re-check under the claim: the previous holder may have filled the pool
+        with open_registry() as registry:
+            free = registry.free_count(capability)
+        shortfall = needed - free
+        if shortfall > 0:
+            print(f"Free {capability} pool ({free}) below watermark after lease; "
+                  f"provisioning {shortfall} number(s)...")
+            provision_numbers(shortfall, area_codes, capability=capability)
+    finally:
+        with open_registry() as registry:
+            registry.drop_claim(claim, claimant)
+
+
+def lease_numbers(count, capability="SMS", holder=None, ttl=DEFAULT_LEASE_TTL, min_free=0,
+                  area_codes=None, as_json=False):
+    """Lease `count` free numbers from the registry pool for one E2E worker.
+
+    With `min_free` set, numbers are bought first (via provision) whenever
+    leasing would leave fewer than `min_free` free numbers in the pool.
+    """
+    holder = holder or default_holder()
+
+    if min_free:
+        # Keep stdout clean for --json consumers
+        with redirect_stdout(sys.stderr if as_json else sys.stdout):
+            refill_pool(count + min_free, capability, area_codes)
+
+    with open_registry() as registry:
+        leased = registry.lease(count, capability, holder, ttl)
+
+    if as_json:
+        print(json.dumps(leased, indent=2))
+        return leased
+
+    if not leased:
+        print(f"No free {capability} numbers in pool. Run provision or pass --min-free.")
+        return []
+
+    print(f"\nLeased {len(leased)} number(s) to {holder} for {ttl}s:\n")
+    for entry in leased:
+        print(f"  {entry['phone_number']}  (whatsapp:{entry['phone_number']})")
+    if len(leased) < count:
+        print(f"\nWARNING: only {len(leased)} of {count} requested numbers were free")
+    return leased
+
+
+def release_numbers(phone_numbers=None, holder=None):
+    """Return leased numbers to the pool."""
+    if not phone_numbers and not holder:
+        holder = default_holder()
+    with open_registry() as registry:
+        released = registry.release(phone_numbers, holder)
+    print(f"Released {released} lease(s).")
+    return released
+
+
+def show_pool(capability=None):
+    """Print pool totals and active leases."""
+    with open_registry() as registry:
+        expired = registry.expire_leases()
+        total = registry.count(capability=capability)
+        free = registry.free_count(capability)
+        leases = registry.active_leases(capability=capability)
+
+    print(f"\nNumber Pool{f' ({capability})' if capability else ''}:\n")
+    print(f"Total:          {total}")
+    print(f"Free:           {free}")
+    print(f"Leased:         {len(leases)}")
+    if expired:
+        print(f"Expired:        {expired} stale lease(s) reclaimed")
+
+    if leases:
+        now = time.time()
+        print("\n| Phone Number     | Holder                         | Expires In |")
+        print("|------------------|--------------------------------|------------|")
+        for lease in leases:
+            print(f"| {lease['phone_number']:<16} | {lease['holder'][:30]:<30} | "
+                  f"{int(lease['expires_at'] - now):>8}s |")
+    return {"total": total, "free": free, "leases": leases}
+
+
 def main():
     parser = argparse.ArgumentParser(description="Twilio Phone Number Manager")
+    parser.add_argument("--response-sink", choices=twilio_sink.MODES,
+                        default=os.environ.get(twilio_sink.ENV_VAR, "last"),
+                        help="How responses are recorded (default: last)")
     subparsers = parser.add_subparsers(dest="command", help="Command to run")
 
     # Search command
     search_parser = subparsers.add_parser("search", help="Search available numbers")
     search_parser.add_argument("--area-code", help="Filter by area code")
     search_parser.add_argument("--limit", type=int, default=5, help="Max results")
+    search_parser.add_argument("--no-cache", action="store_true", help="Bypass the search cache")
+    search_parser.add_argument("--prefetch", action="store_true",
+                               help="Refresh TWILIO_PREFETCH_AREA_CODES in the background")
+
+    # Prefetch command
+    prefetch_parser = subparsers.add_parser("prefetch", help="Warm the search cache for area codes")
+    prefetch_parser.add_argument("--area-codes", help="Comma-separated area codes (default: TWILIO_PREFETCH_AREA_CODES)")
+    prefetch_parser.add_argument("--interval", type=int, help="Keep refreshing every N seconds")
 
     # Purchase command
     purchase_parser = subparsers.add_parser("purchase", help="Purchase a number")
     purchase_parser.add_argument("phone_number", help="Phone number to purchase (e.g., +17655551234)")
 
+    # Provision command
+    provision_parser = subparsers.add_parser("provision", help="Search and purchase many numbers concurrently")
+    provision_parser.add_argument("--count", "-c", type=int, required=True, help="Numbers to purchase")
+    provision_parser.add_argument("--area-codes", help="Comma-separated area codes (e.g., 415,650)")
+    provision_parser.add_argument("--workers", type=int, default=PROVISION_WORKERS, help="Max concurrent searches/purchases")
+    provision_parser.add_argument("--capability", default="SMS", choices=["SMS", "MMS", "Voice", "Fax"],
+                                  help="Capability the numbers must have")
+
     # List command
-    subparsers.add_parser("list", help="List purchased numbers")
+    list_parser = subparsers.add_parser("list", help="List purchased numbers")
+    list_parser.add_argument("--capability", choices=["SMS", "MMS", "Voice", "Fax"], help="Only numbers with this capability")
+    list_parser.add_argument("--since", help="Only numbers purchased on/after this date (YYYY-MM-DD)")
+    list_parser.add_argument("--limit", type=int, help="Max rows to show")
+
+    # Lookup command
+    lookup_parser = subparsers.add_parser("lookup", help="Show a registry entry by phone number or SID")
+    lookup_parser.add_argument("key", help="Phone number (+1...) or SID (PN...)")
+
+    # Export command
+    export_parser = subparsers.add_parser("export-registry", help="Export the registry as phone-numbers.json")
+    export_parser.add_argument("path", nargs="?", default=str(REGISTRY_FILE), help="Output JSON path")
+
+    # Lease command
+    lease_parser = subparsers.add_parser("lease", help="Lease free numbers from the registry pool")
+    lease_parser.add_argument("count", type=int, help="Numbers to lease")
+    lease_parser.add_argument("--capability", default="SMS", choices=["SMS", "MMS", "Voice", "Fax"], help="Required capability")
+    lease_parser.add_argument("--holder", help=f"Lease holder name (default: ${HOLDER_ENV_VAR} or user@host)")
+    lease_parser.add_argument("--ttl", type=int, default=DEFAULT_LEASE_TTL, help="Lease lifetime in seconds")
+    lease_parser.add_argument("--min-free", type=int, default=0, help="Buy numbers when the free pool would drop below this")
+    lease_parser.add_argument("--area-codes", help="Area codes for auto-purchase (e.g., 415,650)")
+    lease_parser.add_argument("--json", action="store_true", help="Print leased entries as JSON")
+
+    # Release command
+    release_parser = subparsers.add_parser("release", help="Return leased numbers to the pool")
+    release_parser.add_argument("phone_numbers", nargs="*", help="Numbers to release (default: all held by --holder)")
+    release_parser.add_argument("--holder", help=f"Release every lease held by this holder (default: ${HOLDER_ENV_VAR} or user@host)")
+
+    # Pool command
+    pool_parser = subparsers.add_parser("pool", help="Show free/leased pool counts")
+    pool_parser.add_argument("--capability", choices=["SMS", "MMS", "Voice", "Fax"], help="Count only this capability")
 
     # Set credentials command
     creds_parser = subparsers.add_parser("set-credentials", help="Save API credentials")
@@ -234,13 +754,32 @@ def main():
     creds_parser.add_argument("auth_token", help="Twilio Auth Token")
 
     args = parser.parse_args()
+    configure_response_sink(args.response_sink)
 
     if args.command == "search":
-        search_numbers(area_code=args.area_code, limit=args.limit)
+        search_numbers(area_code=args.area_code, limit=args.limit, use_cache=not args.no_cache,
+                       prefetch=args.prefetch)
+    elif args.command == "prefetch":
+        area_codes = [a.strip() for a in args.area_codes.split(",") if a.strip()] if args.area_codes else None
+        prefetch_searches(area_codes, args.interval)
     elif args.command == "purchase":
         purchase_number(args.phone_number)
+    elif args.command == "provision":
+        area_codes = [a.strip() for a in args.area_codes.split(",") if a.strip()] if args.area_codes else None
+        provision_numbers(args.count, area_codes, args.workers, args.capability)
     elif args.command == "list":
-        list_numbers()
+        list_numbers(args.capability, args.since, args.limit)
+    elif args.command == "lookup":
+        lookup_number(args.key)
+    elif args.command == "export-registry":
+        export_registry(args.path)
+    elif args.command == "lease":
+        area_codes = [a.strip() for a in args.area_codes.split(",") if a.strip()] if args.area_codes else None
+        lease_numbers(args.count, args.capability, args.holder, args.ttl, args.min_free, area_codes, args.json)
+    elif args.command == "release":
+        release_numbers(args.phone_numbers, args.holder)
+    elif args.command == "pool":
+        show_pool(args.capability)
     elif args.command == "set-credentials":
         save_credentials(args.account_sid, args.auth_token)
     else:
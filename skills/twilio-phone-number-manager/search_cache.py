@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+AvailablePhoneNumbers Search Cache
+SQLite-backed cache of search results, used by phone_manager.py.
+
+Repeated searches for the same area code while picking a number are served
+locally instead of calling the AvailablePhoneNumbers endpoint again. Entries
+are keyed by (country, type, SmsEnabled, AreaCode), expire after a short TTL
+and are evicted least-recently-used beyond MAX_ENTRIES.
+
+A purchased number can no longer be bought, so invalidate() drops every
+cached search that returned it. The number -> entry mapping is indexed,
+making that a single indexed delete rather than a scan of cached payloads.
+
+The cache lives in /tmp (like the credentials and response files) and is
+shared by every phone_manager.py process; WAL mode lets a background
+prefetch write while searches read.
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+# Seconds to wait for another process holding the write lock
+BUSY_TIMEOUT = 30
+
+# Seconds a cached search stays fresh
+DEFAULT_TTL = 120
+
+# Cached searches kept before least-recently-used eviction
+MAX_ENTRIES = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS searches (
+    country      TEXT NOT NULL,
+    type         TEXT NOT NULL,
+    sms_enabled  INTEGER NOT NULL,
+    area_code    TEXT NOT NULL,
+    results      TEXT NOT NULL,
+    fetched_at   REAL NOT NULL,
+    last_used    REAL NOT NULL,
+    PRIMARY KEY (country, type, sms_enabled, area_code)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_searches_last_used ON searches(last_used);
+
+CREATE TABLE IF NOT EXISTS search_numbers (
+    phone_number TEXT NOT NULL,
+    country      TEXT NOT NULL,
+    type         TEXT NOT NULL,
+    sms_enabled  INTEGER NOT NULL,
+    area_code    TEXT NOT NULL,
+    PRIMARY KEY (phone_number, country, type, sms_enabled, area_code)
+) WITHOUT ROWID;
+"""
+
+KEY_CLAUSE = "country = ? AND type = ? AND sms_enabled = ? AND area_code = ?"
+
+
+def cache_key(country="US", number_type="Local", sms_enabled=True, area_code=None):
+    """Normalize search parameters into a cache key tuple."""
+    return (country, number_type, int(bool(sms_enabled)), str(area_code or ""))
+
+
+class SearchCache:
+    """Recent AvailablePhoneNumbers results stored in SQLite (WAL mode)."""
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_entries=MAX_ENTRIES):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, key, now=None):
+        """Return cached results for key, or None when missing or expired."""
+        now = time.time() if now is None else now
+        row = self.conn.execute(
+            f"SELECT results, fetched_at FROM searches WHERE {KEY_CLAUSE}", key
+        ).fetchone()
+        if row is None or now - row[1] > self.ttl:
+            return None
+        self.conn.execute(f"UPDATE searches SET last_used = ? WHERE {KEY_CLAUSE}", (now, *key))
+        return json.loads(row[0])
+
+    def age(self, key, now=None):
+        """Seconds since key was fetched, or None when not cached."""
+        now = time.time() if now is None else now
+        row = self.conn.execute(f"SELECT fetched_at FROM searches WHERE {KEY_CLAUSE}", key).fetchone()
+        return None if row is None else now - row[0]
+
+    def put(self, key, results, now=None):
+        """Store results for key, evicting least-recently-used entries over the limit."""
+        now = time.time() if now is None else now
+        numbers = [(r["phone_number"], *key) for r in results if r.get("phone_number")]
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(f"DELETE FROM search_numbers WHERE {KEY_CLAUSE}", key)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, json.dumps(results), now, now)
+            )
+            self.conn.executemany("INSERT OR IGNORE INTO search_numbers VALUES (?, ?, ?, ?, ?)", numbers)
+            evicted = self.conn.execute(
+                "SELECT country, type, sms_enabled, area_code FROM searches "
+                "ORDER BY last_used DESC LIMIT -1 OFFSET ?", (self.max_entries,)
+            ).fetchall()
+            for old in evicted:
+                self._delete(old)
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def _delete(self, key):
+        self.conn.execute(f"DELETE FROM searches WHERE {KEY_CLAUSE}", key)
+        self.conn.execute(f"DELETE FROM search_numbers WHERE {KEY_CLAUSE}", key)
+
+    def invalidate(self, phone_numbers):
+        """Drop every cached search that returned one of phone_numbers. Returns count dropped."""
+        phone_numbers = list(phone_numbers)
+        if not phone_numbers:
+            return 0
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            keys = set()
+            for i in range(0, len(phone_numbers), 500):
+                chunk = phone_numbers[i:i + 500]
+                keys.update(self.conn.execute(
+                    "SELECT country, type, sms_enabled, area_code FROM search_numbers "
+                    f"WHERE phone_number IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall())
+            for key in keys:
+                self._delete(key)
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return len(keys)
+
+    def clear(self):
+        self.conn.execute("DELETE FROM searches")
+        self.conn.execute("DELETE FROM search_numbers")